@@ -0,0 +1,6 @@
+"""Let Python know that the `benchmarks/` folder is a package.
+
+Benchmarks are run from the project root as modules, for example:
+
+    $ python3 -m benchmarks.bench_write
+"""
@@ -0,0 +1,89 @@
+"""Compare the SQLite storage engine against the in-memory `NEODatabase`.
+
+For each engine, this measures the startup time (loading and linking the data
+files in memory; ingesting them into SQLite the first time, and reopening the
+SQLite file afterwards) and the latency of a few representative queries, both
+to the first 10 results (as `main.py query` prints by default) and to
+exhaustion.
+
+To run this benchmark from the project root, run:
+
+    $ python3 -m benchmarks.bench_sqlite
+    $ python3 -m benchmarks.bench_sqlite --neofile tests/test-neos-2020.csv \\
+          --cadfile tests/test-cad-2020.json
+"""
+import argparse
+import datetime
+import pathlib
+import tempfile
+import time
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters, limit
+from sqlite_database import SQLiteNEODatabase, ingest
+
+
+# Paths to the root of the project and the `data` subfolder.
+PROJECT_ROOT = pathlib.Path(__file__).parent.parent.resolve()
+DATA_ROOT = PROJECT_ROOT / 'data'
+
+QUERIES = (
+    ('all', {}),
+    ('single date', {'date': datetime.date(2020, 3, 2)}),
+    ('one month, close', {'start_date': datetime.date(2020, 3, 1),
+                          'end_date': datetime.date(2020, 3, 31), 'distance_max': 0.05}),
+    ('fast and hazardous', {'velocity_min': 30, 'hazardous': True}),
+    ('large NEOs', {'diameter_min': 1.0}),
+)
+
+
+def timed(func, *args):
+    """Call `func(*args)` and return its result and the elapsed time, in seconds."""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="Compare the SQLite and in-memory engines.")
+    parser.add_argument('--neofile', default=(DATA_ROOT / 'neos.csv'), type=pathlib.Path,
+                        help="Path to CSV file of near-Earth objects.")
+    parser.add_argument('--cadfile', default=(DATA_ROOT / 'cad.json'), type=pathlib.Path,
+                        help="Path to JSON file of close approach data.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = pathlib.Path(tmpdir) / 'neos.sqlite3'
+
+        memory, elapsed = timed(lambda: NEODatabase(load_neos(args.neofile),
+                                                    load_approaches(args.cadfile)))
+        print(f"{'Startup':<24} {'seconds':>10}")
+        print(f"{'  memory: load + link':<24} {elapsed:10.3f}")
+        _, elapsed = timed(ingest, args.neofile, args.cadfile, db_path)
+        print(f"{'  sqlite: ingest':<24} {elapsed:10.3f}")
+        sqlite, elapsed = timed(SQLiteNEODatabase.open, db_path, args.neofile, args.cadfile)
+        print(f"{'  sqlite: reopen':<24} {elapsed:10.3f}")
+
+        print()
+        print(f"{'Query':<24} {'memory first 10':>16} {'sqlite first 10':>16} "
+              f"{'memory all':>12} {'sqlite all':>12} {'results':>9}")
+        for label, criteria in QUERIES:
+            filters = create_filters(**criteria)
+            timings = []
+            for n in (10, None):
+                results, elapsed = timed(lambda: list(limit(memory.query(filters), n)))
+                timings.append(elapsed * 1000)
+                # Use a fresh SQLite engine so that no objects are cached from earlier queries.
+                fresh = SQLiteNEODatabase(db_path)
+                _, elapsed = timed(lambda: list(limit(fresh.query(filters), n)))
+                timings.append(elapsed * 1000)
+                fresh.close()
+            print(f"{label:<24} {timings[0]:13.2f} ms {timings[1]:13.2f} ms "
+                  f"{timings[2]:9.1f} ms {timings[3]:9.1f} ms {len(results):9}")
+        sqlite.close()
+
+
+if __name__ == '__main__':
+    main()
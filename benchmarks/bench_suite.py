@@ -0,0 +1,150 @@
+"""Time each stage of the pipeline, at one or several data set sizes.
+
+For each data set, this times `load_neos`, `load_approaches`, linking them in
+`NEODatabase.__init__`, a few representative queries (to exhaustion), and
+writing every close approach with the CSV and the JSON writers. Each stage is
+run several times, and the best time is kept.
+
+The data sets are either the given data files, or synthetic data sets of the
+sizes given with `--sizes`, generated by `benchmarks.generate`, which shows how
+each stage scales with the number of close approaches. The results are printed
+as a table, and can be saved as JSON with `--output`, for tracking over time.
+
+To run this benchmark from the project root, run:
+
+    $ python3 -m benchmarks.bench_suite
+    $ python3 -m benchmarks.bench_suite --sizes 10000 100000 1000000 --output results.json
+"""
+import argparse
+import datetime
+import json
+import pathlib
+import platform
+import tempfile
+import time
+
+from benchmarks.generate import generate
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from write import write_to_csv, write_to_json
+
+
+# Paths to the root of the project and the `data` subfolder.
+PROJECT_ROOT = pathlib.Path(__file__).parent.parent.resolve()
+DATA_ROOT = PROJECT_ROOT / 'data'
+
+QUERIES = (
+    ('all', {}),
+    ('single date', {'date': datetime.date(2020, 3, 2)}),
+    ('one month, close', {'start_date': datetime.date(2020, 3, 1),
+                          'end_date': datetime.date(2020, 3, 31), 'distance_max': 0.05}),
+    ('fast and hazardous', {'velocity_min': 30, 'hazardous': True}),
+    ('large NEOs', {'diameter_min': 1.0}),
+)
+
+WRITERS = (
+    ('csv', write_to_csv, '.csv'),
+    ('json', write_to_json, '.json'),
+)
+
+
+def best_of(repeat, func):
+    """Call `func()` several times, and return its last result and its fastest time, in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def run_suite(neo_csv_path, cad_json_path, repeat=3):
+    """Time each stage of the pipeline on a pair of data files.
+
+    :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :param repeat: The number of times to run each stage.
+    :return: A list of dictionaries, one per stage, with its name, its best time
+             in seconds, and the number of rows it handled.
+    """
+    results = []
+
+    def record(stage, seconds, rows):
+        results.append({'stage': stage, 'seconds': seconds, 'rows': rows})
+        print(f"  {stage:<28} {seconds:10.3f} s {rows:12,} rows {rows / seconds:14,.0f} rows/sec")
+
+    neos, elapsed = best_of(repeat, lambda: load_neos(neo_csv_path))
+    record('load_neos', elapsed, len(neos))
+    approaches, elapsed = best_of(repeat, lambda: load_approaches(cad_json_path))
+    record('load_approaches', elapsed, len(approaches))
+
+    # Linking mutates the objects, so each run links freshly loaded ones.
+    elapsed = float('inf')
+    for _ in range(repeat):
+        neos, approaches = load_neos(neo_csv_path), load_approaches(cad_json_path)
+        start = time.perf_counter()
+        database = NEODatabase(neos, approaches)
+        elapsed = min(elapsed, time.perf_counter() - start)
+    record('NEODatabase.__init__', elapsed, len(approaches))
+
+    for label, criteria in QUERIES:
+        filters = create_filters(**criteria)
+        matches, elapsed = best_of(repeat, lambda: list(database.query(filters)))
+        record(f'query: {label}', elapsed, len(matches))
+
+    with tempfile.TemporaryDirectory() as outdir:
+        for label, writer, suffix in WRITERS:
+            filename = pathlib.Path(outdir) / f'out{suffix}'
+            _, elapsed = best_of(repeat, lambda: writer(approaches, filename))
+            record(f'write: {label}', elapsed, len(approaches))
+    return results
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="Time each stage of the pipeline.")
+    parser.add_argument('--neofile', default=(DATA_ROOT / 'neos.csv'), type=pathlib.Path,
+                        help="Path to CSV file of near-Earth objects.")
+    parser.add_argument('--cadfile', default=(DATA_ROOT / 'cad.json'), type=pathlib.Path,
+                        help="Path to JSON file of close approach data.")
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        help="Instead of the data files, use synthetic data sets with these "
+                             "numbers of close approaches (e.g. 10000 100000 1000000).")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="The seed of the synthetic data sets. Defaults to 0.")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="The number of times to run each stage. Defaults to 3.")
+    parser.add_argument('--output', type=pathlib.Path,
+                        help="File in which to save the results as JSON.")
+    args = parser.parse_args()
+
+    runs = []
+    if args.sizes:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for size in args.sizes:
+                print(f"Synthetic data set of {size:,} close approaches, best of {args.repeat}:")
+                neofile, cadfile = generate(pathlib.Path(tmpdir) / str(size), size, seed=args.seed)
+                runs.append({'source': 'synthetic', 'approaches': size, 'seed': args.seed,
+                             'results': run_suite(neofile, cadfile, args.repeat)})
+    else:
+        print(f"{args.cadfile}, best of {args.repeat}:")
+        results = run_suite(args.neofile, args.cadfile, args.repeat)
+        runs.append({'source': str(args.cadfile), 'approaches': results[1]['rows'],
+                     'results': results})
+
+    if args.output:
+        report = {
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'runs': runs,
+        }
+        with open(args.output, 'w') as outfile:
+            json.dump(report, outfile, indent=2)
+            outfile.write('\n')
+
+
+if __name__ == '__main__':
+    main()
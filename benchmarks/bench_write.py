@@ -0,0 +1,74 @@
+"""Measure the throughput of the CSV and JSON writers on a full-dataset export.
+
+The NEOs and close approaches are loaded and linked once, and then every close
+approach is written with each writer. The throughput, in rows per second, is
+reported for each writer.
+
+To run this benchmark from the project root, run:
+
+    $ python3 -m benchmarks.bench_write
+    $ python3 -m benchmarks.bench_write --neofile tests/test-neos-2020.csv \\
+          --cadfile tests/test-cad-2020.json --repeat 20
+"""
+import argparse
+import pathlib
+import tempfile
+import time
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from write import write_to_csv, write_to_json, write_to_ndjson
+
+
+# Paths to the root of the project and the `data` subfolder.
+PROJECT_ROOT = pathlib.Path(__file__).parent.parent.resolve()
+DATA_ROOT = PROJECT_ROOT / 'data'
+
+WRITERS = (
+    ('csv', write_to_csv, '.csv'),
+    ('json', write_to_json, '.json'),
+    ('ndjson', write_to_ndjson, '.jsonl'),
+)
+
+
+def measure(writer, results, filename, repeat):
+    """Write `results` to `filename` with `writer` several times, keeping the best time.
+
+    :param writer: One of the `write_to_*` functions.
+    :param results: A sequence of `CloseApproach` objects.
+    :param filename: A path to which to write the results.
+    :param repeat: The number of times to run the writer.
+    :return: The fastest observed time, in seconds.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        writer(results, filename)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark the throughput of the writers.")
+    parser.add_argument('--neofile', default=(DATA_ROOT / 'neos.csv'), type=pathlib.Path,
+                        help="Path to CSV file of near-Earth objects.")
+    parser.add_argument('--cadfile', default=(DATA_ROOT / 'cad.json'), type=pathlib.Path,
+                        help="Path to JSON file of close approach data.")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="The number of times to run each writer.")
+    args = parser.parse_args()
+
+    neos = load_neos(args.neofile)
+    approaches = load_approaches(args.cadfile)
+    NEODatabase(neos, approaches)
+
+    print(f"Writing {len(approaches)} close approaches, best of {args.repeat}:")
+    with tempfile.TemporaryDirectory() as outdir:
+        for label, writer, suffix in WRITERS:
+            elapsed = measure(writer, approaches, pathlib.Path(outdir) / f'out{suffix}', args.repeat)
+            print(f"  {label:<8} {elapsed:8.3f} s  {len(approaches) / elapsed:12,.0f} rows/sec")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+"""Generate synthetic data files of any size, in NASA's formats.
+
+The test data files only hold a few thousand rows, which is too few to reveal
+how the code scales. The `generate` function writes a `neos.csv` and a
+`cad.json` with the same columns and value formats as NASA's files, with as
+many close approaches as requested (e.g. from 10 thousand to 10 million).
+
+The values are random, but follow roughly the proportions of the real data
+set: about one NEO for every 17 close approaches, about a tenth of NEOs
+numbered, one in seventy named, one in sixteen with a diameter and one in
+eleven potentially hazardous. Close approaches are spread evenly over
+1900-2200, in time order, closer than 0.5 au.
+
+The same seed always generates the same files. Rows are written as they're
+generated, so memory use grows with the number of NEOs, not of close approaches.
+
+To generate a data set from the project root, run:
+
+    $ python3 -m benchmarks.generate --approaches 1000000 data/synthetic/
+"""
+import argparse
+import csv
+import datetime
+import json
+import math
+import pathlib
+import random
+import string
+
+
+# The header row of NASA's NEO file.
+NEO_FIELDNAMES = (
+    'id', 'spkid', 'full_name', 'pdes', 'name', 'prefix', 'neo', 'pha', 'H', 'G', 'M1', 'M2',
+    'K1', 'K2', 'PC', 'diameter', 'extent', 'albedo', 'rot_per', 'GM', 'BV', 'UB', 'IR',
+    'spec_B', 'spec_T', 'H_sigma', 'diameter_sigma', 'orbit_id', 'epoch', 'epoch_mjd',
+    'epoch_cal', 'equinox', 'e', 'a', 'q', 'i', 'om', 'w', 'ma', 'ad', 'n', 'tp', 'tp_cal',
+    'per', 'per_y', 'moid', 'moid_ld', 'moid_jup', 't_jup', 'sigma_e', 'sigma_a', 'sigma_q',
+    'sigma_i', 'sigma_om', 'sigma_w', 'sigma_ma', 'sigma_ad', 'sigma_n', 'sigma_tp',
+    'sigma_per', 'class', 'producer', 'data_arc', 'first_obs', 'last_obs', 'n_obs_used',
+    'n_del_obs_used', 'n_dop_obs_used', 'condition_code', 'rms', 'two_body', 'A1', 'A2', 'A3',
+    'DT'
+)
+
+# The "fields" of NASA's close approach file.
+CAD_FIELDS = ('des', 'orbit_id', 'jd', 'cd', 'dist', 'dist_min', 'dist_max', 'v_rel', 'v_inf',
+              't_sigma_f', 'h')
+
+# The proportions of NEOs that are numbered, named, have a diameter, and are hazardous.
+NUMBERED = 0.1
+NAMED = 0.014
+WITH_DIAMETER = 0.06
+HAZARDOUS = 0.09
+
+# The number of close approaches for each NEO, on average.
+APPROACHES_PER_NEO = 17
+
+# The span of close approach times.
+START = datetime.datetime(1900, 1, 1)
+END = datetime.datetime(2200, 1, 1)
+
+# The farthest close approach distance, in au.
+MAX_DISTANCE = 0.5
+
+_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+# The letters of provisional designations, which skip 'I' (and 'Z' for the half-month).
+_LETTERS = string.ascii_uppercase.replace('I', '')
+_SYLLABLES = ('ka', 'ro', 'te', 'lu', 'mi', 'sa', 'no', 'ra', 'phe', 'tho', 'dor', 'van',
+              'is', 'el', 'an', 'os', 'ur', 'ix', 'ba', 'ge')
+# The Julian date of the Unix epoch.
+_UNIX_EPOCH_JD = 2440587.5
+
+
+def _designations(rng, count):
+    """Produce `count` distinct primary designations, numbered or provisional."""
+    seen = set()
+    number = 1000
+    while len(seen) < count:
+        if rng.random() < NUMBERED:
+            number += rng.randint(1, 50)
+            designation = str(number)
+        else:
+            designation = (f'{rng.randint(1990, 2024)} {rng.choice(_LETTERS[:-1])}'
+                           f'{rng.choice(_LETTERS)}{rng.choice(("", rng.randint(1, 300)))}')
+        if designation not in seen:
+            seen.add(designation)
+            yield designation
+
+
+def _name(rng, used):
+    """Make up a name that hasn't been used yet."""
+    while True:
+        name = ''.join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+        if name not in used:
+            used.add(name)
+            return name
+
+
+def neo_rows(rng, count):
+    """Produce the rows of a synthetic NEO file, as dictionaries.
+
+    :param rng: A `random.Random`.
+    :param count: The number of NEOs.
+    :yield: A dictionary mapping some of `NEO_FIELDNAMES` to strings, for each NEO.
+    """
+    names = set()
+    for index, pdes in enumerate(_designations(rng, count)):
+        # Only numbered NEOs are named.
+        name = _name(rng, names) if pdes.isdigit() and rng.random() < NAMED / NUMBERED else ''
+        if pdes.isdigit():
+            provisional = f'{rng.randint(1950, 2020)} {rng.choice(_LETTERS)}{rng.choice(_LETTERS)}'
+            full_name = f"{pdes:>6} {name + ' ' if name else ''}({provisional})"
+        else:
+            full_name = f'       ({pdes})'
+        hazardous = rng.random() < HAZARDOUS
+        yield {
+            'id': f'a{2000000 + index:07d}' if pdes.isdigit() else f'bK{index:07d}',
+            'spkid': str(2000000 + index),
+            'full_name': full_name,
+            'pdes': pdes,
+            'name': name,
+            'neo': 'Y',
+            'pha': 'Y' if hazardous else 'N',
+            'H': f'{rng.uniform(14 if hazardous else 17, 22 if hazardous else 30):.1f}',
+            'diameter': (f'{rng.lognormvariate(-0.7, 1.0):.3f}'
+                         if rng.random() < WITH_DIAMETER else ''),
+            'class': rng.choice(('APO', 'ATE', 'AMO', 'ATE', 'APO', 'APO')),
+        }
+
+
+def approach_rows(rng, count, designations):
+    """Produce the rows of a synthetic close approach file, in time order.
+
+    The times are the order statistics of `count` uniform samples, generated one
+    after another (in descending order, and then reflected), so they never all
+    need to be held in memory or sorted.
+
+    :param rng: A `random.Random`.
+    :param count: The number of close approaches.
+    :param designations: A sequence of the NEOs' primary designations.
+    :yield: A list of strings in the order of `CAD_FIELDS`, for each close approach.
+    """
+    start = START.replace(tzinfo=datetime.timezone.utc).timestamp()
+    span = END.replace(tzinfo=datetime.timezone.utc).timestamp() - start
+    remaining = 1.0
+    for k in range(count, 0, -1):
+        remaining *= rng.random() ** (1 / k)
+        seconds = start + (1 - remaining) * span
+        moment = datetime.datetime(1970, 1, 1) + datetime.timedelta(seconds=seconds)
+        distance = MAX_DISTANCE * rng.random() ** 1.2
+        velocity = max(0.3, rng.lognormvariate(math.log(11.5), 0.5))
+        spread = distance * rng.uniform(1e-6, 1e-3)
+        yield [
+            rng.choice(designations),
+            str(rng.randint(1, 600)),
+            repr(_UNIX_EPOCH_JD + seconds / 86400),
+            f'{moment.year}-{_MONTHS[moment.month - 1]}-{moment.day:02d} '
+            f'{moment.hour:02d}:{moment.minute:02d}',
+            repr(distance),
+            repr(distance - spread),
+            repr(distance + spread),
+            repr(velocity),
+            repr(velocity * rng.uniform(0.95, 1.0)),
+            rng.choice(('< 00:01', '00:01', '00:05', '01:13', '2_03:11')),
+            f'{rng.uniform(14, 30):.1f}',
+        ]
+
+
+def generate(outdir, approaches=10000, neos=None, seed=0):
+    """Write a synthetic `neos.csv` and `cad.json` into a directory.
+
+    :param outdir: The directory in which to write the files, created if needed.
+    :param approaches: The number of close approaches.
+    :param neos: The number of NEOs; by default, one for every `APPROACHES_PER_NEO` close approaches.
+    :param seed: The seed of the random numbers.
+    :return: A tuple of the paths of the NEO file and of the close approach file.
+    """
+    if neos is None:
+        neos = max(1, approaches // APPROACHES_PER_NEO)
+    rng = random.Random(seed)
+    outdir = pathlib.Path(outdir)
+    outdir.mkdir(parents=True, exist_ok=True)
+    neo_path, cad_path = outdir / 'neos.csv', outdir / 'cad.json'
+
+    designations = []
+    with open(neo_path, 'w', newline='') as outfile:
+        writer = csv.DictWriter(outfile, NEO_FIELDNAMES, restval='')
+        writer.writeheader()
+        for row in neo_rows(rng, neos):
+            designations.append(row['pdes'])
+            writer.writerow(row)
+
+    with open(cad_path, 'w') as outfile:
+        outfile.write('{"signature":{"source":"NASA/JPL SBDB Close Approach Data API",'
+                      f'"version":"1.1"}},"count":{approaches},'
+                      f'"fields":{json.dumps(CAD_FIELDS, separators=(",", ":"))},"data":[')
+        separator = ''
+        for row in approach_rows(rng, approaches, designations):
+            outfile.write(separator)
+            outfile.write(json.dumps(row, separators=(',', ':')))
+            separator = ','
+        outfile.write(']}\n')
+    return neo_path, cad_path
+
+
+def main():
+    """Generate a synthetic data set."""
+    parser = argparse.ArgumentParser(description="Generate synthetic NEO and close approach files.")
+    parser.add_argument('outdir', type=pathlib.Path,
+                        help="Directory in which to write `neos.csv` and `cad.json`.")
+    parser.add_argument('--approaches', type=int, default=10000,
+                        help="The number of close approaches. Defaults to 10000.")
+    parser.add_argument('--neos', type=int,
+                        help=f"The number of NEOs. Defaults to one for every "
+                             f"{APPROACHES_PER_NEO} close approaches.")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="The seed of the random numbers. Defaults to 0.")
+    args = parser.parse_args()
+    for path in generate(args.outdir, args.approaches, args.neos, args.seed):
+        print(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,492 @@
+"""Store near-Earth objects and their close approaches in a columnar binary file.
+
+The `write_columnar` function converts NEOs and close approaches (as loaded by
+`load_neos` and `load_approaches`) into a project-native binary file, and the
+`ColumnarNEODatabase` class opens such a file with `mmap`.
+
+The file consists of a fixed-size header followed by column blocks:
+
+    header          magic, version, row counts and the (offset, size) of each block
+    approach_time   int64    minutes since 1970-01-01, sorted ascending
+    approach_dist   float64  nominal approach distance, in au
+    approach_vel    float64  relative approach velocity, in km/s
+    approach_des    uint32   string id of the approach's designation
+    approach_neo    int32    row of the approach's NEO, or -1
+    neo_des         uint32   string id of the NEO's designation
+    neo_name        int32    string id of the NEO's name, or -1
+    neo_diameter    float64  diameter in km, or NaN
+    neo_hazardous   uint8    1 if potentially hazardous
+    neo_start       uint32   start of each NEO's rows in `neo_approach` (n_neos + 1 entries)
+    neo_approach    uint32   approach rows, grouped by NEO and sorted by time
+    des_order       uint32   NEO rows, sorted by designation
+    name_order      uint32   rows of named NEOs, sorted by name
+    string_start    uint32   start of each string in `string_data` (n_strings + 1 entries)
+    string_data     bytes    UTF-8 encoded strings
+
+All values are little-endian and every block starts on an 8-byte boundary.
+Opening the file parses nothing: each block is a typed `memoryview` onto the
+mapped file, so a query only touches the pages of the columns (and, thanks to
+the sorted time column, the rows) it actually needs.
+"""
+import array
+import bisect
+import datetime
+import math
+import mmap
+import operator
+import os
+import struct
+import sys
+import time
+
+import instrumentation
+from extract import load_neos, load_approaches
+from filters import DateFilter, DistanceFilter, VelocityFilter, DiameterFilter, HazardousFilter
+from indexes import (PrefixIndex, TrigramIndex, COMPLETION_LIMIT, SUGGESTION_LIMIT,
+                     WILDCARD)
+from models import NearEarthObject, CloseApproach
+
+
+MAGIC = b'NEOCOLv1'
+
+# The blocks of the file, in order, with the `array`/`memoryview` typecode of each.
+BLOCKS = (
+    ('approach_time', 'q'),
+    ('approach_dist', 'd'),
+    ('approach_vel', 'd'),
+    ('approach_des', 'I'),
+    ('approach_neo', 'i'),
+    ('neo_des', 'I'),
+    ('neo_name', 'i'),
+    ('neo_diameter', 'd'),
+    ('neo_hazardous', 'B'),
+    ('neo_start', 'I'),
+    ('neo_approach', 'I'),
+    ('des_order', 'I'),
+    ('name_order', 'I'),
+    ('string_start', 'I'),
+    ('string_data', 'B'),
+)
+
+# Magic, approach count, NEO count, string count, then an (offset, size) pair per block.
+HEADER = struct.Struct('<8sQQQ' + 'QQ' * len(BLOCKS))
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+_MINUTE = datetime.timedelta(minutes=1)
+
+
+def _to_minutes(moment):
+    """Convert a naive `datetime` (or a `date`, at midnight) to minutes since `EPOCH`."""
+    if not isinstance(moment, datetime.datetime):
+        moment = datetime.datetime.combine(moment, datetime.time())
+    return (moment - EPOCH) // _MINUTE
+
+
+def _typed_array(typecode, values):
+    """Build a little-endian `array` of the given type."""
+    block = array.array(typecode, values)
+    if sys.byteorder != 'little':
+        block.byteswap()
+    return block
+
+
+def write_columnar(neos, approaches, path):
+    """Write NEOs and their close approaches to a columnar binary file.
+
+    The NEOs and close approaches don't need to be linked beforehand; they are
+    matched by designation, as in the `NEODatabase` constructor.
+
+    :param neos: A collection of `NearEarthObject`s.
+    :param approaches: A collection of `CloseApproach`es.
+    :param path: A Path-like object pointing to where the file should be saved.
+    """
+    strings = {}
+
+    def string_id(value):
+        return strings.setdefault(value, len(strings))
+
+    neos = list({neo.designation: neo for neo in neos}.values())
+    neo_rows = {neo.designation: row for row, neo in enumerate(neos)}
+    # A stable sort keeps approaches at the same time in their original order.
+    approaches = sorted(approaches, key=operator.attrgetter('time'))
+
+    columns = {
+        'approach_time': _typed_array('q', (_to_minutes(a.time) for a in approaches)),
+        'approach_dist': _typed_array('d', (a.distance for a in approaches)),
+        'approach_vel': _typed_array('d', (a.velocity for a in approaches)),
+        'approach_des': _typed_array('I', (string_id(a._designation) for a in approaches)),
+        'approach_neo': _typed_array('i', (neo_rows.get(a._designation, -1) for a in approaches)),
+        'neo_des': _typed_array('I', (string_id(neo.designation) for neo in neos)),
+        'neo_name': _typed_array('i', (string_id(neo.name) if neo.name else -1 for neo in neos)),
+        'neo_diameter': _typed_array('d', (neo.diameter for neo in neos)),
+        'neo_hazardous': _typed_array('B', (int(neo.hazardous) for neo in neos)),
+    }
+
+    # Group the approach rows by NEO, keeping each group in time order.
+    by_neo = [[] for _ in neos]
+    for row, neo_row in enumerate(columns['approach_neo']):
+        if neo_row >= 0:
+            by_neo[neo_row].append(row)
+    starts = [0]
+    for group in by_neo:
+        starts.append(starts[-1] + len(group))
+    columns['neo_start'] = _typed_array('I', starts)
+    columns['neo_approach'] = _typed_array('I', (row for group in by_neo for row in group))
+
+    columns['des_order'] = _typed_array('I', sorted(range(len(neos)),
+                                                    key=lambda row: neos[row].designation))
+    columns['name_order'] = _typed_array('I', sorted((row for row, neo in enumerate(neos) if neo.name),
+                                                     key=lambda row: neos[row].name))
+
+    encoded = [value.encode('utf-8') for value in strings]
+    starts = [0]
+    for value in encoded:
+        starts.append(starts[-1] + len(value))
+    columns['string_start'] = _typed_array('I', starts)
+    columns['string_data'] = array.array('B', b''.join(encoded))
+
+    layout = []
+    offset = HEADER.size
+    for name, _ in BLOCKS:
+        offset += -offset % 8
+        size = len(columns[name]) * columns[name].itemsize
+        layout.extend((offset, size))
+        offset += size
+
+    with open(path, 'wb') as outfile:
+        outfile.write(HEADER.pack(MAGIC, len(approaches), len(neos), len(strings), *layout))
+        for (name, _), block_offset in zip(BLOCKS, layout[::2]):
+            outfile.write(b'\0' * (block_offset - outfile.tell()))
+            columns[name].tofile(outfile)
+
+
+class _SortedStrings:
+    """A read-only sequence of strings, indirected through a sorted order, for use with `bisect`."""
+    def __init__(self, database, order, column):
+        """Create a new `_SortedStrings`.
+
+        :param database: The `ColumnarNEODatabase` whose string table holds the strings.
+        :param order: A column of row numbers, in order of the strings they refer to.
+        :param column: A column of string IDs, by row number.
+        """
+        self._database = database
+        self._order = order
+        self._column = column
+
+    def __len__(self):
+        """Return the number of strings."""
+        return len(self._order)
+
+    def __getitem__(self, index):
+        """Return the string in position `index` of the sorted order."""
+        return self._database._string(self._column[self._order[index]])
+
+
+class ColumnarNEODatabase:
+    """A database of near-Earth objects and their close approaches, in a memory-mapped file.
+
+    It provides the same `get_neo_by_designation`, `get_neo_by_name`,
+    `get_neos_by_name`, `find_neos`, `complete_neos`, `suggest_neos` and
+    `query` methods as `NEODatabase`. Filters on approach time, distance,
+    velocity, diameter and hazardousness are evaluated directly on the mapped
+    columns, and only matching rows are turned into objects. Each NEO and close
+    approach is built at most once, linked just as in an `NEODatabase`.
+    """
+    def __init__(self, path):
+        """Open a columnar file, previously written by `write_columnar`.
+
+        :param path: A path to the columnar file.
+        :raises ValueError: If the file isn't a columnar file of this version.
+        """
+        with open(path, 'rb') as infile:
+            # An empty file can't be mapped, and a shorter one has no header to read.
+            if os.fstat(infile.fileno()).st_size < HEADER.size:
+                raise ValueError(f"{path} is not a columnar NEO file.")
+            self._mmap = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+        header = HEADER.unpack_from(self._mmap)
+        blocks = zip(BLOCKS, header[4::2], header[5::2])
+        if header[0] != MAGIC or any(offset + size > len(self._mmap)
+                                     or size % struct.calcsize(typecode)
+                                     for (_, typecode), offset, size in blocks):
+            # A truncated file's blocks run past its end.
+            self._mmap.close()
+            raise ValueError(f"{path} is not a columnar NEO file.")
+        self.approach_count, self.neo_count, self.string_count = header[1:4]
+
+        view = memoryview(self._mmap)
+        self._views = [view]
+        for (name, typecode), offset, size in zip(BLOCKS, header[4::2], header[5::2]):
+            block = view[offset:offset + size].cast(typecode)
+            if sys.byteorder != 'little' and typecode != 'B':
+                block = array.array(typecode, block)
+                block.byteswap()
+            else:
+                self._views.append(block)
+            setattr(self, '_' + name, block)
+
+        self._neos = {}
+        self._approaches = {}
+        # The `PrefixIndex` of the NEO rows by 'name' and by 'designation', once built.
+        self._prefix_indexes = {}
+        # The `TrigramIndex` of the NEOs' names and of their designations, once built.
+        self._trigram_indexes = {}
+
+    def close(self):
+        """Release the mapped file."""
+        for view in reversed(self._views):
+            view.release()
+        self._mmap.close()
+
+    def _string(self, string_id):
+        """Decode a string from the string table."""
+        return bytes(self._string_data[self._string_start[string_id]:
+                                       self._string_start[string_id + 1]]).decode('utf-8')
+
+    def _approach(self, row):
+        """Fetch (building, if needed) the close approach at a row."""
+        approach = self._approaches.get(row)
+        if approach is None:
+            neo_row = self._approach_neo[row]
+            if neo_row >= 0:
+                # Building the NEO builds and links all of its close approaches.
+                self._neo(neo_row)
+                return self._approaches[row]
+            approach = self._build_approach(row)
+        return approach
+
+    def _build_approach(self, row):
+        """Build an unlinked `CloseApproach` from a row of the approach columns."""
+        approach = CloseApproach(des=self._string(self._approach_des[row]),
+                                 time=EPOCH + self._approach_time[row] * _MINUTE,
+                                 dist=self._approach_dist[row], v_rel=self._approach_vel[row])
+        self._approaches[row] = approach
+        return approach
+
+    def _neo(self, row):
+        """Fetch (building, if needed) the NEO at a row, linked to its close approaches."""
+        neo = self._neos.get(row)
+        if neo is None:
+            name_id = self._neo_name[row]
+            diameter = self._neo_diameter[row]
+            neo = NearEarthObject(pdes=self._string(self._neo_des[row]),
+                                  name=self._string(name_id) if name_id >= 0 else None,
+                                  diameter='' if math.isnan(diameter) else repr(diameter),
+                                  pha='Y' if self._neo_hazardous[row] else 'N')
+            for index in range(self._neo_start[row], self._neo_start[row + 1]):
+                approach_row = self._neo_approach[index]
+                approach = self._approaches.get(approach_row) or self._build_approach(approach_row)
+                approach.neo = neo
+                neo.add_approach(approach)
+            self._neos[row] = neo
+        return neo
+
+    def _find(self, order, column, value):
+        """Binary search for the NEO rows whose string in `column` equals `value`."""
+        keys = _SortedStrings(self, order, column)
+        lo = bisect.bisect_left(keys, value)
+        hi = bisect.bisect_right(keys, value, lo)
+        return [order[index] for index in range(lo, hi)]
+
+    def get_neo_by_designation(self, designation):
+        """Find and return an NEO by its primary designation.
+
+        If no match is found, return `None` instead.
+
+        :param designation: The primary designation of the NEO to search for.
+        :return: The `NearEarthObject` with the desired primary designation, or `None`.
+        """
+        if not designation:
+            return None
+        rows = self._find(self._des_order, self._neo_des, designation)
+        return self._neo(rows[0]) if rows else None
+
+    def get_neo_by_name(self, name):
+        """Find and return an NEO by its name.
+
+        If no match is found, return `None` instead.
+
+        :param name: The name, as a string, of the NEO to search for.
+        :return: The `NearEarthObject` with the desired name, or `None`.
+        """
+        if not (name and name.strip()):
+            return None
+        rows = self._find(self._name_order, self._neo_name, name)
+        # If a name is reused, the last NEO with that name wins, as in `NEODatabase`.
+        return self._neo(max(rows)) if rows else None
+
+    def get_neos_by_name(self, name):
+        """Find and return every NEO with a name, in the order of their rows.
+
+        :param name: The name, as a string, of the NEOs to search for.
+        :return: A list of the `NearEarthObject`s with the desired name, empty if there are none.
+        """
+        if not (name and name.strip()):
+            return []
+        rows = self._find(self._name_order, self._neo_name, name)
+        return [self._neo(row) for row in sorted(rows)]
+
+    def _prefix_index(self, by):
+        """Return the `PrefixIndex` of the NEO rows by 'name' or 'designation', building it once."""
+        index = self._prefix_indexes.get(by)
+        if index is None:
+            if by == 'name':
+                pairs = ((self._string(self._neo_name[row]), row) for row in range(self.neo_count)
+                         if self._neo_name[row] >= 0)
+            else:
+                pairs = ((self._string(self._neo_des[row]), row) for row in range(self.neo_count))
+            index = self._prefix_indexes[by] = PrefixIndex(pairs)
+        return index
+
+    def find_neos(self, pattern, by='name'):
+        """Find the NEOs whose name (or designation) matches a pattern, ignoring case.
+
+        :param pattern: The pattern to match, as for `NEODatabase.find_neos`.
+        :param by: Whether to match the NEOs' 'name' or their 'designation'.
+        :return: A list of the matching `NearEarthObject`s, in order of name (or designation).
+        """
+        if not (pattern and pattern.strip()):
+            return []
+        return [self._neo(row) for row in self._prefix_index(by).search(pattern)]
+
+    def complete_neos(self, prefix, by='name', limit=COMPLETION_LIMIT):
+        """List the names (or designations) that start with a prefix, ignoring case.
+
+        :param prefix: The start of a name or designation.
+        :param by: Whether to list the NEOs' 'name's or their 'designation's.
+        :param limit: The most names to list, or `None` for all of them.
+        :return: A sorted list of names or designations.
+        """
+        return self._prefix_index(by).complete(prefix, limit)
+
+    def suggest_neos(self, key, by='name', limit=SUGGESTION_LIMIT):
+        """Suggest the names (or designations) most similar to a misspelled one.
+
+        :param key: A name or designation that matched no NEO.
+        :param by: Whether to suggest the NEOs' 'name's or their 'designation's.
+        :param limit: The most names to suggest.
+        :return: A list of names or designations, most similar first.
+        """
+        index = self._trigram_indexes.get(by)
+        if index is None:
+            keys = self._prefix_index(by).complete('', None)
+            index = self._trigram_indexes[by] = TrigramIndex(keys)
+        return index.suggest(key.rstrip(WILDCARD), limit)
+
+    def _time_range(self, filters):
+        """Narrow the rows to scan with the date filters, by bisecting the sorted time column.
+
+        :param filters: A collection of filters.
+        :return: A tuple of the first and past-the-end rows, and the filters not yet applied.
+        """
+        lo, hi = 0, self.approach_count
+        remaining = []
+        for filter_func in filters:
+            if type(filter_func) is not DateFilter or filter_func.op is operator.ne:
+                remaining.append(filter_func)
+                continue
+            start = _to_minutes(filter_func.value)
+            end = start + 24 * 60
+            op = filter_func.op
+            if op in (operator.eq, operator.ge):
+                lo = max(lo, bisect.bisect_left(self._approach_time, start))
+            if op is operator.gt:
+                lo = max(lo, bisect.bisect_left(self._approach_time, end))
+            if op in (operator.eq, operator.le):
+                hi = min(hi, bisect.bisect_left(self._approach_time, end))
+            if op is operator.lt:
+                hi = min(hi, bisect.bisect_left(self._approach_time, start))
+        return lo, hi, remaining
+
+    def _column_predicate(self, filter_func):
+        """Build a predicate on an approach row for a filter, or return `None` if there isn't one."""
+        op, value = filter_func.op, filter_func.value
+        kind = type(filter_func)
+        if kind is DistanceFilter:
+            column = self._approach_dist
+        elif kind is VelocityFilter:
+            column = self._approach_vel
+        elif kind is DiameterFilter:
+            diameters, neo_rows = self._neo_diameter, self._approach_neo
+
+            def predicate(row):
+                neo_row = neo_rows[row]
+                # As in `AttributeFilter`, an unknown (NaN) diameter never matches.
+                return neo_row >= 0 and diameters[neo_row] == diameters[neo_row] \
+                    and op(diameters[neo_row], value)
+            return predicate
+        elif kind is HazardousFilter:
+            hazardous, neo_rows = self._neo_hazardous, self._approach_neo
+
+            def predicate(row):
+                neo_row = neo_rows[row]
+                return op(neo_row >= 0 and bool(hazardous[neo_row]), value)
+            return predicate
+        else:
+            return None
+        return lambda row: op(column[row], value)
+
+    def query(self, filters=()):
+        """Query close approaches to generate those that match a collection of filters.
+
+        This generates a stream of `CloseApproach` objects that match all of the
+        provided filters, in time order.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :return: A stream of matching `CloseApproach` objects.
+        """
+        lo, hi, remaining = self._time_range(filters)
+        predicates = []
+        object_filters = []
+        for filter_func in remaining:
+            predicate = self._column_predicate(filter_func)
+            if predicate is None:
+                object_filters.append(filter_func)
+            else:
+                predicates.append(predicate)
+
+        if instrumentation.listeners:
+            yield from self._measured_scan(lo, hi, predicates, object_filters, filters)
+            return
+        for row in range(lo, hi):
+            if all(predicate(row) for predicate in predicates):
+                approach = self._approach(row)
+                if all(filter_func(approach) for filter_func in object_filters):
+                    yield approach
+
+    def _measured_scan(self, lo, hi, predicates, object_filters, filters):
+        """Scan rows like `query`, reporting the query and its use of the object cache to listeners.
+
+        :param lo: The first row to scan.
+        :param hi: The row past the last row to scan.
+        :param predicates: The predicates on the rows' columns.
+        :param object_filters: The filters to check the built close approaches against.
+        :param filters: All of the query's filters, to report to the listeners.
+        :yield: Each matching `CloseApproach`.
+        """
+        scanned = matched = hits = built = 0
+        start = time.perf_counter()
+        try:
+            for row in range(lo, hi):
+                scanned += 1
+                if all(predicate(row) for predicate in predicates):
+                    built += 1
+                    hits += row in self._approaches
+                    approach = self._approach(row)
+                    if all(filter_func(approach) for filter_func in object_filters):
+                        matched += 1
+                        yield approach
+        finally:
+            instrumentation.notify('query_finished', self, filters, scanned, matched,
+                                   time.perf_counter() - start)
+            instrumentation.notify('cache_used', self, 'objects', hits, built - hits)
+
+
+def convert(neo_csv_path, cad_json_path, path):
+    """Convert the data files into a columnar binary file.
+
+    :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :param path: A Path-like object pointing to where the columnar file should be saved.
+    """
+    write_columnar(load_neos(neo_csv_path), load_approaches(cad_json_path), path)
@@ -0,0 +1,151 @@
+"""Open data files through the standard library's compressors.
+
+A file whose name ends with `.gz`, `.bz2` or `.xz` is read or written through
+`gzip`, `bz2` or `lzma` respectively. Data is streamed through the compressor,
+so a compressed file is never inflated into memory or onto disk.
+
+The `split_suffix` function separates a path's format suffix (such as `.csv`)
+from its compression suffix (such as `.gz`), and the `open_compressed` function
+opens a compressed file in text mode.
+
+When writing, `open_compressed` can optionally run the compressor in a
+background thread. Serialization then continues on the calling thread while
+earlier output is being compressed; the compressors release the GIL while they
+work, so the two genuinely overlap.
+"""
+import bz2
+import gzip
+import io
+import lzma
+import pathlib
+import queue
+import threading
+
+
+# Map each compression suffix to a function that opens a binary file object,
+# given a path, a mode and an optional compression level.
+COMPRESSORS = {
+    '.gz': lambda path, mode, level: gzip.open(path, mode, compresslevel=9 if level is None else level),
+    '.bz2': lambda path, mode, level: bz2.open(path, mode, compresslevel=9 if level is None else level),
+    '.xz': lambda path, mode, level: lzma.open(path, mode, preset=level),
+}
+
+# The compression levels that every compressor accepts, from fastest to smallest.
+COMPRESSION_LEVELS = range(1, 10)
+
+# The size, in bytes, of the text buffer in front of a compressor.
+BUFFER_SIZE = 1 << 20
+
+# The number of buffered chunks that may wait for a background compressor.
+QUEUE_DEPTH = 8
+
+
+def split_suffix(path):
+    """Split a path's suffixes into a format suffix and a compression suffix.
+
+    For example, `results.csv.gz` splits into `('.csv', '.gz')` and
+    `results.json` splits into `('.json', None)`.
+
+    :param path: A Path-like object.
+    :return: A tuple of the format suffix and the compression suffix (or `None`).
+    """
+    path = pathlib.PurePath(str(path))
+    if path.suffix in COMPRESSORS:
+        return pathlib.PurePath(path.stem).suffix, path.suffix
+    return path.suffix, None
+
+
+def is_compressed(path):
+    """Return whether a path names a compressed file, judging by its suffix.
+
+    :param path: A Path-like object.
+    :return: `True` if the path ends with a known compression suffix.
+    """
+    return split_suffix(path)[1] is not None
+
+
+def open_compressed(path, mode='rt', level=None, newline=None, threaded=False,
+                    buffer_size=BUFFER_SIZE):
+    """Open a compressed file in text mode, choosing the compressor by suffix.
+
+    :param path: A Path-like object ending with a known compression suffix.
+    :param mode: One of 'rt' to read, 'wt' to write or 'at' to append.
+    :param level: The compression level, or `None` for the compressor's default.
+    :param newline: Passed to the text layer, as for `open`.
+    :param threaded: When writing, whether to compress in a background thread.
+    :param buffer_size: When writing, the size of the buffer in front of the compressor.
+    :return: A text file object.
+    :raises ValueError: If the path doesn't end with a known compression suffix.
+    """
+    _, compression = split_suffix(path)
+    if compression is None:
+        raise ValueError(f"{path} doesn't end with a known compression suffix "
+                         f"({', '.join(COMPRESSORS)}).")
+    binary_mode = mode.replace('t', '') + 'b'
+    compressed = COMPRESSORS[compression](path, binary_mode, level)
+    if threaded and 'r' not in mode:
+        compressed = io.BufferedWriter(_BackgroundWriter(compressed), buffer_size=buffer_size)
+    elif 'r' not in mode:
+        compressed = io.BufferedWriter(compressed, buffer_size=buffer_size)
+    return io.TextIOWrapper(compressed, encoding='utf-8', newline=newline)
+
+
+class _BackgroundWriter(io.RawIOBase):
+    """A raw, write-only stream that hands its data to a background thread.
+
+    Each chunk written to this stream is queued and written to the wrapped
+    binary file by a worker thread. The queue is bounded, so a slow compressor
+    applies backpressure instead of letting output accumulate in memory.
+
+    Closing this stream waits for the queued chunks to be written, closes the
+    wrapped file, and re-raises any error that occurred in the worker.
+    """
+    def __init__(self, raw):
+        """Create a new `_BackgroundWriter` and start its worker thread.
+
+        :param raw: A binary file object, opened for writing.
+        """
+        super().__init__()
+        self._raw = raw
+        self._queue = queue.Queue(maxsize=QUEUE_DEPTH)
+        self._error = None
+        self._thread = threading.Thread(target=self._work, daemon=True)
+        self._thread.start()
+
+    def _work(self):
+        """Write queued chunks to the wrapped file until the `None` sentinel arrives."""
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                return
+            if self._error is None:
+                try:
+                    self._raw.write(chunk)
+                except Exception as err:
+                    self._error = err
+
+    def writable(self):
+        """Return whether this stream supports writing, which it does."""
+        return True
+
+    def write(self, data):
+        """Queue a chunk of data to be written by the worker thread.
+
+        :param data: A bytes-like object.
+        :return: The number of bytes accepted.
+        """
+        if self._error is not None:
+            raise self._error
+        self._queue.put(bytes(data))
+        return len(data)
+
+    def close(self):
+        """Wait for the worker to drain the queue, then close the wrapped file."""
+        if self.closed:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._raw.close()
+        super().close()
+        if self._error is not None:
+            raise self._error
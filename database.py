@@ -1,5 +1,20 @@
-import json
-from datetime import datetime
+import bisect
+import datetime
+import operator
+import time
+
+import instrumentation
+from filters import (DateFilter, NEODiameterFilter, NEOHazardousFilter, ApproachCountFilter,
+                     ClosestApproachFilter)
+from indexes import (PrefixIndex, TrigramIndex, COMPLETION_LIMIT, SUGGESTION_LIMIT,
+                     WILDCARD)
+from models import approach_key
+
+
+# The classes of NEO filters that `query_neos` answers by bisecting a sorted index of the NEOs.
+NEO_INDEXED_FILTERS = (NEODiameterFilter, NEOHazardousFilter, ApproachCountFilter,
+                       ClosestApproachFilter)
+
 
 class NEODatabase:
     """A database of near-Earth objects and their close approaches.
@@ -8,6 +23,16 @@ class NEODatabase:
     approaches. It additionally maintains a few auxiliary data structures to
     help fetch NEOs by primary designation or by name and to help speed up
     querying for close approaches that match criteria.
+
+    Close approaches are kept in time order, so that date filters can bisect
+    them instead of scanning every approach. New NEOs and close approaches can
+    be merged in later with `add_neos` and `add_approaches`, which keep every
+    index up to date.
+
+    NEOs can also be found by names and designations that differ in case, or
+    by their start, with `find_neos`, which uses a trie of the names or of the
+    designations, built on its first use. `suggest_neos` suggests the names or
+    designations closest to a misspelled one, with an index of their trigrams.
     """
     def __init__(self, neos, approaches):
         """Create a new `NEODatabase`.
@@ -27,12 +52,29 @@ class NEODatabase:
         :param neos: A collection of `NearEarthObject`s.
         :param approaches: A collection of `CloseApproach`es.
         """
-        self._neos = neos
-        self._approaches = approaches
+        self._neos = list(neos)
+        # Sorting is stable, so approaches at the same time keep their order.
+        self._approaches = sorted(approaches, key=lambda approach: approach.time)
+        self._times = [approach.time for approach in self._approaches]
+        self._approach_keys = {approach_key(approach) for approach in self._approaches}
 
         self._neos_by_designation = {neo.designation: neo for neo in self._neos}
-        
-        self._neos_by_name = {neo.name: neo for neo in self._neos if neo.name}
+        # Some IAU names are reused for several NEOs, so each name maps to a list of NEOs.
+        self._neos_by_name = {}
+        for neo in self._neos:
+            if neo.name:
+                self._neos_by_name.setdefault(neo.name, []).append(neo)
+
+        # Approaches whose NEO isn't known (yet), by designation, for `add_neos` to link.
+        self._unlinked = {}
+
+        # The `PrefixIndex` of the NEOs by 'name' and by 'designation', once built.
+        self._prefix_indexes = {}
+        # The `TrigramIndex` of the NEOs' names and of their designations, once built.
+        self._trigram_indexes = {}
+        # For each class of `NEO_INDEXED_FILTERS`, the sorted values of its attribute over
+        # the NEOs and the NEOs' positions in that order, once built; cleared by any change.
+        self._neo_indexes = {}
 
         for approach in self._approaches:
             neo_designation = approach._designation
@@ -41,7 +83,78 @@ class NEODatabase:
             
             if neo:
                 approach.neo = neo
-                neo.approaches.append(approach)
+                neo.add_approach(approach)
+            else:
+                self._unlinked.setdefault(neo_designation, []).append(approach)
+
+    def add_neos(self, neos):
+        """Merge new near-Earth objects into the database.
+
+        An NEO whose primary designation is already known is skipped. A new NEO
+        is linked to any known close approaches that refer to it.
+
+        :param neos: An iterable of unlinked `NearEarthObject`s.
+        :return: The number of NEOs that were added.
+        """
+        added = 0
+        for neo in neos:
+            if neo.designation in self._neos_by_designation:
+                continue
+            self._neos.append(neo)
+            self._neos_by_designation[neo.designation] = neo
+            if neo.name:
+                self._neos_by_name.setdefault(neo.name, []).append(neo)
+            for by, index in self._prefix_indexes.items():
+                index.add(getattr(neo, by), neo)
+            for by, index in self._trigram_indexes.items():
+                index.add(getattr(neo, by))
+            for approach in self._unlinked.pop(neo.designation, ()):
+                approach.neo = neo
+                neo.add_approach(approach)
+            added += 1
+        if added:
+            self._neo_indexes = {}
+        return added
+
+    def add_approaches(self, approaches):
+        """Merge new close approaches into the database.
+
+        A close approach that's already known - with the same designation and
+        Julian date - is skipped. Each new approach is linked to its NEO, and
+        inserted in time order both in the database and in its NEO's
+        `.approaches`.
+
+        :param approaches: An iterable of unlinked `CloseApproach`es.
+        :return: The number of close approaches that were added.
+        """
+        new = []
+        for approach in approaches:
+            key = approach_key(approach)
+            if key not in self._approach_keys:
+                self._approach_keys.add(key)
+                new.append(approach)
+        new.sort(key=lambda approach: approach.time)
+
+        if new and self._times and new[0].time < self._times[-1]:
+            # Timsort merges the two sorted runs in linear time.
+            self._approaches.extend(new)
+            self._approaches.sort(key=lambda approach: approach.time)
+            self._times = [approach.time for approach in self._approaches]
+        else:
+            # The common case: the new approaches all come after the known ones.
+            self._approaches.extend(new)
+            self._times.extend(approach.time for approach in new)
+
+        for approach in new:
+            neo = self._neos_by_designation.get(approach._designation)
+            if not neo:
+                self._unlinked.setdefault(approach._designation, []).append(approach)
+                continue
+            approach.neo = neo
+            neo.add_approach(approach)
+        if new:
+            self._neo_indexes = {}
+        return len(new)
 
     def get_neo_by_designation(self, designation):
         """Find and return an NEO by its primary designation.
@@ -69,14 +182,76 @@ class NEODatabase:
         The matching is exact - check for spelling and capitalization if no
         match is found.
 
+        Some names are reused for several NEOs; the last of them wins. Use
+        `get_neos_by_name` to find all of them.
+
         :param name: The name, as a string, of the NEO to search for.
         :return: The `NearEarthObject` with the desired name, or `None`.
         """
-    
         if name and name.strip():
-            return self._neos_by_name.get(name)
+            neos = self._neos_by_name.get(name)
+            if neos:
+                return neos[-1]
         return None
 
+    def get_neos_by_name(self, name):
+        """Find and return every NEO with a name, in the order they were loaded.
+
+        The matching is exact, as for `get_neo_by_name`.
+
+        :param name: The name, as a string, of the NEOs to search for.
+        :return: A list of the `NearEarthObject`s with the desired name, empty if there are none.
+        """
+        if name and name.strip():
+            return list(self._neos_by_name.get(name, ()))
+        return []
+
+    def _prefix_index(self, by):
+        """Return the `PrefixIndex` of the NEOs by 'name' or 'designation', building it once."""
+        index = self._prefix_indexes.get(by)
+        if index is None:
+            index = self._prefix_indexes[by] = PrefixIndex((getattr(neo, by), neo)
+                                                           for neo in self._neos)
+        return index
+
+    def find_neos(self, pattern, by='name'):
+        """Find the NEOs whose name (or designation) matches a pattern, ignoring case.
+
+        The pattern is a whole name, such as 'halley', or the start of one
+        followed by `*`, such as 'Hal*'.
+
+        :param pattern: The pattern to match.
+        :param by: Whether to match the NEOs' 'name' or their 'designation'.
+        :return: A list of the matching `NearEarthObject`s, in order of name (or designation).
+        """
+        if not (pattern and pattern.strip()):
+            return []
+        return self._prefix_index(by).search(pattern)
+
+    def complete_neos(self, prefix, by='name', limit=COMPLETION_LIMIT):
+        """List the names (or designations) that start with a prefix, ignoring case.
+
+        :param prefix: The start of a name or designation.
+        :param by: Whether to list the NEOs' 'name's or their 'designation's.
+        :param limit: The most names to list, or `None` for all of them.
+        :return: A sorted list of names or designations.
+        """
+        return self._prefix_index(by).complete(prefix, limit)
+
+    def suggest_neos(self, key, by='name', limit=SUGGESTION_LIMIT):
+        """Suggest the names (or designations) most similar to a misspelled one.
+
+        :param key: A name or designation that matched no NEO.
+        :param by: Whether to suggest the NEOs' 'name's or their 'designation's.
+        :param limit: The most names to suggest.
+        :return: A list of names or designations, most similar first.
+        """
+        index = self._trigram_indexes.get(by)
+        if index is None:
+            keys = self._prefix_index(by).complete('', None)
+            index = self._trigram_indexes[by] = TrigramIndex(keys)
+        return index.suggest(key.rstrip(WILDCARD), limit)
+
     def query(self, filters=()):
         """Query close approaches to generate those that match a collection of filters.
 
@@ -85,13 +260,174 @@ class NEODatabase:
 
         If no arguments are provided, generate all known close approaches.
 
-        The `CloseApproach` objects are generated in internal order, which isn't
-        guaranteed to be sorted meaningfully, although is often sorted by time.
+        The `CloseApproach` objects are generated in time order. Date filters
+        are applied by bisecting the approaches' times, so only the approaches
+        within the requested dates are scanned. While an instrumentation
+        listener is registered, the scan is counted and reported to it.
 
         :param filters: A collection of filters capturing user-specified criteria.
         :return: A stream of matching `CloseApproach` objects.
         """
-        for approach in self._approaches:
-            if all(filter_func(approach) for filter_func in filters):
+        lo, hi, remaining = self._time_range(filters)
+        if instrumentation.listeners:
+            yield from self._measured_scan(lo, hi, remaining, filters)
+            return
+        approaches = self._approaches
+        for index in range(lo, hi):
+            approach = approaches[index]
+            if all(filter_func(approach) for filter_func in remaining):
                 yield approach
 
+    def _measured_scan(self, lo, hi, remaining, filters):
+        """Scan approaches like `query`, reporting how many were scanned and matched to listeners.
+
+        The counts are reported when the stream is exhausted or closed (e.g. by `limit`).
+
+        :param lo: The index of the first approach to scan.
+        :param hi: The index past the last approach to scan.
+        :param remaining: The filters to check each approach against.
+        :param filters: All of the query's filters, to report to the listeners.
+        :yield: Each matching `CloseApproach`.
+        """
+        approaches = self._approaches
+        scanned = matched = 0
+        start = time.perf_counter()
+        try:
+            for index in range(lo, hi):
+                approach = approaches[index]
+                scanned += 1
+                if all(filter_func(approach) for filter_func in remaining):
+                    matched += 1
+                    yield approach
+        finally:
+            instrumentation.notify('query_finished', self, filters, scanned, matched,
+                                   time.perf_counter() - start)
+
+    def query_neos(self, filters=()):
+        """Query NEOs to generate those that match a collection of NEO filters.
+
+        The filters are those of `create_neo_filters`, on an NEO's diameter,
+        hazardousness, number of close approaches and closest approach
+        distance. The NEOs are generated in the order they were loaded.
+
+        Each of these attributes has a sorted index of the NEOs, built on its
+        first use, and the most selective of the filters' ranges is found by
+        bisecting its index, so only the NEOs within that range are checked
+        against the other filters. While an instrumentation listener is
+        registered, the scan is counted and reported to it.
+
+        :param filters: A collection of NEO filters capturing user-specified criteria.
+        :return: A stream of matching `NearEarthObject`s.
+        """
+        positions, remaining = self._neo_candidates(filters)
+        if instrumentation.listeners:
+            yield from self._measured_neo_scan(positions, remaining, filters)
+            return
+        neos = self._neos
+        for position in positions:
+            neo = neos[position]
+            if all(filter_func(neo) for filter_func in remaining):
+                yield neo
+
+    def _measured_neo_scan(self, positions, remaining, filters):
+        """Scan NEOs like `query_neos`, reporting how many were scanned and matched to listeners.
+
+        :param positions: The positions of the NEOs to scan.
+        :param remaining: The filters to check each NEO against.
+        :param filters: All of the query's filters, to report to the listeners.
+        :yield: Each matching `NearEarthObject`.
+        """
+        neos = self._neos
+        scanned = matched = 0
+        start = time.perf_counter()
+        try:
+            for position in positions:
+                neo = neos[position]
+                scanned += 1
+                if all(filter_func(neo) for filter_func in remaining):
+                    matched += 1
+                    yield neo
+        finally:
+            instrumentation.notify('query_finished', self, filters, scanned, matched,
+                                   time.perf_counter() - start)
+
+    def _neo_index(self, filter_class):
+        """Return the sorted index of the NEOs for a class of NEO filter, building it if needed.
+
+        NEOs whose attribute is unknown (`None` or NaN) never match such a
+        filter, so they're left out of the index.
+
+        :param filter_class: One of `NEO_INDEXED_FILTERS`.
+        :return: A tuple of the sorted values and the positions of their NEOs.
+        """
+        index = self._neo_indexes.get(filter_class)
+        if index is None:
+            pairs = ((filter_class.get(neo), position) for position, neo in enumerate(self._neos))
+            pairs = sorted((value, position) for value, position in pairs
+                           if value is not None and value == value)
+            index = self._neo_indexes[filter_class] = ([value for value, _ in pairs],
+                                                      [position for _, position in pairs])
+        return index
+
+    def _neo_candidates(self, filters):
+        """Narrow the NEOs to scan to the smallest range of a sorted index that the filters allow.
+
+        :param filters: A collection of NEO filters.
+        :return: A tuple of the sorted positions of the NEOs to scan, and the filters not yet
+                 applied.
+        """
+        ranges = {}
+        remaining = []
+        for filter_func in filters:
+            filter_class, op = type(filter_func), filter_func.op
+            if filter_class not in NEO_INDEXED_FILTERS or op is operator.ne:
+                remaining.append(filter_func)
+                continue
+            values, _ = self._neo_index(filter_class)
+            lo, hi = ranges.get(filter_class, (0, len(values)))
+            if op in (operator.eq, operator.ge):
+                lo = max(lo, bisect.bisect_left(values, filter_func.value))
+            if op is operator.gt:
+                lo = max(lo, bisect.bisect_right(values, filter_func.value))
+            if op in (operator.eq, operator.le):
+                hi = min(hi, bisect.bisect_right(values, filter_func.value))
+            if op is operator.lt:
+                hi = min(hi, bisect.bisect_left(values, filter_func.value))
+            ranges[filter_class] = (lo, hi)
+        if not ranges:
+            return range(len(self._neos)), remaining
+
+        # Scan the narrowest range, and check the filters of the other indexes on its NEOs.
+        sizes = {filter_class: hi - lo for filter_class, (lo, hi) in ranges.items()}
+        narrowest = min(sizes, key=sizes.get)
+        remaining.extend(filter_func for filter_func in filters
+                         if type(filter_func) in ranges and type(filter_func) is not narrowest
+                         and filter_func.op is not operator.ne)
+        lo, hi = ranges[narrowest]
+        return sorted(self._neo_index(narrowest)[1][lo:hi]), remaining
+
+    def _time_range(self, filters):
+        """Narrow the approaches to scan with the date filters, by bisecting their times.
+
+        :param filters: A collection of filters.
+        :return: A tuple of the first and past-the-end indexes, and the filters not yet applied.
+        """
+        lo, hi = 0, len(self._times)
+        remaining = []
+        for filter_func in filters:
+            if type(filter_func) is not DateFilter or filter_func.op is operator.ne:
+                remaining.append(filter_func)
+                continue
+            start = datetime.datetime.combine(filter_func.value, datetime.time())
+            end = start + datetime.timedelta(days=1)
+            op = filter_func.op
+            if op in (operator.eq, operator.ge):
+                lo = max(lo, bisect.bisect_left(self._times, start))
+            if op is operator.gt:
+                lo = max(lo, bisect.bisect_left(self._times, end))
+            if op in (operator.eq, operator.le):
+                hi = min(hi, bisect.bisect_left(self._times, end))
+            if op is operator.lt:
+                hi = min(hi, bisect.bisect_left(self._times, start))
+        return lo, hi, remaining
+
@@ -0,0 +1,103 @@
+"""Compare two close approach data sets, such as successive NASA extracts.
+
+The `diff_approaches` function joins the close approaches of an old and a new
+data file on their NEO's primary designation and their approach time, and
+produces an `ApproachChange` for each close approach that was added, removed,
+or whose distance or velocity was revised.
+
+The join is a hash join: the old file is read into a dictionary keyed by
+designation and time, and the new file is streamed past it, so only the old
+file is ever held in memory. Close approaches are matched by their time to the
+minute, as printed in `cd`, rather than by their Julian date, so that an orbit
+solution that nudges the Julian date by a few seconds is a revision, not a
+removal and an addition.
+
+The main module writes the changes with the `write_diff_*` functions of the
+`write` module.
+"""
+from extract import iter_approaches
+
+
+# The kinds of change, in the order in which `diff_approaches` produces them.
+ADDED = 'added'
+CHANGED = 'changed'
+REMOVED = 'removed'
+
+
+def join_key(approach):
+    """Return the key on which close approaches of two data sets are joined.
+
+    :param approach: A `CloseApproach`.
+    :return: A tuple of the NEO's primary designation and the approach time.
+    """
+    return approach._designation, approach.time
+
+
+class ApproachChange:
+    """A difference between the old and the new version of a close approach.
+
+    Exactly one of `old` and `new` is `None` for an addition or a removal; both
+    are set for a revision.
+    """
+    __slots__ = ('change', 'old', 'new')
+
+    def __init__(self, change, old=None, new=None):
+        """Create a new `ApproachChange`.
+
+        :param change: One of `ADDED`, `CHANGED` or `REMOVED`.
+        :param old: The `CloseApproach` in the old data set, if any.
+        :param new: The `CloseApproach` in the new data set, if any.
+        """
+        self.change = change
+        self.old = old
+        self.new = new
+
+    @property
+    def approach(self):
+        """The latest version of the close approach."""
+        return self.new if self.new is not None else self.old
+
+    def __str__(self):
+        """Return `str(self)`."""
+        approach = self.approach
+        text = (f"{self.change.capitalize()}: at {approach.time_str}, '{approach._designation}' "
+                f"at {approach.distance:.2f} au and {approach.velocity:.2f} km/s")
+        if self.change == CHANGED:
+            text += (f" (was {self.old.distance:.2f} au and {self.old.velocity:.2f} km/s)")
+        return text + '.'
+
+    def __repr__(self):
+        """Return `repr(self)`, a computer-readable string representation of this object."""
+        return f"ApproachChange({self.change!r}, old={self.old!r}, new={self.new!r})"
+
+
+def diff_approaches(old_approaches, new_approaches):
+    """Compare the close approaches of two data sets.
+
+    Additions and revisions are produced while `new_approaches` is streamed, in
+    its order; removals are produced at the end, in the order of `old_approaches`.
+    A close approach whose distance and velocity are unchanged isn't produced.
+
+    :param old_approaches: An iterable of the old data set's `CloseApproach`es.
+    :param new_approaches: An iterable of the new data set's `CloseApproach`es.
+    :yield: An `ApproachChange` for each difference.
+    """
+    old = {join_key(approach): approach for approach in old_approaches}
+    for approach in new_approaches:
+        previous = old.pop(join_key(approach), None)
+        if previous is None:
+            yield ApproachChange(ADDED, new=approach)
+        elif previous.distance != approach.distance or previous.velocity != approach.velocity:
+            yield ApproachChange(CHANGED, previous, approach)
+    for approach in old.values():
+        yield ApproachChange(REMOVED, old=approach)
+
+
+def diff_files(old_cad_json_path, new_cad_json_path):
+    """Compare the close approaches of two data files.
+
+    :param old_cad_json_path: A path (or a list of paths) to the old close approach data.
+    :param new_cad_json_path: A path (or a list of paths) to the new close approach data.
+    :return: A stream of `ApproachChange`s, as from `diff_approaches`.
+    """
+    return diff_approaches(iter_approaches(old_cad_json_path), iter_approaches(new_cad_json_path))
@@ -7,59 +7,364 @@ The `load_approaches` function extracts close approach data from a JSON file,
 formatted as described in the project instructions, into a collection of
 `CloseApproach` objects.
 
+Either file may be compressed with gzip, bz2 or xz (e.g. `neos.csv.gz` or
+`cad.json.xz`), in which case it is decompressed on the fly. The JSON file is
+parsed incrementally by `iter_cad_rows`, one close approach at a time, so the
+full document is never held in memory as text.
+
+The `iter_neos` and `iter_approaches` functions produce the same objects as a
+stream, for callers that don't need to hold them all at once.
+
+Close approach data may be split across several JSON files (e.g. one per
+decade, or one per API pull). Given a list of paths, `load_approaches` streams
+the files through a k-way merge on approach time, and drops the close
+approaches that appear in more than one file.
+
+For a one-off query, the filters on close approaches can be pushed down into
+`load_approaches`: the date, distance and velocity filters are evaluated on each
+raw row, and rows that don't match are never turned into `CloseApproach`es.
+
 The main module calls these functions with the arguments provided at the command
 line, and uses the resulting collections to build an `NEODatabase`.
 
 You'll edit this file in Task 2.
 """
 import csv
+import glob
+import heapq
 import json
+import pathlib
+import re
 
-from models import NearEarthObject, CloseApproach
+from compression import is_compressed, open_compressed
+from filters import DateFilter, DistanceFilter, VelocityFilter
+from models import NearEarthObject, CloseApproach, approach_key
 
 
-def load_neos(neo_csv_path):
-    """Read near-Earth object information from a CSV file.
+# The number of characters read from the JSON file at a time.
+CHUNK_SIZE = 1 << 20
+
+_WHITESPACE = re.compile(r'\s*')
+# After an array element: either a comma (and any whitespace after it) or the closing bracket.
+_DELIMITER = re.compile(r'\s*(?:,\s*|(\]))')
+
+# Map the English month abbreviations in NASA's `cd` field to two-digit month numbers.
+_MONTHS = {month: f'{number:02}' for number, month in enumerate(
+    ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'), 1)}
+
+
+def open_data_file(path, newline=None):
+    """Open a data file for reading text, decompressing it if its name says so.
+
+    :param path: A path to a data file, optionally ending with `.gz`, `.bz2` or `.xz`.
+    :param newline: Passed to the file object, as for `open`.
+    :return: A text file object.
+    """
+    if is_compressed(path):
+        return open_compressed(path, 'rt', newline=newline)
+    return open(path, 'r', newline=newline)
+
+
+def expand_paths(patterns):
+    """Expand glob patterns into a sorted list of paths.
+
+    A pattern without glob characters (`*`, `?` or `[`) is kept as it is, even
+    if no such file exists, so that opening it reports the missing file.
+
+    :param patterns: An iterable of paths or glob patterns.
+    :return: A list of `pathlib.Path`s, without repeats.
+    :raises ValueError: If a glob pattern doesn't match any file.
+    """
+    paths = []
+    for pattern in map(str, patterns):
+        if glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern))
+            if not matches:
+                raise ValueError(f"No files match {pattern!r}.")
+            paths.extend(matches)
+        else:
+            paths.append(pattern)
+    return [pathlib.Path(path) for path in dict.fromkeys(paths)]
+
+
+def source_signature(path):
+    """Describe a data file by its resolved path, size and modification time.
+
+    Derived files (such as a database or an index built from the data file)
+    can store this signature, and compare it later to tell whether the data
+    file has changed since they were built.
+
+    :param path: A path to a data file, or a list of paths to describe together.
+    :return: A string that changes whenever the file is replaced or modified.
+    """
+    if isinstance(path, (list, tuple)):
+        return ';'.join(map(source_signature, path))
+    path = pathlib.Path(path).resolve()
+    stat = path.stat()
+    return f'{path}:{stat.st_size}:{stat.st_mtime_ns}'
+
+
+def iter_neos(neo_csv_path, designations=None):
+    """Stream near-Earth objects from a CSV file, one row at a time.
 
     :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
-    :return: A collection of `NearEarthObject`s.
+    :param designations: If given, only construct the NEOs with these primary designations.
+    :yield: A `NearEarthObject` for each (selected) row of the file.
+    """
+    with open_data_file(neo_csv_path, newline='') as neo_file:
+        for row in csv.DictReader(neo_file):
+            if designations is None or row['pdes'] in designations:
+                yield NearEarthObject(**row)
+
+
+def _cd_date(calendar_date):
+    """Rewrite the date part of a NASA-formatted `cd` (e.g. '2020-Dec-31 12:00') as '2020-12-31'."""
+    return f'{calendar_date[:4]}-{_MONTHS[calendar_date[5:8]]}-{calendar_date[9:11]}'
+
+
+def _float_or_zero(value):
+    """Convert a raw numeric field to a float, as `CloseApproach` does."""
+    return float(value) if value else 0.0
+
+
+def row_predicate(filters):
+    """Translate filters into a single predicate on raw close approach rows.
+
+    Date filters compare ISO-formatted dates, which sort chronologically, so
+    `cd` is only rewritten, never parsed into a `datetime`. Distance and
+    velocity filters compare the raw numbers. Filters on NEOs (and filters of
+    any other type) can't be judged from a row, so they're left out.
+
+    As with `AttributeFilter`, a row whose value can't be read doesn't match.
+
+    :param filters: A collection of filters, as from `create_filters`.
+    :return: A tuple of the predicate, which takes a row as a dictionary, and a
+             list of the filters it doesn't cover.
     """
-    # TODO: Load NEO data from the given CSV file.
-    neos_list = []
+    tests, remaining = [], []
+    for filter_func in filters:
+        kind, op, value = type(filter_func), filter_func.op, filter_func.value
+        if kind is DateFilter:
+            tests.append((_cd_date, 'cd', op, value.isoformat()))
+        elif kind is DistanceFilter:
+            tests.append((_float_or_zero, 'dist', op, value))
+        elif kind is VelocityFilter:
+            tests.append((_float_or_zero, 'v_rel', op, value))
+        else:
+            remaining.append(filter_func)
+
+    def predicate(row):
+        try:
+            return all(op(convert(row[field]), value) for convert, field, op, value in tests)
+        except (KeyError, TypeError, ValueError):
+            return False
 
-    with open(neo_csv_path,'r') as neo_file:
-        reader  = csv.DictReader(neo_file)
-        for row in reader:
-            #print(type(row))
-            neos_list.append(NearEarthObject(**row))
-            
+    return predicate, remaining
 
 
-    return neos_list
+def iter_approaches(cad_json_path, filters=()):
+    """Stream close approaches from a JSON file, one row at a time.
+
+    :param cad_json_path: A path to a JSON file containing data about close
+                          approaches, or a list of paths to merge with `merge_approaches`.
+    :param filters: A collection of filters; rows that fail any of those that
+                    `row_predicate` covers are skipped without being constructed.
+    :yield: A `CloseApproach` for each (matching) row of the file's data.
+    """
+    if isinstance(cad_json_path, (list, tuple)):
+        yield from merge_approaches(cad_json_path, filters)
+        return
+    predicate, _ = row_predicate(filters)
+    with open_data_file(cad_json_path) as f:
+        for approach_info in iter_cad_rows(f):
+            if predicate(approach_info):
+                yield CloseApproach(**approach_info)
 
 
-def load_approaches(cad_json_path):
+def merge_approaches(cad_json_paths, filters=()):
+    """Stream the close approaches of several JSON files, merged in time order.
+
+    Each file must list its close approaches in time order, as NASA's files do;
+    the files are then read in step with one another, so the merged stream is in
+    time order too, without sorting. A close approach that's in more than one
+    file (with the same designation and Julian date) is produced once. Since
+    repeats share a time, only the keys of the current time are remembered.
+
+    :param cad_json_paths: A list of paths to JSON files containing data about close approaches.
+    :param filters: A collection of filters, as for `iter_approaches`.
+    :yield: A `CloseApproach` for each distinct (matching) row of the files' data.
+    """
+    streams = [iter_approaches(path, filters) for path in cad_json_paths]
+    current, seen = None, set()
+    for approach in heapq.merge(*streams, key=lambda approach: approach.time):
+        if approach.time != current:
+            current, seen = approach.time, set()
+        key = approach_key(approach)
+        if key not in seen:
+            seen.add(key)
+            yield approach
+
+
+def load_neos(neo_csv_path, designations=None):
+    """Read near-Earth object information from a CSV file.
+
+    :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+    :param designations: If given, only construct the NEOs with these primary designations.
+    :return: A collection of `NearEarthObject`s.
+    """
+    return list(iter_neos(neo_csv_path, designations))
+
+
+def load_approaches(cad_json_path, filters=()):
     """Read close approach data from a JSON file.
 
-    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :param cad_json_path: A path to a JSON file containing data about close
+                          approaches, or a list of paths to merge with `merge_approaches`.
+    :param filters: A collection of filters; rows that fail any of those that
+                    `row_predicate` covers are skipped without being constructed.
     :return: A collection of `CloseApproach`es.
     """
-    approaches = []
-    with open(cad_json_path, 'r') as f:
-        raw_data = json.load(f)
+    return list(iter_approaches(cad_json_path, filters))
+
+
+def iter_cad_rows(cad_file, chunk_size=CHUNK_SIZE):
+    """Incrementally parse a close approach JSON document into a stream of rows.
+
+    Each element of the document's "data" list is decoded on its own and
+    produced as a dictionary keyed by the document's "fields". If the "fields"
+    key comes after "data", rows are held back until the fields are known.
+
+    :param cad_file: A text file object containing a close approach JSON document.
+    :param chunk_size: The number of characters to read from the file at a time.
+    :yield: A dictionary mapping field names to values, for each close approach.
+    :raises json.JSONDecodeError: If the document isn't a well-formed JSON object.
+    """
+    reader = _JSONReader(cad_file, chunk_size)
+    fields = None
+    pending = []
+
+    reader.expect('{')
+    more = not reader.next_is('}')
+    while more:
+        key = reader.value()
+        if not isinstance(key, str):
+            raise reader.error("Expecting property name enclosed in double quotes")
+        reader.expect(':')
+        if key == 'data':
+            for row in reader.array():
+                if fields is None:
+                    pending.append(row)
+                else:
+                    yield dict(zip(fields, row))
+        else:
+            value = reader.value()
+            if key == 'fields':
+                fields = value
+                for row in pending:
+                    yield dict(zip(fields, row))
+                pending = []
+        more = not reader.next_is('}')
+        if more:
+            reader.expect(',')
+
+    if pending:
+        raise reader.error("The document has data but no fields")
+
+
+class _JSONReader:
+    """A tokenizer that decodes JSON values from a file object, a chunk at a time."""
+    def __init__(self, infile, chunk_size):
+        """Create a new `_JSONReader`.
 
-    fields = raw_data['fields']
-    
-    for approach_data_list in raw_data['data']:
-        approach_info = dict(zip(fields, approach_data_list))
-        
-        approaches.append(CloseApproach(**approach_info))
+        :param infile: A text file object.
+        :param chunk_size: The number of characters to read from the file at a time.
+        """
+        self.infile = infile
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
 
-    return approaches
+    def error(self, message):
+        """Build a `json.JSONDecodeError` at the current position."""
+        return json.JSONDecodeError(message, self.buffer, self.pos)
 
+    def _fill(self):
+        """Discard consumed text and read another chunk from the file."""
+        chunk = self.infile.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
 
+    def _skip_whitespace(self):
+        """Advance past whitespace, reading more of the file as needed."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or self.eof:
+                return
+            self._fill()
 
+    def next_is(self, char):
+        """Consume the next non-whitespace character if it is `char`.
 
+        :param char: A single structural character, such as ',' or ']'.
+        :return: Whether the character was found and consumed.
+        """
+        self._skip_whitespace()
+        if self.buffer.startswith(char, self.pos):
+            self.pos += 1
+            return True
+        return False
 
+    def expect(self, char):
+        """Consume the next non-whitespace character, which must be `char`."""
+        if not self.next_is(char):
+            raise self.error(f"Expecting {char!r}")
 
+    def array(self):
+        """Decode and consume a JSON array, producing its elements one at a time."""
+        self.expect('[')
+        if self.next_is(']'):
+            return
+        scan = self.decoder.scan_once
+        delimiter = _DELIMITER.match
+        while True:
+            buffer, pos = self.buffer, self.pos
+            # Fast path: the element and the delimiter after it are already buffered.
+            try:
+                value, end = scan(buffer, pos)
+            except (StopIteration, json.JSONDecodeError):
+                end = len(buffer)
+            match = delimiter(buffer, end) if end < len(buffer) else None
+            if match:
+                self.pos = match.end()
+                last = match.group(1) is not None
+            else:
+                self._skip_whitespace()
+                if self.buffer.startswith(']', self.pos):
+                    raise self.error("Expecting value")
+                value = self.value()
+                last = self.next_is(']')
+                if not last:
+                    self.expect(',')
+            yield value
+            if last:
+                return
 
+    def value(self):
+        """Decode and consume the next complete JSON value."""
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            else:
+                # A value that ends with the buffer may continue in the next chunk (e.g. `12|34`).
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            self._fill()
@@ -1,6 +1,8 @@
 import operator
+import time
 from datetime import datetime
 
+import instrumentation
 from helpers import datetime_to_str
 
 
@@ -59,6 +61,22 @@ class AttributeFilter:
             
             return False
 
+    # The unmeasured `__call__`, which is restored when the instrumentation hooks are turned off.
+    _evaluate = __call__
+
+    def _measured_call(self, approach):
+        """Invoke `self(approach)`, reporting the evaluation to the instrumentation listeners.
+
+        :param approach: The `CloseApproach` object to evaluate the filter against.
+        :return: `True` if the `CloseApproach` satisfies the filter, `False` otherwise.
+        """
+        start = time.perf_counter()
+        matched = self._evaluate(approach)
+        elapsed = time.perf_counter() - start
+        for listener in instrumentation.filter_listeners:
+            listener.filter_evaluated(self, matched, elapsed)
+        return matched
+
     @classmethod
     def get(cls, approach):
         """Get an attribute of interest from a close approach.
@@ -143,6 +161,63 @@ class HazardousFilter(AttributeFilter):
         return False 
 
 
+class NEODiameterFilter(AttributeFilter):
+    """A filter for the diameter of a `NearEarthObject`, for `NEODatabase.query_neos`."""
+    @classmethod
+    def get(cls, neo):
+        """Get the diameter of an NEO.
+
+        :param neo: A `NearEarthObject` object.
+        :return: The diameter of the NEO (float).
+        """
+        return neo.diameter
+
+
+class NEOHazardousFilter(AttributeFilter):
+    """A filter for whether a `NearEarthObject` is hazardous, for `NEODatabase.query_neos`."""
+    @classmethod
+    def get(cls, neo):
+        """Get the hazardous status of an NEO.
+
+        :param neo: A `NearEarthObject` object.
+        :return: `True` if the NEO is potentially hazardous, `False` otherwise.
+        """
+        return neo.hazardous
+
+
+class ApproachCountFilter(AttributeFilter):
+    """A filter for the number of close approaches of a `NearEarthObject`."""
+    @classmethod
+    def get(cls, neo):
+        """Get the number of known close approaches of an NEO.
+
+        :param neo: A `NearEarthObject` object.
+        :return: The number of close approaches (int).
+        """
+        return neo.approach_count
+
+
+class ClosestApproachFilter(AttributeFilter):
+    """A filter for the nominal distance of the closest approach of a `NearEarthObject`."""
+    @classmethod
+    def get(cls, neo):
+        """Get the nominal distance of an NEO's closest approach.
+
+        :param neo: A `NearEarthObject` object.
+        :return: The smallest nominal approach distance (float), or `None` if the NEO has no
+                 known close approaches.
+        """
+        return neo.closest_approach.distance if neo.closest_approach else None
+
+
+def _instrument_filters(on):
+    """Swap the measured `AttributeFilter.__call__` in or out, for the instrumentation hooks."""
+    AttributeFilter.__call__ = AttributeFilter._measured_call if on else AttributeFilter._evaluate
+
+
+instrumentation.add_switch(_instrument_filters)
+
+
 def create_filters(
         date=None, start_date=None, end_date=None,
         distance_min=None, distance_max=None,
@@ -218,6 +293,46 @@ def create_filters(
     return filters
 
 
+def create_neo_filters(
+        diameter_min=None, diameter_max=None,
+        hazardous=None,
+        approaches_min=None, approaches_max=None,
+        distance_min=None, distance_max=None
+):
+    """Create a collection of filters on NEOs from user-specified criteria.
+
+    These are the criteria of the `query-neos` subcommand, and the filters are
+    compatible with the `query_neos` method of `NEODatabase`. The distances
+    apply to each NEO's closest approach: `distance_max=0.05` selects the NEOs
+    that come within 0.05 au of Earth at least once.
+
+    :param diameter_min: A minimum diameter of a matching NEO.
+    :param diameter_max: A maximum diameter of a matching NEO.
+    :param hazardous: Whether a matching NEO is potentially hazardous.
+    :param approaches_min: A minimum number of close approaches of a matching NEO.
+    :param approaches_max: A maximum number of close approaches of a matching NEO.
+    :param distance_min: A minimum nominal distance of a matching NEO's closest approach.
+    :param distance_max: A maximum nominal distance of a matching NEO's closest approach.
+    :return: A collection of filters for use with `query_neos`.
+    """
+    filters = []
+    if diameter_min is not None:
+        filters.append(NEODiameterFilter(operator.ge, float(diameter_min)))
+    if diameter_max is not None:
+        filters.append(NEODiameterFilter(operator.le, float(diameter_max)))
+    if hazardous is not None:
+        filters.append(NEOHazardousFilter(operator.eq, hazardous))
+    if approaches_min is not None:
+        filters.append(ApproachCountFilter(operator.ge, int(approaches_min)))
+    if approaches_max is not None:
+        filters.append(ApproachCountFilter(operator.le, int(approaches_max)))
+    if distance_min is not None:
+        filters.append(ClosestApproachFilter(operator.ge, float(distance_min)))
+    if distance_max is not None:
+        filters.append(ClosestApproachFilter(operator.le, float(distance_max)))
+    return filters
+
+
 def limit(iterator, n=None):
     """Produce a limited stream of values from an iterator.
 
@@ -0,0 +1,225 @@
+"""Look up NEOs by partial or misspelled names and designations, ignoring case.
+
+A `PrefixIndex` is a trie over the case-folded keys (names or primary
+designations) of a collection of values (NEOs, or whatever a database uses to
+build them). Looking up a key, exactly or as a prefix, walks one node per
+character of the key, however many keys are indexed; listing the keys or values
+under a prefix then only visits the part of the trie below it.
+
+A search pattern that ends with `*` matches every key that starts with the rest
+of the pattern, so that `Hal*` matches 'Halley'; any other pattern must match a
+whole key. Either way, case is ignored, so that `halley` matches 'Halley' too.
+
+A `TrigramIndex` suggests the keys closest to one that matched nothing, for a
+"did you mean" hint. It maps each trigram (three consecutive characters) of the
+case-folded keys to the keys that contain it, so that only the keys sharing a
+trigram with the misspelled one are scored, by the share of their trigrams they
+have in common with it.
+
+The databases build their indexes lazily, on the first search, so that loading
+the data - e.g. for a query - doesn't pay for them.
+"""
+import collections
+import heapq
+
+
+# The most keys that completing a prefix produces.
+COMPLETION_LIMIT = 100
+
+# The most keys that a "did you mean" hint suggests.
+SUGGESTION_LIMIT = 5
+
+# The least similarity, from 0 to 1, of a key to suggest.
+SIMILARITY_THRESHOLD = 0.3
+
+# A pattern that ends with this matches every key that starts with the rest of the pattern.
+WILDCARD = '*'
+
+# The key, in a node of the trie, of the (key, value) pairs that end at that node.
+# Every other key of a node is a single character, so it can't clash.
+_ENTRIES = ''
+
+
+def normalize(key):
+    """Normalize a key for comparison, ignoring case and surrounding whitespace."""
+    return key.strip().casefold()
+
+
+class PrefixIndex:
+    """A trie of values by key, for case-insensitive exact and prefix lookups."""
+    def __init__(self, pairs=()):
+        """Create a new `PrefixIndex`.
+
+        :param pairs: An iterable of (key, value) pairs to add. Pairs with an empty key are skipped.
+        """
+        self._root = {}
+        self._size = 0
+        for key, value in pairs:
+            self.add(key, value)
+
+    def __len__(self):
+        """Return the number of (key, value) pairs in the index."""
+        return self._size
+
+    def add(self, key, value):
+        """Add a value under a key. Several values may share a key.
+
+        :param key: A name or designation. An empty key is skipped.
+        :param value: The value to find under the key.
+        """
+        if not key:
+            return
+        node = self._root
+        for char in normalize(key):
+            child = node.get(char)
+            if child is None:
+                child = node[char] = {}
+            node = child
+        node.setdefault(_ENTRIES, []).append((key, value))
+        self._size += 1
+
+    def _node(self, prefix):
+        """Return the node of a normalized prefix, or `None` if no key starts with it."""
+        node = self._root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return None
+        return node
+
+    @staticmethod
+    def _walk(node):
+        """Produce the (key, value) pairs at and below a node, in order of normalized key."""
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            yield from node.get(_ENTRIES, ())
+            stack.extend(node[char] for char in sorted(node, reverse=True) if char != _ENTRIES)
+
+    def get(self, key):
+        """Return the values whose key equals `key`, ignoring case, in the order they were added.
+
+        :param key: A name or designation.
+        :return: A list of values, empty if there are none.
+        """
+        node = self._node(normalize(key))
+        return [value for _, value in node.get(_ENTRIES, ())] if node else []
+
+    def find(self, prefix, limit=None):
+        """Return the values whose key starts with `prefix`, ignoring case, in order of key.
+
+        :param prefix: The start of a name or designation.
+        :param limit: The most values to return, or `None` for all of them.
+        :return: A list of values, empty if there are none.
+        """
+        node = self._node(normalize(prefix))
+        if node is None:
+            return []
+        values = []
+        for _, value in self._walk(node):
+            if limit is not None and len(values) >= limit:
+                break
+            values.append(value)
+        return values
+
+    def search(self, pattern):
+        """Return the values whose key matches a pattern: a whole key, or a prefix ending in `*`.
+
+        :param pattern: A name or designation, or the start of one followed by `*`.
+        :return: A list of values, empty if there are none.
+        """
+        if pattern.endswith(WILDCARD):
+            return self.find(pattern[:-len(WILDCARD)])
+        return self.get(pattern)
+
+    def complete(self, prefix, limit=COMPLETION_LIMIT):
+        """Return the distinct keys that start with `prefix`, ignoring case, in order.
+
+        :param prefix: The start of a name or designation.
+        :param limit: The most keys to return, or `None` for all of them.
+        :return: A list of keys, as they were added.
+        """
+        node = self._node(normalize(prefix))
+        if node is None:
+            return []
+        keys = []
+        for key, _ in self._walk(node):
+            if keys and keys[-1] == key:
+                continue
+            if limit is not None and len(keys) >= limit:
+                break
+            keys.append(key)
+        return keys
+
+
+def trigrams(key):
+    """Return the set of trigrams of a normalized key.
+
+    The key is padded with two spaces in front and one behind, so that short
+    keys have trigrams too, and the start of a key weighs more than its end.
+
+    :param key: A name or designation.
+    :return: A set of three-character strings.
+    """
+    padded = f'  {normalize(key)} '
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """An index of keys by trigram, for suggesting the keys most similar to another."""
+    def __init__(self, keys=()):
+        """Create a new `TrigramIndex`.
+
+        :param keys: An iterable of keys to add. Empty and repeated keys are skipped.
+        """
+        self._keys = []
+        # The keys in `_keys`, to skip a key that's added again.
+        self._known = set()
+        # The number of trigrams of each key, by the key's position in `_keys`.
+        self._sizes = []
+        # Map each trigram to the positions of the keys that contain it.
+        self._postings = {}
+        for key in keys:
+            self.add(key)
+
+    def __len__(self):
+        """Return the number of keys in the index."""
+        return len(self._keys)
+
+    def add(self, key):
+        """Add a key.
+
+        :param key: A name or designation. An empty key, or one already added, is skipped.
+        """
+        if not key or key in self._known:
+            return
+        position = len(self._keys)
+        grams = trigrams(key)
+        self._keys.append(key)
+        self._known.add(key)
+        self._sizes.append(len(grams))
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(position)
+
+    def suggest(self, key, limit=SUGGESTION_LIMIT, threshold=SIMILARITY_THRESHOLD):
+        """Return the keys most similar to `key`, most similar first.
+
+        The similarity of two keys is the number of trigrams they share, over
+        the number of distinct trigrams of both (so 1 for keys that only differ
+        in case). Keys of equal similarity are in the order they were added.
+
+        :param key: A name or designation, perhaps misspelled.
+        :param limit: The most keys to return.
+        :param threshold: The least similarity of a key to return.
+        :return: A list of keys.
+        """
+        grams = trigrams(key)
+        shared = collections.Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+        scored = []
+        for position, count in shared.items():
+            similarity = count / (len(grams) + self._sizes[position] - count)
+            if similarity >= threshold:
+                scored.append((similarity, -position))
+        return [self._keys[-position] for _, position in heapq.nlargest(limit, scored)]
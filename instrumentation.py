@@ -0,0 +1,186 @@
+"""Hooks that report what queries and filters do, to registered listeners.
+
+A listener is an instance of a subclass of `Listener`. While one is
+registered with `add_listener` (or the `listening` context manager):
+
+- each call of an `AttributeFilter` reports the filter, whether the close
+  approach matched, and how long the evaluation took, to `filter_evaluated`;
+- each `query` of a database reports the filters, how many close approaches
+  were scanned and how many matched, and how long it took, to `query_finished`,
+  when its stream of results is exhausted or closed;
+- each query of a database that caches objects or partitions reports how many
+  of the ones it needed were already in the cache to `cache_used`;
+- each load of the data (e.g. by the interactive shell, or of a partition
+  file) reports how long it took to `load_finished`.
+
+The hooks cost nothing while no listener is registered: the plain, unmeasured
+`AttributeFilter.__call__` is only swapped for the measured one when the first
+listener that handles `filter_evaluated` is registered, and swapped back when
+the last one is removed, and a database checks for listeners once per query,
+not once per row.
+
+The `FilterStats` listener counts the close approaches scanned and matched, and
+the evaluations, rejections and time spent per filter class, which shows which
+filters reject the most and so are worth indexing.
+"""
+import contextlib
+
+
+# The registered listeners. A tuple, so that it can be iterated while listeners change.
+listeners = ()
+
+# The registered listeners that handle `filter_evaluated`.
+filter_listeners = ()
+
+# Functions that turn the hooks of a module on (with `True`) or off (with `False`).
+_switches = []
+
+
+def add_switch(switch):
+    """Register a function that turns a module's hooks on or off.
+
+    The function is called right away, and then whenever it changes, with
+    whether any registered listener handles `filter_evaluated`.
+
+    :param switch: A function of one boolean argument.
+    """
+    _switches.append(switch)
+    switch(bool(filter_listeners))
+
+
+def _set_listeners(new_listeners):
+    """Replace the registered listeners, turning the filter hooks on or off if needed."""
+    global listeners, filter_listeners
+    was_on = bool(filter_listeners)
+    listeners = tuple(new_listeners)
+    filter_listeners = tuple(listener for listener in listeners
+                             if type(listener).filter_evaluated is not Listener.filter_evaluated)
+    if bool(filter_listeners) != was_on:
+        for switch in _switches:
+            switch(bool(filter_listeners))
+
+
+def add_listener(listener):
+    """Register a listener for the hooks.
+
+    :param listener: A `Listener`.
+    """
+    _set_listeners(listeners + (listener,))
+
+
+def remove_listener(listener):
+    """Unregister a listener, if it's registered.
+
+    :param listener: A listener that was registered with `add_listener`.
+    """
+    _set_listeners(other for other in listeners if other is not listener)
+
+
+def notify(event, *args):
+    """Report an event to every registered listener.
+
+    :param event: The name of a method of `Listener`, such as 'load_finished'.
+    :param args: The arguments of the event.
+    """
+    for listener in listeners:
+        getattr(listener, event)(*args)
+
+
+@contextlib.contextmanager
+def listening(listener):
+    """Register a listener for the duration of a `with` block.
+
+    :param listener: A `Listener`.
+    :return: A context manager that produces the listener.
+    """
+    add_listener(listener)
+    try:
+        yield listener
+    finally:
+        remove_listener(listener)
+
+
+class Listener:
+    """A listener that ignores every event; subclasses override the events they need."""
+    def filter_evaluated(self, filter_func, matched, elapsed):
+        """Handle the evaluation of a filter on a close approach.
+
+        :param filter_func: The `AttributeFilter` that was called.
+        :param matched: Whether the close approach satisfied the filter.
+        :param elapsed: The time the evaluation took, in seconds.
+        """
+
+    def query_finished(self, database, filters, scanned, matched, elapsed):
+        """Handle the end of a query's stream of results.
+
+        :param database: The database that was queried.
+        :param filters: The filters of the query.
+        :param scanned: The number of close approaches that were checked against the filters.
+        :param matched: The number of close approaches that were produced.
+        :param elapsed: The time from the start of the query to its end, in seconds,
+                        including the time its consumer spent between results.
+        """
+
+    def cache_used(self, database, cache, hits, misses):
+        """Handle a query's use of a database's cache.
+
+        :param database: The database that was queried.
+        :param cache: The name of the cache, such as 'objects' or 'partitions'.
+        :param hits: The number of entries the query needed that were already cached.
+        :param misses: The number of entries the query needed that had to be built or loaded.
+        """
+
+    def load_finished(self, kind, elapsed):
+        """Handle the end of a load of data.
+
+        :param kind: What was loaded, such as 'load', 'reload' or 'partition'.
+        :param elapsed: The time the load took, in seconds.
+        """
+
+
+class FilterStats(Listener):
+    """Count what queries scan and match, and what each class of filter evaluates and rejects."""
+    def __init__(self):
+        """Create a new `FilterStats`, with nothing counted yet."""
+        self.queries = 0
+        self.scanned = 0
+        self.matched = 0
+        # Map each filter class's name to its evaluations, rejections and seconds.
+        self.filters = {}
+
+    def filter_evaluated(self, filter_func, matched, elapsed):
+        """Count an evaluation of a filter, and the time it took."""
+        stats = self.filters.get(type(filter_func).__name__)
+        if stats is None:
+            stats = self.filters[type(filter_func).__name__] = [0, 0, 0.0]
+        stats[0] += 1
+        stats[1] += not matched
+        stats[2] += elapsed
+
+    def query_finished(self, database, filters, scanned, matched, elapsed):
+        """Count the close approaches that a query scanned and matched."""
+        self.queries += 1
+        self.scanned += scanned
+        self.matched += matched
+
+    def rejection_rate(self, name):
+        """Return the share of evaluations that a class of filter rejected.
+
+        :param name: The name of a filter class, such as 'DistanceFilter'.
+        :return: A number from 0 to 1, or `None` if it was never evaluated.
+        """
+        evaluations, rejections, _ = self.filters.get(name, (0, 0, 0.0))
+        return rejections / evaluations if evaluations else None
+
+    def serialize(self):
+        """Return a JSON-compatible dictionary of the counts."""
+        return {
+            'queries': self.queries,
+            'scanned': self.scanned,
+            'matched': self.matched,
+            'filters': {
+                name: {'evaluations': evaluations, 'rejections': rejections,
+                       'rejection_rate': self.rejection_rate(name), 'seconds': seconds}
+                for name, (evaluations, rejections, seconds) in self.filters.items()
+            },
+        }
@@ -5,7 +5,7 @@ See `README.md` for a detailed discussion of this project.
 
 This script can be invoked from the command line::
 
-    $ python3 main.py {inspect,query,interactive} [args]
+    $ python3 main.py {inspect,query,query-neos,interactive,convert,ingest,split,diff} [args]
 
 The `inspect` subcommand looks up an NEO by name or by primary designation, and
 optionally lists all of that NEO's known close approaches:
@@ -14,6 +14,21 @@ optionally lists all of that NEO's known close approaches:
     $ python3 main.py inspect --name Halley
     $ python3 main.py inspect --verbose --name Halley
 
+With `--verbose`, the close approaches are listed in time order after a summary
+of them: how many there are, the first and last, the closest and fastest, and
+the next one to come.
+
+If no NEO has exactly that name or designation, the lookup ignores case, and a
+name or designation ending in `*` lists every NEO whose name or designation
+starts with the rest (in the interactive shell, the tab key completes them):
+
+    $ python3 main.py inspect --name halley
+    $ python3 main.py inspect --name 'Hal*'
+    $ python3 main.py inspect --pdes '2020 AB*'
+
+If nothing matches, the names (or designations) closest to the one given are
+suggested instead.
+
 The `query` subcommand searches for close approaches that match given criteria:
 
     $ python3 main.py query --date 1969-07-29
@@ -23,40 +38,158 @@ The `query` subcommand searches for close approaches that match given criteria:
     $ python3 main.py query --start-date 2000-01-01 --max-diameter 0.1 --not-hazardous
     $ python3 main.py query --hazardous --max-distance 0.05 --min-velocity 30
 
-The set of results can be limited in size and/or saved to an output file in CSV
-or JSON format:
+The set of results can be limited in size and/or saved to an output file in CSV,
+JSON or newline-delimited JSON format:
 
     $ python3 main.py query --limit 5 --outfile results.csv
     $ python3 main.py query --limit 15 --outfile results.json
+    $ python3 main.py query --limit 15 --outfile results.jsonl
+
+Appending `.gz`, `.bz2` or `.xz` to the output file's name compresses it:
+
+    $ python3 main.py query --outfile results.csv.gz --compress-level 6
+
+Alternatively, the results can be split into one file per year, month or NEO:
+
+    $ python3 main.py query --partition-by year --outdir exports/
+    $ python3 main.py query --partition-by month --outdir exports/ --partition-suffix .jsonl.gz
+
+The `query-neos` subcommand searches for NEOs, rather than close approaches, by
+their diameter and hazardousness and by their number of close approaches and
+the distance of their closest one. The results can be saved to a file, as for
+`query`, with each NEO's number of close approaches and closest distance:
+
+    $ python3 main.py query-neos --hazardous --min-diameter 1 --max-distance 0.05
+    $ python3 main.py query-neos --min-approaches 20 --outfile neos.csv
 
 The `interactive` subcommand loads the NEO database and spawns an interactive
 command shell that can repeatedly execute `inspect` and `query` commands without
-having to wait to reload the database each time. However, it doesn't hot-reload.
+having to wait to reload the database each time. The prompt appears right away,
+while the data loads in the background; the first command that needs the data
+waits for it to finish loading. Whenever the data files change, the session
+reloads them in the background, and keeps answering commands from the previous
+data until the new data are ready.
+
+For monitoring a long-running session, `--metrics-port` serves histograms of
+query latencies, result sizes and load durations, and cache hit ratios, in the
+Prometheus text format, and `--metrics-file` dumps them after each command:
+
+    $ python3 main.py interactive --metrics-port 9464
 
 If needed, the script can load data from data files other than the default with
-`--neofile` or `--cadfile`.
+`--neofile` or `--cadfile`. These files may be compressed with gzip, bz2 or xz:
+
+    $ python3 main.py --neofile data/neos.csv.gz --cadfile data/cad.json.xz query --limit 5
+
+Close approach data split across several files (e.g. by decade) can be given by
+repeating `--cadfile`, or with a quoted glob. The files are merged in time order,
+and close approaches that appear in more than one file are only kept once:
+
+    $ python3 main.py --cadfile 'data/cad-*.json' query --date 1969-07-29
+
+The `split` subcommand splits the close approach file into a directory of one
+file per decade (or per year). Given that directory as `--cadfile`, a query
+only reads the files that overlap its dates, and the interactive shell only
+loads them when a command first needs them:
+
+    $ python3 main.py split data/cad/ --span decade
+    $ python3 main.py --cadfile data/cad/ query --start-date 1969-07-01 --end-date 1969-07-31
+
+For data sets that are too big to comfortably hold in memory, `--sqlite` stores
+the data in a SQLite database file instead. The data files are ingested into it
+the first time, and again whenever they change:
+
+    $ python3 main.py --sqlite data/neos.sqlite3 query --date 1969-07-29
+
+The `ingest` subcommand merges newer data files (such as a fresh NASA extract)
+into that SQLite database in place, skipping the NEOs and close approaches that
+it already holds. In the interactive shell, `ingest` merges them into the data
+loaded in memory instead:
+
+    $ python3 main.py --sqlite data/neos.sqlite3 ingest --new-cadfile cad-update.json
+
+If the SQLite database doesn't exist yet, it's built from the data files first;
+otherwise, the data files aren't needed.
+
+The `diff` subcommand compares the close approach file with a newer one, and
+lists the close approaches that were added, removed, or whose distance or
+velocity was revised. The differences can be saved to a CSV, JSON or
+newline-delimited JSON file, as for `query`:
+
+    $ python3 main.py diff cad-update.json
+    $ python3 main.py --cadfile data/cad.json diff cad-update.json --outfile changes.csv
+
+The `convert` subcommand converts the data files into a columnar binary file,
+which `--columnar` then opens with `mmap` - without parsing anything - so that
+each command only reads the parts of the file it needs:
+
+    $ python3 main.py convert data/neos.col
+    $ python3 main.py --columnar data/neos.col query --date 1969-07-29
+
+Without either option, `inspect` doesn't load the data files at all. Instead,
+it looks the NEO up in an index of byte offsets into the (uncompressed) data
+files, which is built on the first run and saved next to the NEO file, and
+parses only the rows it needs. Otherwise, each subcommand only loads what it
+needs: `inspect` without `--verbose` skips the close approach file, and a `query`
+that doesn't filter on diameter or hazardousness only reads the NEOs of the
+close approaches that it outputs. A `query` also skips the close approaches that
+its date, distance and velocity filters reject while reading the file, before
+they're turned into objects.
+
+To see where the time of an `inspect` or a `query` goes, `--profile` prints the
+wall time, CPU time and rows per second of each phase of the run (loading the
+CSV and JSON files, linking them, querying, limiting and writing) to standard
+error, and `--profile-output` saves them as JSON. `--profile-memory` adds the
+peak memory of each phase, at the cost of a much slower run:
+
+    $ python3 main.py --profile query --start-date 2020-01-01 --outfile results.csv
 """
 import argparse
 import cmd
+import collections
+import concurrent.futures
 import datetime
+import itertools
 import pathlib
+import re
 import shlex
 import sys
+import threading
 import time
 
-from extract import load_neos, load_approaches
+import instrumentation
+from extract import (load_neos, load_approaches, iter_neos, iter_approaches, row_predicate,
+                     source_signature, expand_paths)
 from database import NEODatabase
-from filters import create_filters, limit
-from write import write_to_csv, write_to_json
+from metrics import NEOMetrics
+from diff import diff_files
+from sqlite_database import SQLiteNEODatabase, ingest_delta
+from columnar import ColumnarNEODatabase, convert
+from compression import is_compressed, COMPRESSION_LEVELS
+from offset_index import OffsetIndex
+from profiling import Profiler
+from indexes import WILDCARD
+from partitions import (PartitionedNEODatabase, PARTITION_SPANS, list_partitions,
+                        select_partitions, split_approaches)
+from filters import create_filters, create_neo_filters, limit
+from write import writer_for, diff_writer_for, neo_writer_for, write_partitioned, PARTITION_KEYS
 
 
 # Paths to the root of the project and the `data` subfolder.
 PROJECT_ROOT = pathlib.Path(__file__).parent.resolve()
 DATA_ROOT = PROJECT_ROOT / 'data'
 
+# The most close approaches whose NEOs are read and linked at once, when a query only
+# reads the NEOs of its results. Each batch rereads the NEO file.
+LINK_BATCH_SIZE = 1 << 16
+
 # The current time, for use with the kill-on-change feature of the interactive shell.
 _START = time.time()
 
+# The end of an `inspect` command line whose last option takes a designation or a name,
+# followed by its value so far, which may be in quotes (with spaces) or not (without).
+_INSPECT_VALUE = re.compile(r'''(-p|--pdes|-n|--name)(?:\s+|=)(?:"([^"]*)|'([^']*)|(\S*))$''')
+
 
 def date_fromisoformat(date_string):
     """Return a `datetime.date` corresponding to a string in YYYY-MM-DD format.
@@ -76,7 +209,7 @@ def date_fromisoformat(date_string):
 def make_parser():
     """Create an ArgumentParser for this script.
 
-    :return: A tuple of the top-level, inspect, and query parsers.
+    :return: A tuple of the top-level, inspect, query, ingest and query-neos parsers.
     """
     parser = argparse.ArgumentParser(
         description="Explore past and future close approaches of near-Earth objects."
@@ -85,10 +218,29 @@ def make_parser():
     # Add arguments for custom data files.
     parser.add_argument('--neofile', default=(DATA_ROOT / 'neos.csv'),
                         type=pathlib.Path,
-                        help="Path to CSV file of near-Earth objects.")
-    parser.add_argument('--cadfile', default=(DATA_ROOT / 'cad.json'),
-                        type=pathlib.Path,
-                        help="Path to JSON file of close approach data.")
+                        help="Path to CSV file of near-Earth objects, optionally "
+                             "compressed with gzip, bz2 or xz (e.g. `neos.csv.gz`).")
+    parser.add_argument('--cadfile', action='append',
+                        help="Path to JSON file of close approach data, optionally "
+                             "compressed with gzip, bz2 or xz (e.g. `cad.json.xz`). May be "
+                             "given several times, or as a quoted glob (e.g. 'data/cad-*.json'), "
+                             "to merge several files in time order.")
+    storage = parser.add_mutually_exclusive_group()
+    storage.add_argument('--sqlite', type=pathlib.Path,
+                         help="Path to a SQLite database file in which to store the data, "
+                              "instead of holding it in memory. The data files are ingested into "
+                              "it when it's first used and whenever they change.")
+    storage.add_argument('--columnar', type=pathlib.Path,
+                         help="Path to a columnar file, written by the `convert` subcommand, "
+                              "to read the data from instead of the data files.")
+    parser.add_argument('--profile', action='store_true',
+                        help="Print the wall time, CPU time and rows per second of each phase "
+                             "of `inspect` or `query` to standard error.")
+    parser.add_argument('--profile-memory', action='store_true',
+                        help="With --profile, also measure the peak memory of each phase, "
+                             "which slows the whole run down.")
+    parser.add_argument('--profile-output', type=pathlib.Path,
+                        help="File in which to save the measurements of --profile as JSON.")
     subparsers = parser.add_subparsers(dest='cmd')
 
     # Add the `inspect` subcommand parser.
@@ -98,9 +250,11 @@ def make_parser():
                          help="Additionally, print all known close approaches of this NEO.")
     inspect_id = inspect.add_mutually_exclusive_group(required=True)
     inspect_id.add_argument('-p', '--pdes',
-                            help="The primary designation of the NEO to inspect (e.g. '433').")
+                            help="The primary designation of the NEO to inspect (e.g. '433'), "
+                                 "or its start followed by '*'.")
     inspect_id.add_argument('-n', '--name',
-                            help="The IAU name of the NEO to inspect (e.g. 'Halley').")
+                            help="The IAU name of the NEO to inspect (e.g. 'Halley'), "
+                                 "or its start followed by '*'.")
 
     # Add the `query` subcommand parser.
     query = subparsers.add_parser('query',
@@ -150,23 +304,144 @@ def make_parser():
     query.add_argument('-o', '--outfile', type=pathlib.Path,
                        help="File in which to save structured results. "
                             "If omitted, results are printed to standard output.")
+    query.add_argument('--compress-level', dest='compresslevel', type=int,
+                       choices=COMPRESSION_LEVELS, metavar='LEVEL',
+                       help="The compression level, from 1 (fastest) to 9 (smallest), for an "
+                            "output file that ends with `.gz`, `.bz2` or `.xz`.")
+    query.add_argument('--compress-thread', dest='compress_thread', action='store_true',
+                       help="If specified, compress the output file in a background thread. "
+                            "Partitioned output is always compressed by the partition workers.")
+    partition = query.add_argument_group('Partitioned output',
+                                         description="Split the results into one file per partition.")
+    partition.add_argument('--partition-by', choices=tuple(PARTITION_KEYS),
+                           help="Write one file per approach year, approach month or NEO "
+                                "into --outdir.")
+    partition.add_argument('--outdir', type=pathlib.Path,
+                           help="Directory in which to save partitioned results.")
+    partition.add_argument('--partition-suffix', default='.csv',
+                           help="Suffix of each partition file: `.csv`, `.jsonl` or `.ndjson`, "
+                                "optionally followed by `.gz`, `.bz2` or `.xz`. Defaults to `.csv`.")
+    partition.add_argument('--workers', type=int, default=4,
+                           help="The number of threads that write partitions. Defaults to 4.")
+
+    # Add the `query-neos` subcommand parser.
+    neo_query = subparsers.add_parser('query-neos',
+                                      description="Query for NEOs that match a collection "
+                                                  "of filters.")
+    neo_filters = neo_query.add_argument_group('Filters',
+                                               description="Filter NEOs by their attributes or "
+                                                           "by their close approaches.")
+    neo_filters.add_argument('--min-diameter', dest='diameter_min', type=float,
+                             help="In kilometers. Only return NEOs with diameters as large or "
+                                  "larger than the given size.")
+    neo_filters.add_argument('--max-diameter', dest='diameter_max', type=float,
+                             help="In kilometers. Only return NEOs with diameters as small or "
+                                  "smaller than the given size.")
+    neo_filters.add_argument('--hazardous', dest='hazardous', default=None, action='store_true',
+                             help="If specified, only return NEOs that are potentially hazardous.")
+    neo_filters.add_argument('--not-hazardous', dest='hazardous', default=None,
+                             action='store_false',
+                             help="If specified, only return NEOs that are not potentially "
+                                  "hazardous.")
+    neo_filters.add_argument('--min-approaches', dest='approaches_min', type=int,
+                             help="Only return NEOs with at least the given number of known "
+                                  "close approaches.")
+    neo_filters.add_argument('--max-approaches', dest='approaches_max', type=int,
+                             help="Only return NEOs with at most the given number of known "
+                                  "close approaches.")
+    neo_filters.add_argument('--min-distance', dest='distance_min', type=float,
+                             help="In astronomical units. Only return NEOs that never pass "
+                                  "nearer to Earth than the given distance.")
+    neo_filters.add_argument('--max-distance', dest='distance_max', type=float,
+                             help="In astronomical units. Only return NEOs that pass as near "
+                                  "or nearer to Earth as the given distance at least once.")
+    neo_query.add_argument('-l', '--limit', type=int,
+                           help="The maximum number of matches to return. "
+                                "Defaults to 10 if no --outfile is given.")
+    neo_query.add_argument('-o', '--outfile', type=pathlib.Path,
+                           help="File in which to save structured results, as CSV, JSON or "
+                                "newline-delimited JSON, optionally compressed.")
+    neo_query.add_argument('--compress-level', dest='compresslevel', type=int,
+                           choices=COMPRESSION_LEVELS, metavar='LEVEL',
+                           help="The compression level, from 1 (fastest) to 9 (smallest), for an "
+                                "output file that ends with `.gz`, `.bz2` or `.xz`.")
+
+    # Add the `convert` subcommand parser.
+    converter = subparsers.add_parser('convert',
+                                      description="Convert the data files into a columnar file "
+                                                  "for use with --columnar.")
+    converter.add_argument('outfile', type=pathlib.Path,
+                           help="File in which to save the columnar data.")
+
+    # Add the `split` subcommand parser.
+    splitter = subparsers.add_parser('split',
+                                     description="Split the close approach file into one file "
+                                                 "per year or per decade, for use as a "
+                                                 "--cadfile directory.")
+    splitter.add_argument('outdir', type=pathlib.Path,
+                          help="Directory in which to save the partition files.")
+    splitter.add_argument('--span', choices=tuple(PARTITION_SPANS), default='decade',
+                          help="How many years each file covers. Defaults to a decade.")
+    splitter.add_argument('--suffix', default='.json',
+                          help="Suffix of each partition file: `.json`, optionally followed by "
+                               "`.gz`, `.bz2` or `.xz`. Defaults to `.json`.")
+
+    # Add the `ingest` subcommand parser.
+    ingester = subparsers.add_parser('ingest',
+                                     description="Merge new data files into the database given "
+                                                 "with --sqlite, skipping the NEOs and close "
+                                                 "approaches it already holds.")
+    ingester.add_argument('--new-neofile', type=pathlib.Path,
+                          help="Path to a CSV file of near-Earth objects to merge in.")
+    ingester.add_argument('--new-cadfile', type=pathlib.Path,
+                          help="Path to a JSON file of close approach data to merge in.")
+
+    # Add the `diff` subcommand parser.
+    differ = subparsers.add_parser('diff',
+                                   description="Compare the close approach file with a newer one, "
+                                               "listing the close approaches that were added, "
+                                               "removed or revised.")
+    differ.add_argument('new_cadfile', type=pathlib.Path,
+                        help="Path to the newer JSON file of close approach data.")
+    differ.add_argument('-l', '--limit', type=int,
+                        help="The maximum number of differences to print or save. "
+                             "Defaults to 10 if no --outfile is given.")
+    differ.add_argument('-o', '--outfile', type=pathlib.Path,
+                        help="File in which to save all of the differences, as CSV, JSON or "
+                             "newline-delimited JSON, optionally compressed.")
+    differ.add_argument('--compress-level', dest='compresslevel', type=int,
+                        choices=COMPRESSION_LEVELS, metavar='LEVEL',
+                        help="The compression level, from 1 (fastest) to 9 (smallest), for an "
+                             "output file that ends with `.gz`, `.bz2` or `.xz`.")
 
     repl = subparsers.add_parser('interactive',
                                  description="Start an interactive command session "
                                              "to repeatedly run `interact` and `query` commands.")
     repl.add_argument('-a', '--aggressive', action='store_true',
                       help="If specified, kill the session whenever a project file is modified.")
-    return parser, inspect, query
+    repl.add_argument('--metrics-port', type=int,
+                      help="Serve metrics of queries, caches and loads in the Prometheus text "
+                           "format at http://127.0.0.1:PORT/metrics.")
+    repl.add_argument('--metrics-file', type=pathlib.Path,
+                      help="File to which to dump the metrics after each command.")
+    return parser, inspect, query, ingester, neo_query
 
 
 def inspect(database, pdes=None, name=None, verbose=False):
     """Perform the `inspect` subcommand.
 
-    This function fetches an NEO by designation or by name. If a matching NEO is
-    found, information about the NEO is printed (additionally, information for
-    all of the NEO's known close approaches is printed if `verbose=True`).
+    This function fetches NEOs by designation or by name. If any matching NEOs
+    are found, information about each NEO is printed (additionally, information
+    for all of the NEO's known close approaches is printed if `verbose=True`).
     Otherwise, a message is printed noting that there are no matching NEOs.
 
+    NEOs whose designation or name matches exactly are preferred, and every NEO
+    with a reused name is listed. Otherwise, the lookup ignores case, and a
+    designation or name ending in `*` matches every NEO whose designation or
+    name starts with the rest - which mustn't be empty, so as not to list the
+    whole catalogue. If nothing matches, the closest designations or names are
+    suggested.
+
     At least one of `pdes` and `name` must be given. If both are given, prefer
     to look up the NEO by the primary designation.
 
@@ -174,28 +449,132 @@ def inspect(database, pdes=None, name=None, verbose=False):
     :param pdes: The primary designation of an NEO for which to search.
     :param name: The name of an NEO for which to search.
     :param verbose: Whether to additionally print all of a matching NEO's close approaches.
-    :return: The matching `NearEarthObject`, or None if not found.
+    :return: A list of the matching `NearEarthObject`s, empty if none were found.
     """
-    # Fetch the NEO of interest.
-    if pdes:
-        neo = database.get_neo_by_designation(pdes)
-    else:
-        neo = database.get_neo_by_name(name)
+    # Fetch the NEOs of interest.
+    by, key = ('designation', pdes) if pdes else ('name', name)
+    if key.strip() == WILDCARD:
+        print(f"Please give the start of a {by} before '{WILDCARD}'.", file=sys.stderr)
+        return []
+    neos = []
+    if not key.endswith(WILDCARD):
+        if by == 'designation':
+            neo = database.get_neo_by_designation(key)
+            neos = [neo] if neo else []
+        else:
+            # Some names are reused for several NEOs.
+            neos = database.get_neos_by_name(key)
+    neos = neos or database.find_neos(key, by)
 
     # Ensure that we have received an NEO.
-    if not neo:
+    if not neos:
         print("No matching NEOs exist in the database.", file=sys.stderr)
-        return None
+        suggestions = database.suggest_neos(key, by)
+        if suggestions:
+            print(f"Did you mean: {', '.join(suggestions)}?", file=sys.stderr)
+        return neos
+
+    # Display information about these NEOs, and optionally their close approaches if verbose.
+    for neo in neos:
+        print(neo)
+        if verbose:
+            print(summarize_approaches(neo))
+            for approach in neo.approaches:
+                print(f"- {approach}")
+    return neos
+
+
+def summarize_approaches(neo, now=None):
+    """Summarize the close approaches of an NEO from its precomputed statistics.
+
+    :param neo: A `NearEarthObject`, linked to its close approaches.
+    :param now: The naive UTC `datetime` after which to look for the next approach, like the
+                approach times, by default the current time.
+    :return: A string of one or more sentences.
+    """
+    if not neo.approach_count:
+        return "It has no known close approaches."
+    closest, fastest = neo.closest_approach, neo.fastest_approach
+    if neo.approach_count == 1:
+        summary = f"It has 1 known close approach, on {closest.time_str}, at " \
+                  f"{closest.distance:.4f} au and {closest.velocity:.2f} km/s."
+    else:
+        summary = f"It has {neo.approach_count} known close approaches, from " \
+                  f"{neo.first_approach.time_str} to {neo.last_approach.time_str}; the " \
+                  f"closest at {closest.distance:.4f} au on {closest.time_str}, and the " \
+                  f"fastest at {fastest.velocity:.2f} km/s on {fastest.time_str}."
+    if now is None:
+        # The approach times are naive UTC, so compare them with the current UTC time.
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    upcoming = neo.next_approach(now)
+    if upcoming:
+        summary += f" The next is on {upcoming.time_str}."
+    return summary
+
+
+def link_neos(approaches, neo_csv_path, profiler=None, batch_size=LINK_BATCH_SIZE):
+    """Read the NEOs of a stream of close approaches, and link them together, a batch at a time.
+
+    Only the NEOs that the close approaches refer to are constructed. The NEOs
+    of each batch are read afresh, so that no more than a batch of close
+    approaches is held at once: an NEO's `.approaches` only holds the ones in
+    the same batch.
+
+    :param approaches: An iterable of `CloseApproach`es that aren't linked to NEOs yet.
+    :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+    :param profiler: A `Profiler` with which to measure reading and linking, if any.
+    :param batch_size: The most close approaches to link at once.
+    :yield: The same `CloseApproach`es, in the same order, linked to their NEOs.
+    """
+    profiler = profiler or Profiler(enabled=False)
+    approaches = iter(approaches)
+    while True:
+        batch = list(itertools.islice(approaches, batch_size))
+        if not batch:
+            return
+        designations = {approach._designation for approach in batch}
+        neos = profiler.call('csv load', load_neos, neo_csv_path, designations)
+        with profiler.phase('link', rows=len(batch)):
+            NEODatabase(neos, batch)
+        yield from batch
+
+
+def load_in_background(load):
+    """Call a loading function in a background thread.
+
+    The thread is a daemon, so that exiting doesn't wait for loading to finish.
+
+    :param load: A function of no arguments that loads and returns a database.
+    :return: A `concurrent.futures.Future` that resolves to `load`'s result.
+    """
+    future = concurrent.futures.Future()
 
-    # Display information about this NEO, and optionally its close approaches if verbose.
-    print(neo)
-    if verbose:
-        for approach in neo.approaches:
-            print(f"- {approach}")
-    return neo
+    def work():
+        try:
+            future.set_result(load())
+        except BaseException as err:
+            future.set_exception(err)
+
+    threading.Thread(target=work, daemon=True).start()
+    return future
+
+
+def filters_from(args):
+    """Create the collection of filters for the `query` subcommand's arguments.
+
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :return: A collection of filters, as from `create_filters`.
+    """
+    return create_filters(
+        date=args.date, start_date=args.start_date, end_date=args.end_date,
+        distance_min=args.distance_min, distance_max=args.distance_max,
+        velocity_min=args.velocity_min, velocity_max=args.velocity_max,
+        diameter_min=args.diameter_min, diameter_max=args.diameter_max,
+        hazardous=args.hazardous
+    )
 
 
-def query(database, args):
+def query(database, args, neo_csv_path=None, profiler=None):
     """Perform the `query` subcommand.
 
     Create a collection of filters with `create_filters` and supply them to the
@@ -203,35 +582,172 @@ def query(database, args):
 
     If an output file wasn't given, print these results to stdout, limiting to
     10 entries if no limit was specified. If an output file was given, use the
-    file's extension to infer whether the file should hold CSV or JSON data, and
-    then write the results to the output file in that format.
+    file's extension to infer whether the file should hold CSV, JSON or
+    newline-delimited JSON (`.jsonl` or `.ndjson`) data, optionally compressed
+    (`.gz`, `.bz2` or `.xz`), and then write the results to the output file in
+    that format. If a partitioning and an output directory were given instead,
+    write the results to one file per partition in that directory.
+
+    If `neo_csv_path` is given, the database only holds close approaches, and
+    none of the filters may depend on NEOs. The NEOs of the (limited) results
+    are then read from that file and linked to them as they're written, a batch
+    of results at a time, so that an unlimited export still streams.
 
     :param database: The `NEODatabase` containing data on NEOs and their close approaches.
     :param args: All arguments from the command line, as parsed by the top-level parser.
+    :param neo_csv_path: A path to a CSV file from which to read the NEOs of the results.
+    :param profiler: A `Profiler` with which to measure the query, limit and write phases, if any.
     """
+    profiler = profiler or Profiler(enabled=False)
     # Construct a collection of filters from arguments supplied at the command line.
-    filters = create_filters(
-        date=args.date, start_date=args.start_date, end_date=args.end_date,
-        distance_min=args.distance_min, distance_max=args.distance_max,
-        velocity_min=args.velocity_min, velocity_max=args.velocity_max,
-        diameter_min=args.diameter_min, diameter_max=args.diameter_max,
-        hazardous=args.hazardous
-    )
+    filters = filters_from(args)
     # Query the database with the collection of filters.
-    results = database.query(filters)
-
-    if not args.outfile:
+    results = profiler.stream('query', database.query(filters))
+    # Only output to stdout is limited by default.
+    count = args.limit if args.outfile or args.partition_by or args.outdir else args.limit or 10
+    results = profiler.stream('limit', limit(results, count))
+    if neo_csv_path:
+        results = link_neos(results, neo_csv_path, profiler)
+
+    if args.partition_by or args.outdir:
+        # Write the results to one file per partition.
+        if not (args.partition_by and args.outdir):
+            print("Please use --partition-by together with --outdir.", file=sys.stderr)
+            return
+        if args.compress_thread:
+            # The partition workers already compress their files in parallel threads.
+            print("Please don't use --compress-thread with --partition-by; each partition "
+                  "worker compresses its own files.", file=sys.stderr)
+            return
+        try:
+            with profiler.phase('write') as phase:
+                write_partitioned(phase.counted(results), args.outdir,
+                                  partition_by=args.partition_by, suffix=args.partition_suffix,
+                                  workers=args.workers, compresslevel=args.compresslevel)
+        except ValueError as err:
+            print(err, file=sys.stderr)
+    elif not args.outfile:
         # Write the results to stdout, limiting to 10 entries if not specified.
-        for result in limit(results, args.limit or 10):
-            print(result)
+        with profiler.phase('write') as phase:
+            for result in phase.counted(results):
+                print(result)
     else:
         # Write the results to a file.
-        if args.outfile.suffix == '.csv':
-            write_to_csv(limit(results, args.limit), args.outfile)
-        elif args.outfile.suffix == '.json':
-            write_to_json(limit(results, args.limit), args.outfile)
+        writer = writer_for(args.outfile)
+        if writer:
+            with profiler.phase('write') as phase:
+                writer(phase.counted(results), args.outfile,
+                       compresslevel=args.compresslevel, threaded=args.compress_thread)
+        else:
+            print("Please use an output file that ends with `.csv`, `.json`, `.jsonl` or `.ndjson`, "
+                  "optionally followed by `.gz`, `.bz2` or `.xz`.", file=sys.stderr)
+
+
+def query_neos(database, args, profiler=None):
+    """Perform the `query-neos` subcommand.
+
+    Create a collection of NEO filters with `create_neo_filters` and supply
+    them to the database's `query_neos` method. Then, as for `query`, either
+    print the matching NEOs (limiting to 10 if no limit was specified) or write
+    them to the output file, in the format its extension implies.
+
+    :param database: The `NEODatabase` containing data on NEOs and their close approaches.
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    :param profiler: A `Profiler` with which to measure the query and write phases, if any.
+    """
+    profiler = profiler or Profiler(enabled=False)
+    filters = create_neo_filters(
+        diameter_min=args.diameter_min, diameter_max=args.diameter_max,
+        hazardous=args.hazardous,
+        approaches_min=args.approaches_min, approaches_max=args.approaches_max,
+        distance_min=args.distance_min, distance_max=args.distance_max
+    )
+    results = profiler.stream('query', database.query_neos(filters))
+    results = limit(results, args.limit if args.outfile else args.limit or 10)
+
+    if not args.outfile:
+        with profiler.phase('write') as phase:
+            for neo in phase.counted(results):
+                print(neo)
+        return
+    writer = neo_writer_for(args.outfile)
+    if not writer:
+        print("Please use an output file that ends with `.csv`, `.json`, `.jsonl` or `.ndjson`, "
+              "optionally followed by `.gz`, `.bz2` or `.xz`.", file=sys.stderr)
+        return
+    with profiler.phase('write') as phase:
+        writer(phase.counted(results), args.outfile, compresslevel=args.compresslevel)
+
+
+def diff(args):
+    """Perform the `diff` subcommand.
+
+    Compare the close approaches of `--cadfile` with those of a newer file, and
+    either print the differences (limiting to 10 if no limit was specified) or
+    write them to the output file (all of them, if no limit was specified), in
+    the format its extension implies. Then print how many close approaches were
+    added, removed and revised, past the limit too.
+
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    """
+    writer = diff_writer_for(args.outfile) if args.outfile else None
+    if args.outfile and not writer:
+        print("Please use an output file that ends with `.csv`, `.json`, `.jsonl` or `.ndjson`, "
+              "optionally followed by `.gz`, `.bz2` or `.xz`.", file=sys.stderr)
+        return
+
+    counts = collections.Counter()
+
+    def counted(changes):
+        for change in changes:
+            counts[change.change] += 1
+            yield change
+
+    changes = counted(diff_files(args.cadfile, args.new_cadfile))
+    try:
+        if writer:
+            writer(limit(changes, args.limit), args.outfile, compresslevel=args.compresslevel)
+            # Keep counting the differences past the limit, for the summary.
+            for _ in changes:
+                pass
         else:
-            print("Please use an output file that ends with `.csv` or `.json`.", file=sys.stderr)
+            # Keep counting the differences past the limit, for the summary.
+            for index, change in enumerate(changes):
+                if index < (args.limit or 10):
+                    print(change)
+    except (OSError, ValueError) as err:
+        print(err, file=sys.stderr)
+        return
+    print(f"{counts['added']} added, {counts['removed']} removed and "
+          f"{counts['changed']} revised close approaches.")
+
+
+def ingest(database, args):
+    """Perform the `ingest` subcommand.
+
+    Merge the NEOs and close approaches of new data files into a database,
+    skipping those it already holds, and print how many were added. NEOs are
+    merged first, so that new close approaches are linked to new NEOs.
+
+    :param database: An `NEODatabase` to merge into, or `None` to merge into the
+                     SQLite database file given with `--sqlite`.
+    :param args: All arguments from the command line, as parsed by the top-level parser.
+    """
+    if not (args.new_neofile or args.new_cadfile):
+        print("Please give --new-neofile, --new-cadfile or both.", file=sys.stderr)
+        return
+    neos = iter_neos(args.new_neofile) if args.new_neofile else ()
+    approaches = iter_approaches(args.new_cadfile) if args.new_cadfile else ()
+    try:
+        if database is None:
+            neos_added, approaches_added = ingest_delta(args.sqlite, neos, approaches)
+        else:
+            neos_added = database.add_neos(neos)
+            approaches_added = database.add_approaches(approaches)
+    except (OSError, ValueError) as err:
+        print(err, file=sys.stderr)
+        return
+    print(f"Added {neos_added} new NEOs and {approaches_added} new close approaches.")
 
 
 class NEOShell(cmd.Cmd):
@@ -250,22 +766,49 @@ class NEOShell(cmd.Cmd):
              "Type `help` or `?` to list commands and `exit` to exit.\n")
     prompt = '(neo) '
 
-    def __init__(self, database, inspect_parser, query_parser, aggressive=False, **kwargs):
+    def __init__(self, database, inspect_parser, query_parser, aggressive=False,
+                 ingest_parser=None, reload=None, watched=(), metrics=None, metrics_file=None,
+                 neo_query_parser=None, **kwargs):
         """Create a new `NEOShell`.
 
         Creating this object doesn't start the session - for that, use `.cmdloop()`.
 
-        :param database: The `NEODatabase` containing data on NEOs and their close approaches.
+        :param database: The `NEODatabase` containing data on NEOs and their close approaches,
+                         or a `concurrent.futures.Future` that resolves to one.
         :param inspect_parser: The subparser for the `inspect` subcommand.
         :param query_parser: The subparser for the `query` subcommand.
         :param aggressive: Whether to kill the session whenever a project file is changed.
+        :param ingest_parser: The subparser for the `ingest` subcommand.
+        :param reload: A function of no arguments that loads the database again.
+        :param watched: The paths of the files that `reload` reads.
+        :param metrics: A registered `NEOMetrics` to dump after each command, if any.
+        :param metrics_file: The path of the file to which to dump `metrics`.
+        :param neo_query_parser: The subparser for the `query-neos` subcommand.
         :param kwargs: A dictionary of excess keyword arguments passed to the superclass.
         """
         super().__init__(**kwargs)
-        self.db = database
+        self._db = database
         self.inspect = inspect_parser
         self.query = query_parser
+        self.ingest = ingest_parser
+        self.neo_query = neo_query_parser
         self.aggressive = aggressive
+        self._reload = reload
+        self._watched = watched
+        self.metrics = metrics
+        self.metrics_file = metrics_file
+        self._signatures = self._watched_signatures()
+        # A `concurrent.futures.Future` for a database being reloaded, if any.
+        self._reloading = None
+
+    @property
+    def db(self):
+        """The database, waiting for it to finish loading in the background if needed."""
+        if isinstance(self._db, concurrent.futures.Future):
+            if not self._db.done():
+                print("Waiting for the data to finish loading...", file=sys.stderr)
+            self._db = self._db.result()
+        return self._db
 
     @classmethod
     def parse_arg_with(cls, arg, parser):
@@ -306,6 +849,12 @@ class NEOShell(cmd.Cmd):
             (neo) inspect --pdes 1P
             (neo) inspect --name Halley
 
+        Ignore case, or list every NEO whose name starts with some letters (the
+        tab key completes names and designations):
+
+            (neo) inspect --name halley
+            (neo) inspect --name Hal*
+
         Additionally, list all known close approaches:
 
             (neo) inspect --verbose --name Eros
@@ -319,6 +868,27 @@ class NEOShell(cmd.Cmd):
                 pdes=args.pdes, name=args.name,
                 verbose=args.verbose)
 
+    def complete_inspect(self, text, line, begidx, endidx):
+        """Complete the designation after `--pdes`, or the name after `--name`.
+
+        A name with spaces, such as 'Don Quixote', completes inside quotes.
+        Nothing is completed while the data are still loading.
+        """
+        if isinstance(self._db, concurrent.futures.Future) and not self._db.done():
+            return []
+        match = _INSPECT_VALUE.search(line[:endidx])
+        if not match:
+            return []
+        value = next(group for group in match.groups()[1:] if group is not None)
+        # Readline only replaces the last word of the value, so complete what follows the others.
+        if not value.endswith(text):
+            return []
+        by = 'designation' if match.group(1) in ('-p', '--pdes') else 'name'
+        typed = len(value) - len(text)
+        return [key[typed:] for key in self.db.complete_neos(value, by)]
+
+    complete_i = complete_inspect
+
     def do_q(self, arg):
         """Shorthand for `query`."""
         self.do_query(arg)
@@ -344,6 +914,8 @@ class NEOShell(cmd.Cmd):
 
             (neo) query --limit 5 --outfile results.csv
             (neo) query --limit 5 --outfile results.json
+            (neo) query --limit 5 --outfile results.jsonl
+            (neo) query --limit 5 --outfile results.csv.gz
         """
         args = self.parse_arg_with(arg, self.query)
         if not args:
@@ -352,6 +924,45 @@ class NEOShell(cmd.Cmd):
         # Run the `inspect` subcommand.
         query(self.db, args)
 
+    def do_query_neos(self, arg):
+        """Perform the `query-neos` subcommand within the REPL session.
+
+        For example, to list the hazardous NEOs larger than 1 km that come
+        within 0.05 au of Earth:
+
+            (neo) query_neos --hazardous --min-diameter 1 --max-distance 0.05
+        """
+        if not self.neo_query:
+            print("Querying NEOs isn't available in this session.", file=sys.stderr)
+            return
+        args = self.parse_arg_with(arg, self.neo_query)
+        if not args:
+            return
+        if not isinstance(self.db, NEODatabase):
+            print("Only data loaded in memory can be queried for NEOs.", file=sys.stderr)
+            return
+        query_neos(self.db, args)
+
+    def do_ingest(self, arg):
+        """Merge new data files into the data loaded in this REPL session.
+
+        NEOs and close approaches that are already loaded are skipped:
+
+            (neo) ingest --new-cadfile cad-update.json
+            (neo) ingest --new-neofile neos-update.csv --new-cadfile cad-update.json
+        """
+        if not self.ingest:
+            print("Ingesting isn't available in this session.", file=sys.stderr)
+            return
+        args = self.parse_arg_with(arg, self.ingest)
+        if not args:
+            return
+        if not isinstance(self.db, NEODatabase):
+            print("Only data loaded in memory can be merged into; "
+                  "use the `ingest` subcommand with --sqlite instead.", file=sys.stderr)
+            return
+        ingest(self.db, args)
+
     def do_EOF(self, _arg):
         """Exit the interactive session."""
         return True
@@ -360,8 +971,45 @@ class NEOShell(cmd.Cmd):
     do_exit = do_EOF
     do_quit = do_EOF
 
+    def _watched_signatures(self):
+        """Describe the watched files, or return `None` if one is missing (e.g. mid-replace)."""
+        try:
+            return [source_signature(path) for path in self._watched]
+        except OSError:
+            return None
+
+    def check_data_files(self):
+        """Reload the database in the background when the watched files change.
+
+        A reload doesn't block any commands: they keep using the current
+        database until the new one is ready, and then it's swapped in whole,
+        between two commands. If a reload fails, the current database is kept.
+        Data merged in with `ingest` is dropped by a reload.
+        """
+        if self._reloading and self._reloading.done():
+            future, self._reloading = self._reloading, None
+            try:
+                database = future.result()
+            except Exception as err:
+                print(f"Couldn't reload the data files: {err}", file=sys.stderr)
+            else:
+                previous, self._db = self._db, database
+                if not isinstance(previous, concurrent.futures.Future):
+                    getattr(previous, 'close', lambda: None)()
+                print("Reloaded the data files.", file=sys.stderr)
+
+        if not self._reload or self._reloading:
+            return
+        signatures = self._watched_signatures()
+        if signatures is not None and signatures != self._signatures:
+            self._signatures = signatures
+            print("The data files have changed; reloading them in the background.",
+                  file=sys.stderr)
+            self._reloading = load_in_background(self._reload)
+
     def precmd(self, line):
-        """Watch for changes to the files in this project."""
+        """Watch for changes to the data files and to the files in this project."""
+        self.check_data_files()
         changed = [f for f in PROJECT_ROOT.glob('*.py') if f.stat().st_mtime > _START]
         if changed:
             print("The following file(s) have been modified since this interactive session began: "
@@ -375,22 +1023,179 @@ class NEOShell(cmd.Cmd):
                 return 'exit'
         return line
 
+    def postcmd(self, stop, line):
+        """Dump the metrics, if a metrics file was given."""
+        if self.metrics and self.metrics_file:
+            try:
+                self.metrics.write(self.metrics_file)
+            except OSError as err:
+                print(f"Couldn't dump the metrics: {err}", file=sys.stderr)
+        return stop
+
 
 def main():
     """Run the main script."""
-    parser, inspect_parser, query_parser = make_parser()
+    parser, inspect_parser, query_parser, ingest_parser, neo_query_parser = make_parser()
     args = parser.parse_args()
 
-    # Extract data from the data files into structured Python objects.
-    database = NEODatabase(load_neos(args.neofile), load_approaches(args.cadfile))
+    # Several close approach files are merged, and passed around as a list.
+    try:
+        cadfiles = expand_paths(args.cadfile or [DATA_ROOT / 'cad.json'])
+    except ValueError as err:
+        parser.error(str(err))
+    # A directory holds one close approach file per year or decade, as written by `split`.
+    partition_dir = cadfiles[0] if len(cadfiles) == 1 and cadfiles[0].is_dir() else None
+    if partition_dir:
+        partitions = list_partitions(partition_dir)
+        if not partitions:
+            parser.error(f"{partition_dir} doesn't contain any close approach partition files.")
+        cadfiles = [path for _, _, path in partitions]
+    args.cadfile = cadfiles[0] if len(cadfiles) == 1 else cadfiles
+
+    # The `split` subcommand reads the close approach file itself.
+    if args.cmd == 'split':
+        if partition_dir or len(cadfiles) > 1:
+            print("Please give a single close approach file to split.", file=sys.stderr)
+            return
+        split_approaches(args.cadfile, args.outdir, span=args.span, suffix=args.suffix)
+        return
+
+    # The `diff` subcommand streams both close approach files itself.
+    if args.cmd == 'diff':
+        diff(args)
+        return
+
+    # The `convert` subcommand reads the data files itself.
+    if args.cmd == 'convert':
+        convert(args.neofile, args.cadfile, args.outfile)
+        return
+
+    # The `ingest` subcommand merges into the SQLite database file. An existing database
+    # is merged into as it is; only a missing one is built from the data files first.
+    if args.cmd == 'ingest':
+        if not args.sqlite:
+            print("Please use --sqlite with `ingest`, to give the database to merge into.",
+                  file=sys.stderr)
+            return
+        if not SQLiteNEODatabase.exists(args.sqlite):
+            try:
+                SQLiteNEODatabase.open(args.sqlite, args.neofile, args.cadfile).close()
+            except OSError as err:
+                print(f"Couldn't build {args.sqlite} from the data files: {err}", file=sys.stderr)
+                return
+        ingest(None, args)
+        return
+
+    # The interactive shell shows its prompt right away, while the data loads in
+    # the background, and loads the data again whenever the watched files change.
+    if args.cmd == 'interactive':
+        if args.sqlite:
+            watched = (args.neofile, *cadfiles)
+
+            def load():
+                return SQLiteNEODatabase.open(args.sqlite, args.neofile, args.cadfile)
+        elif args.columnar:
+            watched = (args.columnar,)
+
+            def load():
+                return ColumnarNEODatabase(args.columnar)
+        elif partition_dir:
+            # Watch the directory too, to notice new partition files.
+            watched = (args.neofile, partition_dir, *cadfiles)
+
+            def load():
+                return PartitionedNEODatabase(load_neos(args.neofile), list_partitions(partition_dir))
+        else:
+            watched = (args.neofile, *cadfiles)
+
+            def load():
+                return NEODatabase(load_neos(args.neofile), load_approaches(args.cadfile))
+
+        def timed(kind):
+            # Report how long each load takes to the instrumentation listeners.
+            def timed_load():
+                start = time.perf_counter()
+                database = load()
+                instrumentation.notify('load_finished', kind, time.perf_counter() - start)
+                return database
+            return timed_load
+
+        metrics = None
+        if args.metrics_port is not None or args.metrics_file:
+            metrics = NEOMetrics()
+            instrumentation.add_listener(metrics)
+            if args.metrics_port is not None:
+                try:
+                    server = metrics.serve(args.metrics_port)
+                except OSError as err:
+                    parser.error(f"Couldn't serve the metrics: {err}")
+                print(f"Serving metrics at http://127.0.0.1:{server.server_address[1]}/metrics",
+                      file=sys.stderr)
+        NEOShell(load_in_background(timed('load')), inspect_parser, query_parser,
+                 aggressive=args.aggressive, ingest_parser=ingest_parser,
+                 neo_query_parser=neo_query_parser, reload=timed('reload'), watched=watched,
+                 metrics=metrics, metrics_file=args.metrics_file).cmdloop()
+        return
+
+    # NEOs are queried through indexes of the NEOs loaded in memory.
+    if args.cmd == 'query-neos' and (args.sqlite or args.columnar):
+        print("Please use `query-neos` without --sqlite or --columnar.", file=sys.stderr)
+        return
+
+    # Extract data from the data files into structured Python objects, loading
+    # only what the chosen subcommand needs.
+    profiler = Profiler(enabled=bool(args.profile or args.profile_output),
+                        trace_memory=args.profile_memory)
+    neo_csv_path = None
+    if args.sqlite:
+        database = profiler.call('database open', SQLiteNEODatabase.open,
+                                 args.sqlite, args.neofile, args.cadfile)
+    elif args.columnar:
+        database = profiler.call('database open', ColumnarNEODatabase, args.columnar)
+    elif args.cmd == 'inspect' and len(cadfiles) == 1 and not (
+            is_compressed(args.neofile) or is_compressed(args.cadfile)):
+        # Looking up a single NEO only needs a few rows of the data files.
+        database = profiler.call('database open', OffsetIndex.open, args.neofile, args.cadfile)
+    else:
+        neos, approaches = [], []
+        if args.cmd == 'inspect' and not args.verbose:
+            # Without `--verbose`, the NEO's close approaches aren't shown.
+            neos = profiler.call('csv load', load_neos, args.neofile)
+        elif args.cmd == 'query':
+            # Skip the close approaches that the filters reject before constructing them,
+            # and then construct only the NEOs that the remaining ones refer to.
+            filters = filters_from(args)
+            if partition_dir:
+                # Only read the partition files that overlap the filters' dates.
+                approaches = profiler.call('json load', load_approaches,
+                                           select_partitions(partitions, filters), filters)
+            else:
+                approaches = profiler.call('json load', load_approaches, args.cadfile, filters)
+            if not row_predicate(filters)[1]:
+                # No filter depends on NEOs, so only the NEOs of the results are needed.
+                neo_csv_path = args.neofile
+            else:
+                designations = {approach._designation for approach in approaches}
+                neos = profiler.call('csv load', load_neos, args.neofile, designations)
+        else:
+            neos = profiler.call('csv load', load_neos, args.neofile)
+            approaches = profiler.call('json load', load_approaches, args.cadfile)
+        with profiler.phase('link', rows=len(approaches)):
+            database = NEODatabase(neos, approaches)
 
     # Run the chosen subcommand.
-    if args.cmd == 'inspect':
-        inspect(database, pdes=args.pdes, name=args.name, verbose=args.verbose)
+    if args.cmd == 'query-neos':
+        query_neos(database, args, profiler)
+    elif args.cmd == 'inspect':
+        with profiler.phase('inspect'):
+            inspect(database, pdes=args.pdes, name=args.name, verbose=args.verbose)
     elif args.cmd == 'query':
-        query(database, args)
-    elif args.cmd == 'interactive':
-        NEOShell(database, inspect_parser, query_parser, aggressive=args.aggressive).cmdloop()
+        query(database, args, neo_csv_path, profiler)
+
+    if args.profile:
+        profiler.report()
+    if args.profile_output:
+        profiler.write_json(args.profile_output)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,251 @@
+"""Keep metrics of queries, caches and loads, in the Prometheus text format.
+
+The `NEOMetrics` class is an instrumentation listener (see `instrumentation`)
+for long-lived processes, such as the interactive shell. Once registered, it
+keeps histograms of the latency, result count and number of scanned rows of
+every query, counts of the hits and misses of each database's caches, and a
+histogram of the duration of each kind of load (the initial load, reloads, and
+loads of partition files).
+
+The metrics can be rendered in the Prometheus text exposition format with
+`render`, dumped to a file with `write`, or served over HTTP at `/metrics` with
+`serve`, so that a Prometheus server can scrape them and alert on regressions.
+"""
+import http.server
+import os
+import socketserver
+import threading
+
+from instrumentation import Listener
+
+
+# The upper bounds of the buckets of the latency and duration histograms, in seconds.
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+                    30.0, 60.0)
+
+# The upper bounds of the buckets of the histograms of row counts.
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+
+
+def _labels(names, values):
+    """Format a set of labels, such as `{backend="NEODatabase",cache="objects"}`."""
+    if not names:
+        return ''
+    pairs = (f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return '{' + ','.join(pairs) + '}'
+
+
+def _escape(value):
+    """Escape a label value for the text format."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    """Format a sample value for the text format."""
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """A monotonically increasing count, for each combination of label values."""
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        """Create a new `Counter`.
+
+        :param name: The name of the metric, such as `neo_cache_hits_total`.
+        :param documentation: A description of the metric.
+        :param labels: The names of the metric's labels.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+
+    def inc(self, amount=1, *label_values):
+        """Add an amount to the count for some label values."""
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        """Return the count for some label values."""
+        return self._values.get(label_values, 0)
+
+    def samples(self):
+        """Produce the name, labels and value of each sample of the metric."""
+        for label_values, value in sorted(self._values.items()):
+            yield self.name, _labels(self.labels, label_values), value
+
+
+class Histogram:
+    """Counts of observations in cumulative buckets, for each combination of label values."""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets, labels=()):
+        """Create a new `Histogram`.
+
+        :param name: The name of the metric, such as `neo_query_duration_seconds`.
+        :param documentation: A description of the metric.
+        :param buckets: The upper bounds of the buckets, in increasing order.
+        :param labels: The names of the metric's labels.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets) + (float('inf'),)
+        self.labels = tuple(labels)
+        # Map label values to the (non-cumulative) bucket counts, the sum and the count.
+        self._values = {}
+
+    def observe(self, value, *label_values):
+        """Record an observation for some label values."""
+        state = self._values.get(label_values)
+        if state is None:
+            state = self._values[label_values] = [[0] * len(self.buckets), 0.0, 0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[0][index] += 1
+                break
+        state[1] += value
+        state[2] += 1
+
+    def count(self, *label_values):
+        """Return the number of observations for some label values."""
+        state = self._values.get(label_values)
+        return state[2] if state else 0
+
+    def samples(self):
+        """Produce the name, labels and value of each sample of the metric."""
+        names = self.labels + ('le',)
+        for label_values, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield (f'{self.name}_bucket', _labels(names, label_values + (_number(bound),)),
+                       cumulative)
+            yield f'{self.name}_sum', _labels(self.labels, label_values), total
+            yield f'{self.name}_count', _labels(self.labels, label_values), count
+
+
+class NEOMetrics(Listener):
+    """Keep metrics of queries, caches and loads, for scraping by Prometheus.
+
+    Register it with `instrumentation.add_listener`. It may be updated and
+    rendered from several threads at once.
+    """
+    def __init__(self):
+        """Create a new `NEOMetrics`, with nothing observed yet."""
+        self._lock = threading.Lock()
+        self.query_duration = Histogram(
+            'neo_query_duration_seconds', "Time from the start of a query to its end.",
+            DURATION_BUCKETS, labels=('backend',))
+        self.query_results = Histogram(
+            'neo_query_results', "Number of close approaches a query produced.",
+            ROW_BUCKETS, labels=('backend',))
+        self.query_scanned = Histogram(
+            'neo_query_scanned_rows', "Number of close approaches a query checked.",
+            ROW_BUCKETS, labels=('backend',))
+        self.cache_hits = Counter(
+            'neo_cache_hits_total', "Entries that queries found in a cache.",
+            labels=('backend', 'cache'))
+        self.cache_misses = Counter(
+            'neo_cache_misses_total', "Entries that queries had to build or load into a cache.",
+            labels=('backend', 'cache'))
+        self.load_duration = Histogram(
+            'neo_load_duration_seconds', "Time taken to load data.",
+            DURATION_BUCKETS, labels=('kind',))
+
+    def query_finished(self, database, filters, scanned, matched, elapsed):
+        """Observe a query's latency, result count and scanned rows."""
+        backend = type(database).__name__
+        with self._lock:
+            self.query_duration.observe(elapsed, backend)
+            self.query_results.observe(matched, backend)
+            self.query_scanned.observe(scanned, backend)
+
+    def cache_used(self, database, cache, hits, misses):
+        """Count a query's cache hits and misses."""
+        backend = type(database).__name__
+        with self._lock:
+            self.cache_hits.inc(hits, backend, cache)
+            self.cache_misses.inc(misses, backend, cache)
+
+    def load_finished(self, kind, elapsed):
+        """Observe the duration of a load."""
+        with self._lock:
+            self.load_duration.observe(elapsed, kind)
+
+    def hit_ratio(self, backend, cache):
+        """Return the share of a cache's lookups that were hits, or `None` if there were none.
+
+        :param backend: The name of a database class, such as 'SQLiteNEODatabase'.
+        :param cache: The name of the cache, such as 'objects'.
+        """
+        hits, misses = self.cache_hits.value(backend, cache), self.cache_misses.value(backend, cache)
+        return hits / (hits + misses) if hits + misses else None
+
+    def render(self):
+        """Render every metric in the Prometheus text exposition format.
+
+        :return: The metrics, as a string.
+        """
+        lines = []
+        with self._lock:
+            for metric in (self.query_duration, self.query_results, self.query_scanned,
+                           self.cache_hits, self.cache_misses, self.load_duration):
+                lines.append(f'# HELP {metric.name} {metric.documentation}')
+                lines.append(f'# TYPE {metric.name} {metric.kind}')
+                lines.extend(f'{name}{labels} {_number(value)}'
+                             for name, labels, value in metric.samples())
+            lines.append('# HELP neo_cache_hit_ratio Share of cache lookups that were hits.')
+            lines.append('# TYPE neo_cache_hit_ratio gauge')
+            for label_values in sorted(set(self.cache_hits._values) | set(self.cache_misses._values)):
+                ratio = self.hit_ratio(*label_values)
+                if ratio is not None:
+                    lines.append(f"neo_cache_hit_ratio{_labels(('backend', 'cache'), label_values)} "
+                                 f"{_number(ratio)}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, filename):
+        """Dump the metrics to a file, replacing it at once so that readers never see half of it.
+
+        :param filename: A Path-like object pointing to where the metrics should be saved.
+        """
+        tmp_path = f'{filename}.tmp'
+        with open(tmp_path, 'w') as outfile:
+            outfile.write(self.render())
+        os.replace(tmp_path, filename)
+
+    def serve(self, port, host='127.0.0.1'):
+        """Serve the metrics over HTTP at `/metrics`, from a background thread.
+
+        :param port: The port on which to listen, or 0 for any free port.
+        :param host: The address on which to listen; by default, only local connections.
+        :return: The `http.server.HTTPServer`; its `server_address` gives the port
+                 it listens on, and `shutdown` stops it.
+        """
+        metrics = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Scrapes would otherwise be logged to standard error, over the shell's output.
+                pass
+
+        server = _ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """An HTTP server that handles each request in a thread (as Python 3.7+ `ThreadingHTTPServer`)."""
+    daemon_threads = True
@@ -1,7 +1,7 @@
 """Represent models for near-Earth objects and their close approaches.
 
 The `NearEarthObject` class represents a near-Earth object. Each has a unique
-primary designation, an optional unique name, an optional diameter, and a flag
+primary designation, an optional name, an optional diameter, and a flag
 for whether the object is potentially hazardous.
 
 The `CloseApproach` class represents a close approach to Earth by an NEO. Each
@@ -9,7 +9,12 @@ has an approach datetime, a nominal approach distance, and a relative approach
 velocity.
 
 A `NearEarthObject` maintains a collection of its close approaches, and a
-`CloseApproach` maintains a reference to its NEO.
+`CloseApproach` maintains a reference to its NEO. The collection is a read-only
+sequence, in time order - not a list - to which approaches are added with
+`add_approach`; it compares equal to a list or tuple of the same approaches.
+
+The `approach_key` function identifies a close approach, so that the same
+approach can be recognized in different data files.
 
 The functions that construct these objects use information extracted from the
 data files from NASA, so these objects should be able to handle all of the
@@ -17,21 +22,31 @@ quirks of the data set, such as missing names and unknown diameters.
 
 You'll edit this file in Task 1.
 """
-from helpers import cd_to_datetime, datetime_to_str
+import bisect
+import collections.abc
 import re
 
+from helpers import cd_to_datetime, datetime_to_str
+
 
 class NearEarthObject:
     """A near-Earth object (NEO).
 
     An NEO encapsulates semantic and physical parameters about the object, such
-    as its primary designation (required, unique), IAU name (optional), diameter
-    in kilometers (optional - sometimes unknown), and whether it's marked as
-    potentially hazardous to Earth.
+    as its primary designation (required, unique), IAU name (optional, and
+    sometimes reused by several NEOs), diameter in kilometers (optional -
+    sometimes unknown), and whether it's marked as potentially hazardous to
+    Earth.
 
     A `NearEarthObject` also maintains a collection of its close approaches -
     initialized to an empty collection, but eventually populated in the
     `NEODatabase` constructor.
+
+    The approaches are kept in time order, together with their times, as each
+    is added, and so are the closest and fastest of them; so the number,
+    extremes and next approach of an NEO don't scan its approaches. An approach
+    is added with `add_approach` (or all of them replaced by assigning to
+    `approaches`), since `approaches` is a read-only view.
     """
     def __init__(self, **info):
         """Create a new `NearEarthObject`.
@@ -51,6 +66,74 @@ class NearEarthObject:
         # Create an empty initial collection of linked approaches.
         self.approaches = []
 
+    @property
+    def approaches(self):
+        """Return the close approaches of this NEO, in time order, as a read-only view.
+
+        The view can't be changed, so that the approaches aren't changed without
+        updating their times and statistics; use `add_approach` instead.
+        """
+        return self._approaches_view
+
+    @approaches.setter
+    def approaches(self, approaches):
+        """Replace the close approaches of this NEO, sorting them and recomputing their statistics.
+
+        :param approaches: An iterable of `CloseApproach`es, in any order.
+        """
+        self._approaches = []
+        self._approaches_view = _ApproachesView(self._approaches)
+        self._times = []
+        self.closest_approach = None
+        self.fastest_approach = None
+        for approach in sorted(approaches, key=lambda approach: approach.time):
+            self.add_approach(approach)
+
+    def add_approach(self, approach):
+        """Add a close approach to this NEO, keeping the approaches in time order.
+
+        An approach at the same time as others goes after them. Approaches are
+        usually added in time order, which appends them.
+
+        :param approach: A `CloseApproach` of this NEO.
+        """
+        time = approach.time
+        if not self._times or time >= self._times[-1]:
+            self._approaches.append(approach)
+            self._times.append(time)
+        else:
+            index = bisect.bisect_right(self._times, time)
+            self._approaches.insert(index, approach)
+            self._times.insert(index, time)
+        if self.closest_approach is None or approach.distance < self.closest_approach.distance:
+            self.closest_approach = approach
+        if self.fastest_approach is None or approach.velocity > self.fastest_approach.velocity:
+            self.fastest_approach = approach
+
+    @property
+    def approach_count(self):
+        """Return the number of close approaches of this NEO."""
+        return len(self._approaches)
+
+    @property
+    def first_approach(self):
+        """Return the earliest close approach of this NEO, or `None` if it has none."""
+        return self._approaches[0] if self._approaches else None
+
+    @property
+    def last_approach(self):
+        """Return the latest close approach of this NEO, or `None` if it has none."""
+        return self._approaches[-1] if self._approaches else None
+
+    def next_approach(self, after):
+        """Return the first close approach of this NEO strictly after a time.
+
+        :param after: A `datetime`.
+        :return: A `CloseApproach`, or `None` if there's none after `after`.
+        """
+        index = bisect.bisect_right(self._times, after)
+        return self._approaches[index] if index < len(self._approaches) else None
+
     @property
     def fullname(self):
         """Return a representation of the full name of this NEO."""
@@ -96,6 +179,46 @@ class NearEarthObject:
             return ''
 
 
+class _ApproachesView(collections.abc.Sequence):
+    """A read-only view of the close approaches of an NEO, which follows them as they're added."""
+    __slots__ = ('_approaches',)
+    # A mutable view isn't hashable, as a list isn't.
+    __hash__ = None
+
+    def __init__(self, approaches):
+        """Create a new `_ApproachesView`.
+
+        :param approaches: The list of `CloseApproach`es to view.
+        """
+        self._approaches = approaches
+
+    def __len__(self):
+        """Return the number of close approaches."""
+        return len(self._approaches)
+
+    def __getitem__(self, index):
+        """Return a close approach, or a tuple of them for a slice."""
+        if isinstance(index, slice):
+            return tuple(self._approaches[index])
+        return self._approaches[index]
+
+    def __iter__(self):
+        """Iterate over the close approaches, in time order."""
+        return iter(self._approaches)
+
+    def __eq__(self, other):
+        """Return whether another list, tuple or view holds the same close approaches."""
+        if isinstance(other, _ApproachesView):
+            other = other._approaches
+        if not isinstance(other, (list, tuple)):
+            return NotImplemented
+        return self._approaches == list(other)
+
+    def __repr__(self):
+        """Return `repr(self)`."""
+        return f"{type(self).__name__}({self._approaches!r})"
+
+
 class CloseApproach:
     """A close approach to Earth by an NEO.
 
@@ -119,7 +242,9 @@ class CloseApproach:
         # Coerce these values to their appropriate data type and handle any edge cases.
         # The `cd_to_datetime` function will be useful.
         self._designation = info.get('des')  # Primary designation of the associated NEO
-        self.time = cd_to_datetime(info.get('cd'))  # Use the cd_to_datetime function
+        self._jd = info.get('jd')  # Julian date of the approach, as in the data file (if given)
+        # A storage backend may supply an already-parsed `datetime` as `time` instead of `cd`.
+        self.time = info['time'] if 'time' in info else cd_to_datetime(info.get('cd'))
         self.distance = float(info.get('dist')) if info.get('dist') else 0.0
         self.velocity = float(info.get('v_rel')) if info.get('v_rel') else 0.0
 
@@ -156,3 +281,15 @@ class CloseApproach:
         """Return `repr(self)`, a computer-readable string representation of this object."""
         return f"CloseApproach(time={self.time_str!r}, distance={self.distance:.2f}, " \
                f"velocity={self.velocity:.2f}, neo={self.neo!r})"
+
+
+def approach_key(approach):
+    """Identify a close approach by its NEO's designation and its Julian date.
+
+    Approaches built without a Julian date (e.g. by a storage backend) are
+    identified by their time instead.
+
+    :param approach: A `CloseApproach`.
+    :return: A hashable key, equal for the same approach in different data files.
+    """
+    return approach._designation, approach._jd if approach._jd is not None else approach.time
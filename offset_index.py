@@ -0,0 +1,426 @@
+"""Look up single NEOs by seeking into the data files, instead of loading them.
+
+The `OffsetIndex` class maps each NEO's primary designation and name to the
+byte offset of its row in the NEO CSV file, and each designation to the byte
+offsets of its close approaches' rows in the close approach JSON file. The
+index is built by scanning both files once, and is persisted next to the NEO
+file, so that later runs only read the index itself.
+
+The persisted index is a one-line JSON header - which identifies the data files
+it was built from - followed by fixed-width columns of offsets: one table of
+designations and one of names, each sorted so that it can be bisected, and the
+close approaches' offsets grouped by designation. Opening the index only reads
+its header and memory-maps the rest, and a lookup only touches the few pages
+it bisects through, however big the data files are.
+
+To look up an NEO, the data files are memory-mapped, and only the rows of the
+NEO and its close approaches are parsed. It provides the same
+`get_neo_by_designation`, `get_neo_by_name`, `get_neos_by_name`, `find_neos`,
+`complete_neos` and `suggest_neos` methods as `NEODatabase`, which is all that
+the `inspect` subcommand needs.
+
+The data files must be uncompressed, so that they can be memory-mapped. The JSON
+file must follow NASA's format, in which the rows of "data" are flat lists of
+strings (and so never contain square brackets).
+"""
+import array
+import bisect
+import csv
+import json
+import mmap
+import pathlib
+import re
+import sys
+
+from extract import source_signature
+from indexes import (PrefixIndex, TrigramIndex, COMPLETION_LIMIT, SUGGESTION_LIMIT,
+                     WILDCARD)
+from models import NearEarthObject, CloseApproach
+
+
+# Bump this whenever the index's structure changes, so that stale indexes are rebuilt.
+INDEX_VERSION = 2
+
+# The columns of the persisted index, in order, with their `array` typecodes. The
+# designations and names are (start, length) pairs into `strings`.
+BLOCKS = (
+    # The designation table, sorted by designation.
+    ('des_start', 'Q'),
+    ('des_length', 'Q'),
+    ('des_neo', 'Q'),  # The offset of the NEO's row.
+    ('des_approach_start', 'Q'),  # The NEO's first position in `approach_offsets`.
+    ('des_approach_count', 'Q'),
+    # The name table, sorted by name, and then in the order of the NEOs' rows.
+    ('name_start', 'Q'),
+    ('name_length', 'Q'),
+    ('name_neo', 'Q'),
+    # The offsets of the close approaches' rows, grouped by designation in file order.
+    ('approach_offsets', 'Q'),
+    ('strings', 'B'),
+)
+
+_DATA_START = re.compile(rb'"data"\s*:\s*\[')
+_FIELDS = re.compile(rb'"fields"\s*:\s*(\[[^\[\]]*\])')
+_ROW = re.compile(rb'\s*(\[[^\[\]]*\])\s*,?')
+
+
+def index_path_for(neo_csv_path):
+    """Return the path at which the index of a NEO file is persisted."""
+    neo_csv_path = pathlib.Path(neo_csv_path)
+    return neo_csv_path.with_name(neo_csv_path.name + '.offsets')
+
+
+def _map(path):
+    """Memory-map a file for reading."""
+    with open(path, 'rb') as infile:
+        return mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _csv_lines(mm, offset=0):
+    """Produce the decoded lines of a memory-mapped file from an offset, with their offsets."""
+    size = len(mm)
+    while offset < size:
+        end = mm.find(b'\n', offset)
+        end = size if end < 0 else end + 1
+        yield offset, mm[offset:end].decode('utf-8')
+        offset = end
+
+
+def _iter_csv_rows(mm):
+    """Produce each row of a memory-mapped CSV file, with the byte offset at which it starts.
+
+    Rows may span several lines (in quoted fields), so offsets are taken from
+    the lines that the CSV reader actually consumes.
+    """
+    offsets = []
+
+    def lines():
+        for offset, line in _csv_lines(mm):
+            offsets.append(offset)
+            yield line
+
+    reader = csv.reader(lines())
+    consumed = 0
+    for row in reader:
+        # The reader pulls exactly the lines of each row, so the row starts at the
+        # first line that no earlier row consumed.
+        yield offsets[0], row
+        del offsets[:reader.line_num - consumed]
+        consumed = reader.line_num
+
+
+def _cad_fields(mm):
+    """Read the "fields" of a memory-mapped close approach JSON file."""
+    match = _FIELDS.search(mm)
+    if not match:
+        raise ValueError("The close approach file has no fields.")
+    return json.loads(match.group(1))
+
+
+def _iter_cad_row_offsets(mm):
+    """Produce the byte offset and the decoded row of each element of "data" in a mapped JSON file."""
+    match = _DATA_START.search(mm)
+    if not match:
+        return
+    pos = match.end()
+    while True:
+        match = _ROW.match(mm, pos)
+        if not match:
+            return
+        yield match.start(1), json.loads(match.group(1))
+        pos = match.end()
+
+
+def _signature(neo_csv_path, cad_json_path):
+    """Identify the data files (and the version of this module) that an index is built from."""
+    return {
+        'version': INDEX_VERSION,
+        'neofile': source_signature(neo_csv_path),
+        'cadfile': source_signature(cad_json_path),
+    }
+
+
+def build_index(neo_csv_path, cad_json_path):
+    """Scan the data files to build an offset index.
+
+    :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :return: The contents of the persisted index, as `bytes`.
+    """
+    neos, names, approaches = {}, [], {}
+    with _map(neo_csv_path) as mm:
+        rows = _iter_csv_rows(mm)
+        _, header = next(rows)
+        pdes, name = header.index('pdes'), header.index('name')
+        for offset, row in rows:
+            if not row:
+                continue
+            neos[row[pdes].encode('utf-8')] = offset
+            if row[name]:
+                names.append((row[name].encode('utf-8'), offset))
+
+    with _map(cad_json_path) as mm:
+        des = _cad_fields(mm).index('des')
+        for offset, row in _iter_cad_row_offsets(mm):
+            approaches.setdefault(row[des].encode('utf-8'), []).append(offset)
+
+    columns = {name: array.array(typecode) for name, typecode in BLOCKS}
+    strings = columns['strings']
+
+    def add_string(prefix, key):
+        columns[prefix + '_start'].append(len(strings))
+        columns[prefix + '_length'].append(len(key))
+        strings.frombytes(key)
+
+    for designation in sorted(neos):
+        add_string('des', designation)
+        columns['des_neo'].append(neos[designation])
+        offsets = approaches.get(designation, ())
+        columns['des_approach_start'].append(len(columns['approach_offsets']))
+        columns['des_approach_count'].append(len(offsets))
+        columns['approach_offsets'].extend(offsets)
+    # The sort is stable, so NEOs with a reused name stay in the order of their rows.
+    for key, offset in sorted(names, key=lambda pair: pair[0]):
+        add_string('name', key)
+        columns['name_neo'].append(offset)
+
+    blocks, data = [], bytearray()
+    for block_name, _ in BLOCKS:
+        column = columns[block_name]
+        if sys.byteorder != 'little' and column.typecode != 'B':
+            column.byteswap()
+        # Keep each block aligned to its items.
+        data.extend(b'\0' * (-len(data) % 8))
+        blocks.append((len(data), len(column) * column.itemsize))
+        data.extend(column.tobytes())
+
+    header = json.dumps({**_signature(neo_csv_path, cad_json_path), 'blocks': blocks})
+    # Pad the header line, so that the blocks after it are aligned too.
+    header = header.encode('utf-8') + b' ' * (-(len(header) + 1) % 8) + b'\n'
+    return header + bytes(data)
+
+
+def _read_signature(path):
+    """Read the signature in a persisted index's header, or return `None` if it can't be read."""
+    try:
+        with open(path, 'rb') as infile:
+            header = json.loads(infile.readline())
+        return {key: header.get(key) for key in ('version', 'neofile', 'cadfile')}
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _persist(path, data):
+    """Write a built index to a file, replacing it atomically."""
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as outfile:
+        outfile.write(data)
+    tmp_path.replace(path)
+
+
+class _SortedKeys:
+    """A read-only sequence of the keys of a table of the index, for use with `bisect`."""
+    def __init__(self, strings, starts, lengths):
+        """Create a new `_SortedKeys`.
+
+        :param strings: The `strings` block of the index.
+        :param starts: The column of the keys' starts in `strings`.
+        :param lengths: The column of the keys' lengths.
+        """
+        self._strings = strings
+        self._starts = starts
+        self._lengths = lengths
+
+    def __len__(self):
+        """Return the number of keys."""
+        return len(self._starts)
+
+    def __getitem__(self, index):
+        """Return the key in position `index`, as UTF-8 `bytes`."""
+        start = self._starts[index]
+        return bytes(self._strings[start:start + self._lengths[index]])
+
+
+class OffsetIndex:
+    """An index of byte offsets into the data files, for looking up single NEOs.
+
+    Use `OffsetIndex.open` to open a persisted index, (re)building it if needed.
+    """
+    def __init__(self, neo_csv_path, cad_json_path, data):
+        """Create a new `OffsetIndex` from an index built by `build_index`.
+
+        :param neo_csv_path: A path to the indexed CSV file of near-Earth objects.
+        :param cad_json_path: A path to the indexed JSON file of close approaches.
+        :param data: The contents of the index, as `bytes` or a memory-mapped file.
+        :raises ValueError: If the index is malformed or truncated.
+        """
+        self.neo_csv_path = neo_csv_path
+        self.cad_json_path = cad_json_path
+        end = data.find(b'\n')
+        header = json.loads(bytes(data[:end])) if end >= 0 else {}
+        blocks = header.get('blocks')
+        if not blocks or len(blocks) != len(BLOCKS):
+            raise ValueError("The offset index is malformed.")
+        view = memoryview(data)[end + 1:]
+        for (name, typecode), (offset, size) in zip(BLOCKS, blocks):
+            if offset + size > len(view):
+                raise ValueError("The offset index is truncated.")
+            block = view[offset:offset + size].cast(typecode)
+            if sys.byteorder != 'little' and typecode != 'B':
+                block = array.array(typecode, block)
+                block.byteswap()
+            setattr(self, '_' + name, block)
+        self._designations = _SortedKeys(self._strings, self._des_start, self._des_length)
+        self._names = _SortedKeys(self._strings, self._name_start, self._name_length)
+        self._neo_header = None
+        self._fields = None
+        # The `PrefixIndex` of the NEOs' offsets by 'name' and by 'designation', once built.
+        self._prefix_indexes = {}
+        # The `TrigramIndex` of the NEOs' names and of their designations, once built.
+        self._trigram_indexes = {}
+
+    @classmethod
+    def open(cls, neo_csv_path, cad_json_path):
+        """Open the persisted index of the data files, building and persisting it if needed.
+
+        The index is rebuilt if it doesn't exist yet, was built by a different
+        version of this module, or was built from data files that have since
+        changed. If the index can't be persisted (e.g. in a read-only data
+        directory), it's still used for this run.
+
+        :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+        :param cad_json_path: A path to a JSON file containing data about close approaches.
+        :return: An `OffsetIndex`.
+        """
+        path = index_path_for(neo_csv_path)
+        if _read_signature(path) == _signature(neo_csv_path, cad_json_path):
+            try:
+                return cls(neo_csv_path, cad_json_path, _map(path))
+            except (OSError, ValueError):
+                pass
+        data = build_index(neo_csv_path, cad_json_path)
+        try:
+            _persist(path, data)
+        except OSError:
+            pass
+        return cls(neo_csv_path, cad_json_path, data)
+
+    @staticmethod
+    def _range(keys, key):
+        """Return the range of positions of a key in a sorted table of the index."""
+        key = key.encode('utf-8')
+        lo = bisect.bisect_left(keys, key)
+        return range(lo, bisect.bisect_right(keys, key, lo))
+
+    def _neo_offsets(self, designation):
+        """Return the offset of an NEO's row (or `None`) and the offsets of its approaches' rows."""
+        positions = self._range(self._designations, designation)
+        if not positions:
+            return None, ()
+        position = positions[0]
+        start = self._des_approach_start[position]
+        return (self._des_neo[position],
+                self._approach_offsets[start:start + self._des_approach_count[position]])
+
+    def _load_neo(self, offset):
+        """Parse the NEO whose row starts at an offset, along with its close approaches."""
+        with _map(self.neo_csv_path) as mm:
+            if self._neo_header is None:
+                self._neo_header = next(csv.reader(line for _, line in _csv_lines(mm)))
+            rows = csv.reader(line for _, line in _csv_lines(mm, offset))
+            neo = NearEarthObject(**dict(zip(self._neo_header, next(rows))))
+
+        _, offsets = self._neo_offsets(neo.designation)
+        if offsets:
+            with _map(self.cad_json_path) as mm:
+                if self._fields is None:
+                    self._fields = _cad_fields(mm)
+                for approach_offset in offsets:
+                    row = json.loads(_ROW.match(mm, approach_offset).group(1))
+                    approach = CloseApproach(**dict(zip(self._fields, row)))
+                    approach.neo = neo
+                    neo.add_approach(approach)
+        return neo
+
+    def get_neo_by_designation(self, designation):
+        """Find and return an NEO by its primary designation.
+
+        If no match is found, return `None` instead.
+
+        :param designation: The primary designation of the NEO to search for.
+        :return: The `NearEarthObject` with the desired primary designation, or `None`.
+        """
+        offset, _ = self._neo_offsets(designation)
+        return self._load_neo(offset) if offset is not None else None
+
+    def get_neo_by_name(self, name):
+        """Find and return an NEO by its name.
+
+        If no match is found, return `None` instead.
+
+        :param name: The name, as a string, of the NEO to search for.
+        :return: The `NearEarthObject` with the desired name, or `None`.
+        """
+        if not (name and name.strip()):
+            return None
+        positions = self._range(self._names, name)
+        # If a name is reused, the last NEO with that name wins, as in `NEODatabase`.
+        return self._load_neo(self._name_neo[positions[-1]]) if positions else None
+
+    def get_neos_by_name(self, name):
+        """Find and return every NEO with a name, in the order of their rows.
+
+        :param name: The name, as a string, of the NEOs to search for.
+        :return: A list of the `NearEarthObject`s with the desired name, empty if there are none.
+        """
+        if not (name and name.strip()):
+            return []
+        return [self._load_neo(self._name_neo[position])
+                for position in self._range(self._names, name)]
+
+    def _prefix_index(self, by):
+        """Return the `PrefixIndex` of the NEOs' offsets by 'name' or 'designation', built once."""
+        index = self._prefix_indexes.get(by)
+        if index is None:
+            keys, offsets = ((self._names, self._name_neo) if by == 'name'
+                             else (self._designations, self._des_neo))
+            # Add the NEOs in the order of their rows, as `NEODatabase` does.
+            positions = sorted(range(len(keys)), key=offsets.__getitem__)
+            pairs = ((keys[position].decode('utf-8'), offsets[position]) for position in positions)
+            index = self._prefix_indexes[by] = PrefixIndex(pairs)
+        return index
+
+    def find_neos(self, pattern, by='name'):
+        """Find the NEOs whose name (or designation) matches a pattern, ignoring case.
+
+        :param pattern: The pattern to match, as for `NEODatabase.find_neos`.
+        :param by: Whether to match the NEOs' 'name' or their 'designation'.
+        :return: A list of the matching `NearEarthObject`s, in order of name (or designation).
+        """
+        if not (pattern and pattern.strip()):
+            return []
+        return [self._load_neo(offset) for offset in self._prefix_index(by).search(pattern)]
+
+    def complete_neos(self, prefix, by='name', limit=COMPLETION_LIMIT):
+        """List the names (or designations) that start with a prefix, ignoring case.
+
+        :param prefix: The start of a name or designation.
+        :param by: Whether to list the NEOs' 'name's or their 'designation's.
+        :param limit: The most names to list, or `None` for all of them.
+        :return: A sorted list of names or designations.
+        """
+        return self._prefix_index(by).complete(prefix, limit)
+
+    def suggest_neos(self, key, by='name', limit=SUGGESTION_LIMIT):
+        """Suggest the names (or designations) most similar to a misspelled one.
+
+        :param key: A name or designation that matched no NEO.
+        :param by: Whether to suggest the NEOs' 'name's or their 'designation's.
+        :param limit: The most names to suggest.
+        :return: A list of names or designations, most similar first.
+        """
+        index = self._trigram_indexes.get(by)
+        if index is None:
+            keys = self._prefix_index(by).complete('', None)
+            index = self._trigram_indexes[by] = TrigramIndex(keys)
+        return index.suggest(key.rstrip(WILDCARD), limit)
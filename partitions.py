@@ -0,0 +1,251 @@
+"""Store close approaches in a directory of one file per year or per decade.
+
+The `split_approaches` function splits a close approach JSON file into a
+directory of smaller files in the same format, one per year (`cad-2020.json`)
+or per decade (`cad-2020s.json`). Each file's name says which years it covers,
+so a query only needs to read the files that overlap its dates.
+
+The `list_partitions` function finds the files in such a directory, and the
+`select_partitions` function picks the ones that a collection of filters could
+match. The main module passes the selected files to `load_approaches` for a
+one-off query.
+
+The `PartitionedNEODatabase` class is an `NEODatabase` that loads partitions
+lazily: each query loads only the partitions it needs that haven't been loaded
+yet, and merges them in with `add_approaches`. This keeps the latency of a query
+for a narrow range of dates independent of the span of the whole data set.
+"""
+import json
+import operator
+import pathlib
+import re
+import time
+
+import instrumentation
+from compression import is_compressed, open_compressed, split_suffix
+from database import NEODatabase
+from extract import open_data_file, iter_cad_rows, load_approaches
+from filters import DateFilter
+
+
+# Map each partitioning to the number of years in each partition.
+PARTITION_SPANS = {
+    'year': 1,
+    'decade': 10,
+}
+
+_PARTITION_NAME = re.compile(r'cad-(\d+)(s?)')
+
+
+def partition_path(directory, start_year, span='decade', suffix='.json'):
+    """Build the path of the partition file that starts with a given year.
+
+    :param directory: The directory of partition files.
+    :param start_year: The first year that the partition covers.
+    :param span: The partitioning, as a key of `PARTITION_SPANS`.
+    :param suffix: The suffix of the file, optionally with a compression suffix.
+    :return: A `pathlib.Path`.
+    """
+    marker = 's' if PARTITION_SPANS[span] == 10 else ''
+    return pathlib.Path(directory) / f'cad-{start_year}{marker}{suffix}'
+
+
+def list_partitions(directory):
+    """Find the partition files in a directory, in time order.
+
+    :param directory: The directory of partition files.
+    :return: A list of tuples of the first year each file covers, the year
+             after the last year it covers, and the file's path.
+    """
+    partitions = []
+    for path in pathlib.Path(directory).iterdir():
+        form, compression = split_suffix(path)
+        if form != '.json':
+            continue
+        match = _PARTITION_NAME.fullmatch(
+            path.name[:len(path.name) - len(form) - len(compression or '')])
+        if match:
+            start = int(match.group(1))
+            partitions.append((start, start + (10 if match.group(2) else 1), path))
+    return sorted(partitions)
+
+
+def year_range(filters):
+    """Find the range of years that a collection of date filters can match.
+
+    :param filters: A collection of filters.
+    :return: A tuple of the first and the last year that can match, either of
+             which is `None` if it's unbounded.
+    """
+    first = last = None
+    for filter_func in filters:
+        if type(filter_func) is not DateFilter:
+            continue
+        op, year = filter_func.op, filter_func.value.year
+        if op in (operator.eq, operator.ge, operator.gt):
+            first = year if first is None else max(first, year)
+        if op in (operator.eq, operator.le, operator.lt):
+            last = year if last is None else min(last, year)
+    return first, last
+
+
+def _overlaps(partition, first, last):
+    """Return whether a partition covers any year from `first` to `last` (inclusive)."""
+    start, end, _ = partition
+    return (first is None or end > first) and (last is None or start <= last)
+
+
+def select_partitions(partitions, filters=()):
+    """Pick the partition files that a collection of filters could match.
+
+    :param partitions: A list of partitions, as from `list_partitions`.
+    :param filters: A collection of filters.
+    :return: A list of the paths of the partition files to read.
+    """
+    first, last = year_range(filters)
+    return [partition[2] for partition in partitions if _overlaps(partition, first, last)]
+
+
+def split_approaches(cad_json_path, directory, span='decade', suffix='.json'):
+    """Split a close approach JSON file into one file per year or per decade.
+
+    Each partition file has the same "fields" as the original file, and its
+    rows in the original order, so partitions of a time-ordered file are
+    time-ordered too.
+
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :param directory: The directory in which to write the partition files.
+    :param span: The partitioning, as a key of `PARTITION_SPANS`.
+    :param suffix: The suffix of each file: `.json`, optionally followed by
+                   `.gz`, `.bz2` or `.xz`.
+    :return: A dictionary mapping the path of each partition file to its number of rows.
+    :raises ValueError: If the partitioning or the suffix is unsupported.
+    """
+    if span not in PARTITION_SPANS:
+        raise ValueError(f"Partitions can span a {' or a '.join(PARTITION_SPANS)}, not {span!r}.")
+    if split_suffix('cad' + suffix)[0] != '.json':
+        raise ValueError(f"Partition files must be JSON files, not {suffix!r}.")
+    years = PARTITION_SPANS[span]
+    directory = pathlib.Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    outfiles, counts = {}, {}
+    fields = None
+    try:
+        with open_data_file(cad_json_path) as infile:
+            for row in iter_cad_rows(infile):
+                if fields is None:
+                    fields = list(row)
+                year = int(row['cd'][:4])
+                path = partition_path(directory, year - year % years, span, suffix)
+                outfile = outfiles.get(path)
+                if outfile is None:
+                    outfile = outfiles[path] = (open_compressed(path, 'wt') if is_compressed(path)
+                                                else open(path, 'w'))
+                    outfile.write(f'{{"fields": {json.dumps(fields)}, "data": [\n')
+                    counts[path] = 0
+                else:
+                    outfile.write(',\n')
+                json.dump([row[field] for field in fields], outfile)
+                counts[path] += 1
+        for outfile in outfiles.values():
+            outfile.write('\n]}\n')
+    finally:
+        for outfile in outfiles.values():
+            outfile.close()
+    return counts
+
+
+class PartitionedNEODatabase(NEODatabase):
+    """An `NEODatabase` whose close approaches are loaded from partition files on demand.
+
+    A query only loads the partitions that overlap its dates. Looking up or
+    querying NEOs loads every partition, so that their `.approaches` are
+    complete.
+    """
+    def __init__(self, neos, partitions):
+        """Create a new `PartitionedNEODatabase`, without loading any partitions yet.
+
+        :param neos: A collection of `NearEarthObject`s.
+        :param partitions: A list of partitions, as from `list_partitions`.
+        """
+        super().__init__(neos, [])
+        self._partitions = list(partitions)
+        self._unloaded = list(partitions)
+
+    def _load(self, first=None, last=None):
+        """Load the partitions that cover any year from `first` to `last`, if not loaded yet.
+
+        While an instrumentation listener is registered, how many of the
+        partitions were already loaded, and how long each load took, are
+        reported to it.
+        """
+        if instrumentation.listeners:
+            needed = sum(_overlaps(partition, first, last) for partition in self._partitions)
+            misses = sum(_overlaps(partition, first, last) for partition in self._unloaded)
+            instrumentation.notify('cache_used', self, 'partitions', needed - misses, misses)
+        unloaded = []
+        for partition in self._unloaded:
+            if _overlaps(partition, first, last):
+                start = time.perf_counter()
+                self.add_approaches(load_approaches(partition[2]))
+                if instrumentation.listeners:
+                    instrumentation.notify('load_finished', 'partition', time.perf_counter() - start)
+            else:
+                unloaded.append(partition)
+        self._unloaded = unloaded
+
+    def get_neo_by_designation(self, designation):
+        """Find and return an NEO by its primary designation, after loading every partition.
+
+        :param designation: The primary designation of the NEO to search for.
+        :return: The `NearEarthObject` with the desired primary designation, or `None`.
+        """
+        self._load()
+        return super().get_neo_by_designation(designation)
+
+    def get_neo_by_name(self, name):
+        """Find and return an NEO by its name, after loading every partition.
+
+        :param name: The name, as a string, of the NEO to search for.
+        :return: The `NearEarthObject` with the desired name, or `None`.
+        """
+        self._load()
+        return super().get_neo_by_name(name)
+
+    def get_neos_by_name(self, name):
+        """Find and return every NEO with a name, after loading every partition.
+
+        :param name: The name, as a string, of the NEOs to search for.
+        :return: A list of the `NearEarthObject`s with the desired name.
+        """
+        self._load()
+        return super().get_neos_by_name(name)
+
+    def find_neos(self, pattern, by='name'):
+        """Find the NEOs whose name (or designation) matches a pattern, after loading everything.
+
+        :param pattern: The pattern to match, as for `NEODatabase.find_neos`.
+        :param by: Whether to match the NEOs' 'name' or their 'designation'.
+        :return: A list of the matching `NearEarthObject`s.
+        """
+        self._load()
+        return super().find_neos(pattern, by)
+
+    def query_neos(self, filters=()):
+        """Query NEOs, after loading every partition, so that their close approaches are complete.
+
+        :param filters: A collection of NEO filters capturing user-specified criteria.
+        :return: A stream of matching `NearEarthObject`s.
+        """
+        self._load()
+        return super().query_neos(filters)
+
+    def query(self, filters=()):
+        """Query close approaches, after loading the partitions that overlap the filters' dates.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :return: A stream of matching `CloseApproach` objects.
+        """
+        self._load(*year_range(filters))
+        return super().query(filters)
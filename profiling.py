@@ -0,0 +1,272 @@
+"""Measure how long each phase of a run takes, and how much memory it uses.
+
+A `Profiler` records, for each named phase (such as loading the CSV file or
+writing the results), its wall time, its CPU time, its peak traced memory, and
+the number of rows it processed.
+
+A phase is either a block of code, measured with the `phase` context manager
+(or a single call, measured with `call`), or a stage of a lazy pipeline,
+measured with `stream`, which times each step of an iterator. Phases may
+nest - a writer pulls rows through `limit`, which pulls them through `query` -
+so each phase is only charged for its own time, not that of the phases nested
+in it.
+
+Optionally, the peak memory of each phase (including the phases nested in it)
+is measured with `tracemalloc`. Tracing every allocation slows the run down
+many times over - and allocation-heavy phases, like parsing, the most - so the
+times of a run that traces memory should only be compared with one another.
+
+A disabled profiler measures nothing: `phase` returns a do-nothing context
+manager and `stream` returns the iterator as it is, so the code being profiled
+doesn't need to check whether profiling is on.
+
+The main module creates a `Profiler` for `--profile` (and `--profile-memory`),
+and prints its `report` or saves it with `write_json` at the end of the run.
+"""
+import json
+import sys
+import time
+import tracemalloc
+
+
+class PhaseRecord:
+    """The measurements of one phase, accumulated over each time it ran."""
+    __slots__ = ('name', 'wall', 'cpu', 'peak', 'rows', 'runs')
+
+    def __init__(self, name):
+        """Create a new `PhaseRecord`, with nothing measured yet.
+
+        :param name: The name of the phase.
+        """
+        self.name = name
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak = 0
+        self.rows = None
+        self.runs = 0
+
+    @property
+    def rate(self):
+        """The number of rows processed per second of wall time, or `None` if unknown."""
+        if self.rows is None or self.wall <= 0:
+            return None
+        return self.rows / self.wall
+
+    def serialize(self):
+        """Return a JSON-compatible dictionary of these measurements."""
+        return {
+            'phase': self.name,
+            'wall_s': self.wall,
+            'cpu_s': self.cpu,
+            'peak_bytes': self.peak,
+            'rows': self.rows,
+            'rows_per_s': self.rate,
+            'runs': self.runs,
+        }
+
+
+class _Frame:
+    """A running measurement of a phase, as a context manager."""
+    __slots__ = ('profiler', 'record', 'rows', 'wall', 'cpu', 'child_wall', 'child_cpu', 'peak')
+
+    def __init__(self, profiler, record, rows=None):
+        self.profiler = profiler
+        self.record = record
+        self.rows = rows
+
+    def __enter__(self):
+        """Start measuring, as the innermost running phase."""
+        self.child_wall = self.child_cpu = 0.0
+        self.peak = 0
+        self.profiler._enter(self)
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Stop measuring, and charge the time to the record; exceptions propagate."""
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        self.profiler._exit(self, wall, cpu)
+        return False
+
+
+class _PhaseFrame(_Frame):
+    """A `_Frame` for a block of code, which counts a run and takes its row count on exit."""
+    __slots__ = ()
+
+    def __exit__(self, *exc_info):
+        """Stop measuring, and count a run of the phase, and its rows if known."""
+        super().__exit__(*exc_info)
+        record = self.record
+        record.runs += 1
+        if self.rows is not None:
+            record.rows = (record.rows or 0) + self.rows
+        return False
+
+    def counted(self, iterable):
+        """Count the elements of an iterable as the rows of this phase, as they're produced."""
+        self.rows = self.rows or 0
+        for element in iterable:
+            self.rows += 1
+            yield element
+
+
+class _NullFrame:
+    """A stand-in for `_Frame` that measures nothing, for a disabled profiler."""
+    rows = None
+
+    def __enter__(self):
+        """Return this frame, measuring nothing."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Do nothing; exceptions propagate."""
+        return False
+
+    def counted(self, iterable):
+        """Return the iterable as it is."""
+        return iterable
+
+
+class Profiler:
+    """Record the wall time, CPU time, peak memory and row count of each phase of a run."""
+    def __init__(self, enabled=True, trace_memory=False):
+        """Create a new `Profiler`.
+
+        :param enabled: Whether to measure anything at all.
+        :param trace_memory: Whether to trace memory allocations with `tracemalloc`.
+        """
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory
+        self._records = {}
+        self._stack = []
+        self._null = _NullFrame()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def _record(self, name):
+        """Return the record of a phase, creating it if needed."""
+        record = self._records.get(name)
+        if record is None:
+            record = self._records[name] = PhaseRecord(name)
+        return record
+
+    def _fold_peak(self):
+        """Charge the peak memory since the last fold to every running phase, and reset it."""
+        if not self.trace_memory:
+            return
+        peak = tracemalloc.get_traced_memory()[1]
+        for frame in self._stack:
+            frame.peak = max(frame.peak, peak)
+        # Before Python 3.9, the peak can't be reset, so it's the peak of the run so far.
+        getattr(tracemalloc, 'reset_peak', lambda: None)()
+
+    def _enter(self, frame):
+        """Push a frame that starts measuring onto the stack of running phases."""
+        self._fold_peak()
+        self._stack.append(frame)
+
+    def _exit(self, frame, wall, cpu):
+        """Pop a frame that stops measuring, charging its own time to its record.
+
+        The time of the phases nested in the frame is subtracted from it, and its
+        whole time is charged to its parent, if any, as time nested in it.
+
+        :param frame: The `_Frame` that stops measuring.
+        :param wall: The wall time of the frame, including its nested phases.
+        :param cpu: The CPU time of the frame, including its nested phases.
+        """
+        self._fold_peak()
+        self._stack.pop()
+        record = frame.record
+        record.wall += wall - frame.child_wall
+        record.cpu += cpu - frame.child_cpu
+        record.peak = max(record.peak, frame.peak)
+        if self._stack:
+            parent = self._stack[-1]
+            parent.child_wall += wall
+            parent.child_cpu += cpu
+
+    def phase(self, name, rows=None):
+        """Measure a block of code as a phase.
+
+        The number of rows can be given up front, or set later on the returned
+        object's `rows` attribute, before the block ends.
+
+        :param name: The name of the phase.
+        :param rows: The number of rows that the phase processes, if known.
+        :return: A context manager.
+        """
+        if not self.enabled:
+            return self._null
+        return _PhaseFrame(self, self._record(name), rows)
+
+    def call(self, name, func, *args, **kwargs):
+        """Call a function as a phase, counting the rows of the collection it returns.
+
+        :param name: The name of the phase.
+        :param func: The function to call, such as `load_neos`.
+        :param args: Positional arguments passed to `func`.
+        :param kwargs: Keyword arguments passed to `func`.
+        :return: The result of `func`.
+        """
+        with self.phase(name) as phase:
+            result = func(*args, **kwargs)
+            if hasattr(result, '__len__'):
+                phase.rows = len(result)
+        return result
+
+    def stream(self, name, iterable):
+        """Measure each step of an iterator as a phase, counting the rows it produces.
+
+        :param name: The name of the phase.
+        :param iterable: An iterable, such as a lazy stream of results.
+        :return: An iterator over the same elements, or `iterable` itself if disabled.
+        """
+        if not self.enabled:
+            return iterable
+        return self._stream(self._record(name), iter(iterable))
+
+    def _stream(self, record, iterator):
+        """Yield the elements of an iterator, measuring each step as a run of a phase."""
+        record.rows = record.rows or 0
+        record.runs += 1
+        frame = _Frame(self, record)
+        while True:
+            with frame:
+                try:
+                    element = next(iterator)
+                except StopIteration:
+                    return
+            record.rows += 1
+            yield element
+
+    def records(self):
+        """Return the record of each phase, in the order in which the phases were first set up."""
+        return list(self._records.values())
+
+    def report(self, file=None):
+        """Print the records as a table.
+
+        :param file: The file to which to print the table; by default, standard error.
+        """
+        file = file or sys.stderr
+        print(f"{'phase':<16} {'wall s':>9} {'cpu s':>9} {'peak MiB':>9} {'rows':>10} "
+              f"{'rows/s':>12}", file=file)
+        for record in self.records():
+            rows = '' if record.rows is None else f'{record.rows:,}'
+            rate = '' if record.rate is None else f'{record.rate:,.0f}'
+            peak = f'{record.peak / (1 << 20):.1f}' if self.trace_memory else ''
+            print(f"{record.name:<16} {record.wall:9.3f} {record.cpu:9.3f} {peak:>9} "
+                  f"{rows:>10} {rate:>12}", file=file)
+
+    def write_json(self, filename):
+        """Save the records as a JSON file.
+
+        :param filename: A Path-like object pointing to where the records should be saved.
+        """
+        with open(filename, 'w') as outfile:
+            json.dump({'phases': [record.serialize() for record in self.records()]},
+                      outfile, indent=2)
+            outfile.write('\n')
@@ -0,0 +1,562 @@
+"""Store near-Earth objects and their close approaches in a SQLite database.
+
+The `SQLiteNEODatabase` class is an alternative to `NEODatabase` for data sets
+that are too big to comfortably hold in memory. The data files are ingested
+once into a local SQLite file, with indexes on approach time, distance,
+velocity and designation; afterwards, opening the database is nearly instant
+and queries only read the rows they need.
+
+It provides the same `get_neo_by_designation`, `get_neo_by_name`,
+`get_neos_by_name`, `find_neos`, `complete_neos`, `suggest_neos` and `query`
+methods as `NEODatabase`, so the main module can use either one. The filters
+produced by `create_filters` are translated into parameterized SQL, and any
+filter without a SQL translation is evaluated in Python on the rows the SQL
+query produces.
+
+`NearEarthObject`s and `CloseApproach`es are built from the database on demand,
+and the NEOs of a query's rows are fetched together, a batch of rows at a time.
+While an object is in use it isn't built again, so the objects reachable from a
+query result (an approach's `.neo`, and that NEO's `.approaches`) are linked
+just as they are in an `NEODatabase`. Only the most recently used NEOs (and
+their close approaches) are kept once they're no longer in use, so a long
+query doesn't end up holding the whole data set in memory.
+
+The `ingest_delta` function merges new NEOs and close approaches (e.g. from a
+newer NASA extract) into an existing database file in place, skipping the ones
+it already holds, so that the whole data set doesn't need to be ingested again.
+"""
+import collections
+import datetime
+import math
+import operator
+import os
+import pathlib
+import sqlite3
+import time
+import weakref
+
+import instrumentation
+from extract import iter_neos, iter_approaches, source_signature
+from filters import DateFilter, DistanceFilter, VelocityFilter, DiameterFilter, HazardousFilter
+from indexes import (PrefixIndex, TrigramIndex, COMPLETION_LIMIT, SUGGESTION_LIMIT,
+                     WILDCARD)
+from models import NearEarthObject, CloseApproach
+
+
+# The number of recently used NEOs (with their close approaches) that are kept even
+# after they're no longer in use.
+NEO_CACHE_SIZE = 4096
+
+# The number of query rows whose NEOs are fetched together. SQLite allows 999 parameters
+# per statement in older versions, so this also bounds the designations in an `IN` list.
+QUERY_BATCH_SIZE = 256
+
+# Bump this whenever the schema changes, so that stale database files are rebuilt.
+SCHEMA_VERSION = '2'
+
+SCHEMA = """
+CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE neos (
+    designation TEXT PRIMARY KEY,
+    name TEXT,
+    diameter REAL,
+    hazardous INTEGER NOT NULL
+);
+CREATE TABLE approaches (
+    id INTEGER PRIMARY KEY,
+    designation TEXT NOT NULL,
+    jd TEXT,
+    time TEXT NOT NULL,
+    distance REAL NOT NULL,
+    velocity REAL NOT NULL
+);
+"""
+
+# Indexes are created after the data is inserted, which is much faster than
+# maintaining them during ingest.
+INDEXES = """
+CREATE INDEX neos_name ON neos (name);
+CREATE INDEX approaches_designation_jd ON approaches (designation, jd);
+CREATE INDEX approaches_time ON approaches (time);
+CREATE INDEX approaches_distance ON approaches (distance);
+CREATE INDEX approaches_velocity ON approaches (velocity);
+"""
+
+# The number of rows inserted per batch during ingest.
+INSERT_BATCH_SIZE = 10000
+
+_SQL_OPERATORS = {
+    operator.eq: '=',
+    operator.ne: '!=',
+    operator.lt: '<',
+    operator.le: '<=',
+    operator.gt: '>',
+    operator.ge: '>=',
+}
+
+# Map each filter class that compares a plain column to that column. An approach
+# without an NEO has no diameter and isn't hazardous, as in `DiameterFilter` and
+# `HazardousFilter`.
+_FILTER_COLUMNS = {
+    DistanceFilter: 'a.distance',
+    VelocityFilter: 'a.velocity',
+    DiameterFilter: 'n.diameter',
+    HazardousFilter: 'COALESCE(n.hazardous, 0)',
+}
+
+_APPROACH_COLUMNS = 'a.id, a.designation, a.jd, a.time, a.distance, a.velocity'
+
+_INSERT_NEO = 'INSERT OR IGNORE INTO neos VALUES (?, ?, ?, ?)'
+
+
+def _read_only_uri(path):
+    """Build a URI to open a database file read-only."""
+    return pathlib.Path(path).resolve().as_uri() + '?mode=ro'
+
+
+def _date_clause(op, date):
+    """Translate a `DateFilter` into a SQL clause on the `time` column.
+
+    Times are stored as 'YYYY-MM-DD HH:MM' strings, which sort chronologically,
+    so each comparison on the date becomes a range on the time index.
+
+    :param op: The filter's comparator.
+    :param date: The filter's reference `datetime.date`.
+    :return: A tuple of a SQL clause and its parameters, or `None` if `op` is unsupported.
+    """
+    start = date.isoformat()
+    end = (date + datetime.timedelta(days=1)).isoformat()
+    clauses = {
+        operator.eq: ('a.time >= ? AND a.time < ?', (start, end)),
+        operator.ne: ('(a.time < ? OR a.time >= ?)', (start, end)),
+        operator.lt: ('a.time < ?', (start,)),
+        operator.le: ('a.time < ?', (end,)),
+        operator.gt: ('a.time >= ?', (end,)),
+        operator.ge: ('a.time >= ?', (start,)),
+    }
+    return clauses.get(op)
+
+
+def translate_filters(filters):
+    """Translate a collection of filters into a SQL `WHERE` clause.
+
+    :param filters: A collection of filters, as produced by `create_filters`.
+    :return: A tuple of the SQL clauses, their parameters, whether the clauses
+             need the `neos` table, and the filters that couldn't be translated.
+    """
+    clauses, params, remaining = [], [], []
+    needs_neos = False
+    for filter_func in filters:
+        kind = type(filter_func)
+        translation = None
+        if kind is DateFilter:
+            translation = _date_clause(filter_func.op, filter_func.value)
+        elif kind in _FILTER_COLUMNS and filter_func.op in _SQL_OPERATORS:
+            column = _FILTER_COLUMNS[kind]
+            translation = (f'{column} {_SQL_OPERATORS[filter_func.op]} ?', (filter_func.value,))
+            needs_neos = needs_neos or column.startswith(('n.', 'COALESCE(n.'))
+        if translation is None:
+            remaining.append(filter_func)
+        else:
+            clauses.append(translation[0])
+            params.extend(translation[1])
+    return clauses, params, needs_neos, remaining
+
+
+class SQLiteNEODatabase:
+    """A database of near-Earth objects and their close approaches, stored in SQLite.
+
+    Use `SQLiteNEODatabase.open` to open a database file, ingesting the data
+    files into it first if needed.
+    """
+    def __init__(self, db_path):
+        """Open an existing SQLite database file, previously created by `ingest`.
+
+        The connection may be used from a thread other than the one that
+        created it (e.g. when the database is opened in the background), but
+        not from several threads at once.
+
+        :param db_path: A path to the SQLite database file.
+        """
+        self._connection = sqlite3.connect(_read_only_uri(db_path), uri=True,
+                                           check_same_thread=False)
+        # Map keys to the NEOs and close approaches that have been built and are still in use,
+        # so that none is built twice. An approach keeps its NEO (and so its siblings) alive.
+        self._neos_by_designation = weakref.WeakValueDictionary()
+        self._approaches_by_id = weakref.WeakValueDictionary()
+        # Keep the `NEO_CACHE_SIZE` most recently used NEOs alive, least recently used first.
+        self._recent_neos = collections.OrderedDict()
+        # The `PrefixIndex` of the NEOs' designations by 'name' and by 'designation', once built.
+        self._prefix_indexes = {}
+        # The `TrigramIndex` of the NEOs' names and of their designations, once built.
+        self._trigram_indexes = {}
+
+    @classmethod
+    def open(cls, db_path, neo_csv_path, cad_json_path):
+        """Open a SQLite database of the given data files, ingesting them if needed.
+
+        The data files are (re)ingested if the database file doesn't exist yet,
+        was built by a different schema version, or was built from data files
+        that have since changed.
+
+        :param db_path: A path to the SQLite database file.
+        :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+        :param cad_json_path: A path to a JSON file containing data about close approaches.
+        :return: A `SQLiteNEODatabase`.
+        """
+        expected = {
+            'schema_version': SCHEMA_VERSION,
+            'neofile': source_signature(neo_csv_path),
+            'cadfile': source_signature(cad_json_path),
+        }
+        if cls._read_metadata(db_path) != expected:
+            ingest(neo_csv_path, cad_json_path, db_path)
+        return cls(db_path)
+
+    @classmethod
+    def exists(cls, db_path):
+        """Return whether a database file of the current schema version exists.
+
+        The data files that it was built from aren't checked, so that merging
+        into a database (with `ingest_delta`) doesn't require them.
+
+        :param db_path: A path to the SQLite database file.
+        :return: `True` if the file is a database that `SQLiteNEODatabase` can open.
+        """
+        metadata = cls._read_metadata(db_path)
+        return bool(metadata) and metadata.get('schema_version') == SCHEMA_VERSION
+
+    @staticmethod
+    def _read_metadata(db_path):
+        """Read the metadata of a database file, or return `None` if it can't be read."""
+        if not os.path.exists(db_path):
+            return None
+        try:
+            connection = sqlite3.connect(_read_only_uri(db_path), uri=True)
+            try:
+                return dict(connection.execute('SELECT key, value FROM metadata'))
+            finally:
+                connection.close()
+        except sqlite3.DatabaseError:
+            return None
+
+    def close(self):
+        """Close the connection to the database file."""
+        self._connection.close()
+
+    def _build_approach(self, row):
+        """Build an unlinked `CloseApproach` from a row of the `approaches` table."""
+        approach_id, designation, jd, time, distance, velocity = row
+        approach = CloseApproach(des=designation, jd=jd, time=datetime.datetime.fromisoformat(time),
+                                 dist=distance, v_rel=velocity)
+        self._approaches_by_id[approach_id] = approach
+        return approach
+
+    def _remember(self, neo):
+        """Mark an NEO as the most recently used one, forgetting the least recently used."""
+        self._recent_neos[neo.designation] = neo
+        self._recent_neos.move_to_end(neo.designation)
+        if len(self._recent_neos) > NEO_CACHE_SIZE:
+            self._recent_neos.popitem(last=False)
+
+    def _load_neos(self, designations):
+        """Build the NEOs with some designations that aren't built yet, linked to their approaches.
+
+        The NEOs are fetched with one statement, and their close approaches with
+        another, for every `QUERY_BATCH_SIZE` designations.
+
+        :param designations: A collection of primary designations.
+        :return: A dictionary mapping the designation of each NEO built to the NEO.
+        """
+        missing = [designation for designation in designations
+                   if designation not in self._neos_by_designation]
+        neos = {}
+        for start in range(0, len(missing), QUERY_BATCH_SIZE):
+            batch = missing[start:start + QUERY_BATCH_SIZE]
+            marks = ', '.join('?' * len(batch))
+            rows = self._connection.execute(
+                'SELECT designation, name, diameter, hazardous FROM neos '
+                f'WHERE designation IN ({marks})', batch
+            )
+            for row in rows:
+                neos[row[0]] = NearEarthObject(pdes=row[0], name=row[1],
+                                               diameter='' if row[2] is None else repr(row[2]),
+                                               pha='Y' if row[3] else 'N')
+            rows = self._connection.execute(
+                f'SELECT {_APPROACH_COLUMNS} FROM approaches a '
+                f'WHERE a.designation IN ({marks}) ORDER BY a.time, a.id', batch
+            )
+            for approach_row in rows:
+                neo = neos.get(approach_row[1])
+                if neo is not None:
+                    approach = (self._approaches_by_id.get(approach_row[0])
+                                or self._build_approach(approach_row))
+                    approach.neo = neo
+                    neo.add_approach(approach)
+        for designation, neo in neos.items():
+            self._neos_by_designation[designation] = neo
+            self._remember(neo)
+        return neos
+
+    def _neo(self, designation):
+        """Fetch (building, if needed) the NEO with a designation, linked to its close approaches."""
+        neo = self._neos_by_designation.get(designation)
+        if neo is None:
+            return self._load_neos([designation]).get(designation)
+        self._remember(neo)
+        return neo
+
+    def _approach(self, row):
+        """Fetch (building, if needed) the close approach for a row of the `approaches` table."""
+        approach = self._approaches_by_id.get(row[0])
+        if approach is None:
+            # Building the NEO builds and links all of its close approaches.
+            self._neo(row[1])
+            approach = self._approaches_by_id.get(row[0]) or self._build_approach(row)
+        return approach
+
+    def _approach_batches(self, rows):
+        """Build the close approaches of a query's rows, fetching their NEOs a batch at a time.
+
+        :param rows: A cursor over rows of the `approaches` table.
+        :yield: A tuple of a list of `CloseApproach`es, for a batch of rows, and the
+                number of them that had already been built.
+        """
+        while True:
+            batch = rows.fetchmany(QUERY_BATCH_SIZE)
+            if not batch:
+                return
+            hits = sum(row[0] in self._approaches_by_id for row in batch)
+            # Hold on to the NEOs built for this batch until its approaches are built.
+            neos = self._load_neos({row[1] for row in batch})
+            # Every approach of a built NEO is built too, so any other approach has no NEO.
+            approaches = [self._approaches_by_id.get(row[0]) or self._build_approach(row)
+                          for row in batch]
+            del neos
+            yield approaches, hits
+
+    def get_neo_by_designation(self, designation):
+        """Find and return an NEO by its primary designation.
+
+        If no match is found, return `None` instead.
+
+        :param designation: The primary designation of the NEO to search for.
+        :return: The `NearEarthObject` with the desired primary designation, or `None`.
+        """
+        return self._neo(designation)
+
+    def get_neo_by_name(self, name):
+        """Find and return an NEO by its name.
+
+        If no match is found, return `None` instead.
+
+        :param name: The name, as a string, of the NEO to search for.
+        :return: The `NearEarthObject` with the desired name, or `None`.
+        """
+        if not (name and name.strip()):
+            return None
+        # If a name is reused, the last NEO with that name wins, as in `NEODatabase`.
+        row = self._connection.execute(
+            'SELECT designation FROM neos WHERE name = ? ORDER BY rowid DESC LIMIT 1', (name,)
+        ).fetchone()
+        return self._neo(row[0]) if row else None
+
+    def get_neos_by_name(self, name):
+        """Find and return every NEO with a name, in the order they were ingested.
+
+        :param name: The name, as a string, of the NEOs to search for.
+        :return: A list of the `NearEarthObject`s with the desired name, empty if there are none.
+        """
+        if not (name and name.strip()):
+            return []
+        rows = self._connection.execute(
+            'SELECT designation FROM neos WHERE name = ? ORDER BY rowid', (name,)
+        ).fetchall()
+        return [self._neo(designation) for designation, in rows]
+
+    def _prefix_index(self, by):
+        """Return the `PrefixIndex` of the designations by 'name' or 'designation', built once."""
+        index = self._prefix_indexes.get(by)
+        if index is None:
+            rows = self._connection.execute(f'SELECT {by}, designation FROM neos ORDER BY rowid')
+            index = self._prefix_indexes[by] = PrefixIndex(rows)
+        return index
+
+    def find_neos(self, pattern, by='name'):
+        """Find the NEOs whose name (or designation) matches a pattern, ignoring case.
+
+        :param pattern: The pattern to match, as for `NEODatabase.find_neos`.
+        :param by: Whether to match the NEOs' 'name' or their 'designation'.
+        :return: A list of the matching `NearEarthObject`s, in order of name (or designation).
+        """
+        if not (pattern and pattern.strip()):
+            return []
+        return [self._neo(designation) for designation in self._prefix_index(by).search(pattern)]
+
+    def complete_neos(self, prefix, by='name', limit=COMPLETION_LIMIT):
+        """List the names (or designations) that start with a prefix, ignoring case.
+
+        :param prefix: The start of a name or designation.
+        :param by: Whether to list the NEOs' 'name's or their 'designation's.
+        :param limit: The most names to list, or `None` for all of them.
+        :return: A sorted list of names or designations.
+        """
+        return self._prefix_index(by).complete(prefix, limit)
+
+    def suggest_neos(self, key, by='name', limit=SUGGESTION_LIMIT):
+        """Suggest the names (or designations) most similar to a misspelled one.
+
+        :param key: A name or designation that matched no NEO.
+        :param by: Whether to suggest the NEOs' 'name's or their 'designation's.
+        :param limit: The most names to suggest.
+        :return: A list of names or designations, most similar first.
+        """
+        index = self._trigram_indexes.get(by)
+        if index is None:
+            keys = self._prefix_index(by).complete('', None)
+            index = self._trigram_indexes[by] = TrigramIndex(keys)
+        return index.suggest(key.rstrip(WILDCARD), limit)
+
+    def query(self, filters=()):
+        """Query close approaches to generate those that match a collection of filters.
+
+        This generates a stream of `CloseApproach` objects that match all of the
+        provided filters, in the same order as `NEODatabase.query`.
+
+        :param filters: A collection of filters capturing user-specified criteria.
+        :return: A stream of matching `CloseApproach` objects.
+        """
+        clauses, params, needs_neos, remaining = translate_filters(filters)
+        sql = f'SELECT {_APPROACH_COLUMNS} FROM approaches a'
+        if needs_neos:
+            sql += ' LEFT JOIN neos n ON n.designation = a.designation'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        # Approaches merged in by `ingest_delta` may come before earlier ones in time.
+        sql += ' ORDER BY a.time, a.id'
+
+        rows = self._connection.execute(sql, params)
+        if instrumentation.listeners:
+            yield from self._measured_results(rows, remaining, filters)
+            return
+        for approaches, _ in self._approach_batches(rows):
+            for approach in approaches:
+                if all(filter_func(approach) for filter_func in remaining):
+                    yield approach
+
+    def _measured_results(self, rows, remaining, filters):
+        """Build the results of `query` from its rows, reporting the query to listeners.
+
+        :param rows: The rows of the query's SQL statement.
+        :param remaining: The filters that the SQL statement doesn't cover.
+        :param filters: All of the query's filters, to report to the listeners.
+        :yield: Each matching `CloseApproach`.
+        """
+        scanned = matched = hits = 0
+        start = time.perf_counter()
+        try:
+            for approaches, batch_hits in self._approach_batches(rows):
+                scanned += len(approaches)
+                hits += batch_hits
+                for approach in approaches:
+                    if all(filter_func(approach) for filter_func in remaining):
+                        matched += 1
+                        yield approach
+        finally:
+            instrumentation.notify('query_finished', self, filters, scanned, matched,
+                                   time.perf_counter() - start)
+            instrumentation.notify('cache_used', self, 'objects', hits, scanned - hits)
+
+
+def ingest(neo_csv_path, cad_json_path, db_path):
+    """Ingest the data files into a new SQLite database file.
+
+    The database is built in a temporary file next to `db_path`, which then
+    replaces `db_path` at once, so readers never see a half-built database.
+
+    :param neo_csv_path: A path to a CSV file containing data about near-Earth objects.
+    :param cad_json_path: A path to a JSON file containing data about close approaches.
+    :param db_path: A path to the SQLite database file to create or replace.
+    """
+    db_path = pathlib.Path(db_path)
+    tmp_path = db_path.with_name(db_path.name + '.tmp')
+    if tmp_path.exists():
+        tmp_path.unlink()
+
+    connection = sqlite3.connect(tmp_path)
+    try:
+        connection.execute('PRAGMA journal_mode = OFF')
+        connection.execute('PRAGMA synchronous = OFF')
+        connection.executescript(SCHEMA)
+        _insert_batches(connection, 'INSERT OR REPLACE INTO neos VALUES (?, ?, ?, ?)',
+                        map(_neo_row, iter_neos(neo_csv_path)))
+        _insert_batches(connection, 'INSERT INTO approaches VALUES (NULL, ?, ?, ?, ?, ?)',
+                        map(_approach_row, iter_approaches(cad_json_path)))
+        connection.executescript(INDEXES)
+        connection.executemany('INSERT INTO metadata VALUES (?, ?)', (
+            ('schema_version', SCHEMA_VERSION),
+            ('neofile', source_signature(neo_csv_path)),
+            ('cadfile', source_signature(cad_json_path)),
+        ))
+        connection.execute('ANALYZE')
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(tmp_path, db_path)
+
+
+def ingest_delta(db_path, neos=(), approaches=()):
+    """Merge new NEOs and close approaches into an existing SQLite database file.
+
+    An NEO whose primary designation is already in the database is skipped, as
+    is a close approach with the same designation and Julian date as one
+    already in the database. The indexes are updated as the rows are inserted.
+
+    The merged rows aren't part of the data files that the database was built
+    from, so they're lost if `SQLiteNEODatabase.open` rebuilds the database
+    because those data files changed.
+
+    :param db_path: A path to an existing SQLite database file, created by `ingest`.
+    :param neos: An iterable of `NearEarthObject`s to merge in.
+    :param approaches: An iterable of `CloseApproach`es to merge in.
+    :return: A tuple of the numbers of NEOs and of close approaches that were added.
+    """
+    connection = sqlite3.connect(db_path)
+    try:
+        before = connection.total_changes
+        _insert_batches(connection, _INSERT_NEO, map(_neo_row, neos))
+        neos_added = connection.total_changes - before
+
+        before = connection.total_changes
+        _insert_batches(connection, (
+            'INSERT INTO approaches SELECT NULL, ?1, ?2, ?3, ?4, ?5 WHERE NOT EXISTS '
+            '(SELECT 1 FROM approaches WHERE designation = ?1 AND jd IS ?2)'
+        ), map(_approach_row, approaches))
+        approaches_added = connection.total_changes - before
+        connection.commit()
+    finally:
+        connection.close()
+    return neos_added, approaches_added
+
+
+def _neo_row(neo):
+    """Build a row of the `neos` table from a `NearEarthObject`."""
+    return (neo.designation, neo.name, None if math.isnan(neo.diameter) else neo.diameter,
+            int(neo.hazardous))
+
+
+def _approach_row(approach):
+    """Build a row of the `approaches` table (without its id) from a `CloseApproach`."""
+    return (approach._designation, approach._jd, approach.time.isoformat(' ', 'minutes'),
+            approach.distance, approach.velocity)
+
+
+def _insert_batches(connection, sql, rows):
+    """Insert a stream of rows in batches of `INSERT_BATCH_SIZE`."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= INSERT_BATCH_SIZE:
+            connection.executemany(sql, batch)
+            batch.clear()
+    connection.executemany(sql, batch)
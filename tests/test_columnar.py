@@ -0,0 +1,142 @@
+"""Check that the columnar file format round-trips the data files.
+
+The test data files are converted into a temporary columnar file, which is
+then compared against `load_neos`, `load_approaches` and an in-memory
+`NEODatabase`.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_columnar
+"""
+import datetime
+import math
+import operator
+import pathlib
+import tempfile
+import unittest
+
+from columnar import ColumnarNEODatabase, convert
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters, AttributeFilter
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+def summarize(approaches):
+    return [(approach._designation, approach.time, approach.distance, approach.velocity)
+            for approach in approaches]
+
+
+def describe(neo):
+    return (neo.designation, neo.name, 'nan' if math.isnan(neo.diameter) else neo.diameter,
+            neo.hazardous)
+
+
+class NameLengthFilter(AttributeFilter):
+    """A filter that can't be evaluated on the columns alone."""
+    @classmethod
+    def get(cls, approach):
+        return len(approach.neo.name or '')
+
+
+class TestColumnar(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        path = pathlib.Path(cls.tmpdir.name) / 'neos.col'
+        convert(TEST_NEO_FILE, TEST_CAD_FILE, path)
+        cls.db = ColumnarNEODatabase(path)
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        cls.memory = NEODatabase(cls.neos, cls.approaches)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.db.close()
+        cls.tmpdir.cleanup()
+
+    def assertSameResults(self, filters):
+        self.assertEqual(summarize(self.db.query(filters)), summarize(self.memory.query(filters)))
+
+    def test_counts(self):
+        self.assertEqual(self.db.neo_count, len(self.neos))
+        self.assertEqual(self.db.approach_count, len(self.approaches))
+
+    def test_every_approach_round_trips(self):
+        self.assertEqual(summarize(self.db.query()), summarize(self.approaches))
+
+    def test_every_neo_round_trips(self):
+        for neo in self.neos:
+            converted = self.db.get_neo_by_designation(neo.designation)
+            self.assertEqual(describe(converted), describe(neo))
+            self.assertEqual(summarize(converted.approaches), summarize(neo.approaches))
+
+    def test_get_neo_by_name(self):
+        self.assertEqual(self.db.get_neo_by_name('Jormungandr').designation, '471926')
+        self.assertIsNone(self.db.get_neo_by_name('not-real-name'))
+        self.assertIsNone(self.db.get_neo_by_designation('not-real-designation'))
+
+    def test_find_neos(self):
+        self.assertEqual([neo.designation for neo in self.db.find_neos('JORMUNGANDR')], ['471926'])
+        found = self.db.find_neos('2020 a*', by='designation')
+        expected = self.memory.find_neos('2020 a*', by='designation')
+        self.assertEqual([describe(neo) for neo in found], [describe(neo) for neo in expected])
+        self.assertEqual(self.db.complete_neos('c'), self.memory.complete_neos('c'))
+        self.assertEqual(self.db.suggest_neos('jormungand'), self.memory.suggest_neos('jormungand'))
+
+    def test_reused_names(self):
+        neo_file = pathlib.Path(self.tmpdir.name) / 'neos-reused.csv'
+        # Another NEO named Toro.
+        extra = 'a9999999,29999999,9999 Toro,9999,Toro,,Y,Y\n'
+        neo_file.write_text(TEST_NEO_FILE.read_text() + extra)
+        path = pathlib.Path(self.tmpdir.name) / 'reused.col'
+        convert(neo_file, TEST_CAD_FILE, path)
+        db = ColumnarNEODatabase(path)
+        try:
+            self.assertEqual([neo.designation for neo in db.get_neos_by_name('Toro')],
+                             ['1685', '9999'])
+            self.assertEqual(db.get_neo_by_name('Toro').designation, '9999')
+            self.assertEqual(db.get_neos_by_name('not-real-name'), [])
+        finally:
+            db.close()
+
+    def test_query_dates(self):
+        self.assertSameResults(create_filters(date=datetime.date(2020, 3, 2)))
+        self.assertSameResults(create_filters(start_date=datetime.date(2020, 3, 1),
+                                              end_date=datetime.date(2020, 3, 31)))
+        self.assertSameResults(create_filters(start_date=datetime.date(2020, 10, 1),
+                                              end_date=datetime.date(2020, 4, 1)))
+
+    def test_query_columns(self):
+        self.assertSameResults(create_filters(distance_min=0.1, distance_max=0.3,
+                                              velocity_min=10, velocity_max=20))
+        self.assertSameResults(create_filters(diameter_min=0.5, hazardous=True))
+        self.assertSameResults(create_filters(diameter_max=0.1, hazardous=False))
+
+    def test_query_object_filters(self):
+        self.assertSameResults([NameLengthFilter(operator.ge, 8)])
+
+    def test_results_are_linked(self):
+        approach = next(self.db.query(create_filters(hazardous=True)))
+        self.assertIn(approach, approach.neo.approaches)
+        self.assertIs(self.db.get_neo_by_designation(approach.neo.designation), approach.neo)
+
+    def test_other_files_are_rejected(self):
+        root = pathlib.Path(self.tmpdir.name)
+        contents = (root / 'neos.col').read_bytes()
+        for name, data in (('empty.col', b''), ('header.col', contents[:10]),
+                           ('truncated.col', contents[:len(contents) // 2]),
+                           ('csv.col', TEST_NEO_FILE.read_bytes())):
+            path = root / name
+            path.write_bytes(data)
+            with self.subTest(name=name):
+                with self.assertRaisesRegex(ValueError, 'is not a columnar NEO file'):
+                    ColumnarNEODatabase(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
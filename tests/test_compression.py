@@ -0,0 +1,110 @@
+"""Check that results can be written through the standard library's compressors.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_compression
+"""
+import bz2
+import csv
+import gzip
+import io
+import json
+import lzma
+import pathlib
+import tempfile
+import unittest
+import unittest.mock
+
+from compression import split_suffix, open_compressed, COMPRESSION_LEVELS
+from extract import load_neos, load_approaches
+from database import NEODatabase
+from write import write_to_csv, write_to_json, write_to_ndjson, writer_for
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestSplitSuffix(unittest.TestCase):
+    def test_split_uncompressed_suffix(self):
+        self.assertEqual(split_suffix('results.csv'), ('.csv', None))
+        self.assertEqual(split_suffix(pathlib.Path('out/results.json')), ('.json', None))
+
+    def test_split_compressed_suffix(self):
+        self.assertEqual(split_suffix('results.csv.gz'), ('.csv', '.gz'))
+        self.assertEqual(split_suffix('results.json.xz'), ('.json', '.xz'))
+        self.assertEqual(split_suffix(pathlib.Path('results.jsonl.bz2')), ('.jsonl', '.bz2'))
+
+    def test_writer_for_ignores_compression_suffix(self):
+        self.assertIs(writer_for('results.csv.gz'), write_to_csv)
+        self.assertIs(writer_for('results.json.xz'), write_to_json)
+        self.assertIs(writer_for('results.ndjson.bz2'), write_to_ndjson)
+        self.assertIsNone(writer_for('results.txt.gz'))
+
+    def test_open_uncompressed_path_fails(self):
+        with self.assertRaises(ValueError):
+            open_compressed('results.csv', 'wt')
+
+    def test_every_compressor_accepts_every_level(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for suffix in ('.gz', '.bz2', '.xz'):
+                for level in COMPRESSION_LEVELS:
+                    path = pathlib.Path(tmpdir) / f'results{level}.csv{suffix}'
+                    with open_compressed(path, 'wt', level=level) as outfile:
+                        outfile.write('designation\n')
+
+
+class TestCompressedWrite(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        neos = load_neos(TEST_NEO_FILE)
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        NEODatabase(neos, cls.approaches)
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_and_decompress(self, writer, name, opener, **kwargs):
+        compressed = self.root / name
+        plain = self.root / pathlib.Path(name).stem
+        writer(self.approaches, compressed, **kwargs)
+        writer(self.approaches, plain)
+        with opener(compressed, 'rt', newline='') as infile, plain.open(newline='') as expected:
+            self.assertEqual(infile.read(), expected.read())
+        return plain
+
+    def test_csv_gzip_round_trip(self):
+        plain = self.write_and_decompress(write_to_csv, 'results.csv.gz', gzip.open)
+        with plain.open(newline='') as infile:
+            self.assertEqual(len(list(csv.DictReader(infile))), len(self.approaches))
+
+    def test_json_xz_round_trip(self):
+        plain = self.write_and_decompress(write_to_json, 'results.json.xz', lzma.open,
+                                          compresslevel=1)
+        self.assertEqual(len(json.loads(plain.read_text())), len(self.approaches))
+
+    def test_ndjson_bz2_round_trip_with_background_thread(self):
+        plain = self.write_and_decompress(write_to_ndjson, 'results.jsonl.bz2', bz2.open,
+                                          threaded=True)
+        self.assertEqual(len(plain.read_text().splitlines()), len(self.approaches))
+
+    def test_background_thread_surfaces_errors(self):
+        class Broken(io.RawIOBase):
+            def writable(self):
+                return True
+
+            def write(self, data):
+                raise OSError("disk full")
+
+        with unittest.mock.patch.dict('compression.COMPRESSORS', {'.gz': lambda *args: Broken()}):
+            with self.assertRaises(OSError):
+                write_to_csv(self.approaches, self.root / 'results.csv.gz', threaded=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
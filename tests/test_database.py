@@ -17,6 +17,7 @@ import unittest
 
 from extract import load_neos, load_approaches
 from database import NEODatabase
+from models import NearEarthObject
 
 
 # Paths to the test data files.
@@ -114,6 +115,67 @@ class TestDatabase(unittest.TestCase):
         nonexistent = self.db.get_neo_by_name('not-real-name')
         self.assertIsNone(nonexistent)
 
+    def test_get_neos_by_name(self):
+        self.assertEqual(self.db.get_neos_by_name('Lemmon'), [self.db.get_neo_by_name('Lemmon')])
+        self.assertEqual(self.db.get_neos_by_name('not-real-name'), [])
+        self.assertEqual(self.db.get_neos_by_name(''), [])
+        self.assertEqual(self.db.get_neos_by_name(None), [])
+
+    def test_reused_names(self):
+        first = NearEarthObject(pdes='1', name='Twin')
+        second = NearEarthObject(pdes='2', name='Twin')
+        db = NEODatabase([first, second], [])
+        self.assertEqual(db.get_neos_by_name('Twin'), [first, second])
+        self.assertIs(db.get_neo_by_name('Twin'), second)
+
+        third = NearEarthObject(pdes='3', name='Twin')
+        db.add_neos([third])
+        self.assertEqual(db.get_neos_by_name('Twin'), [first, second, third])
+        self.assertEqual(db.find_neos('twin'), [first, second, third])
+
+
+class TestAddToDatabase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.full = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    def setUp(self):
+        self.neos = load_neos(TEST_NEO_FILE)
+        self.approaches = load_approaches(TEST_CAD_FILE)
+
+    def summarize(self, approaches):
+        return [(approach._designation, approach.time) for approach in approaches]
+
+    def test_add_approaches_matches_full_database(self):
+        # Start with every other approach, then merge in the rest, with some repeats.
+        db = NEODatabase(self.neos, self.approaches[::2])
+        delta = load_approaches(TEST_CAD_FILE)
+        self.assertEqual(db.add_approaches(delta[1::2] + delta[:100:2]), len(delta[1::2]))
+        self.assertEqual(db.add_approaches(load_approaches(TEST_CAD_FILE)), 0)
+
+        # Approaches at the same minute may be merged in either order.
+        results = self.summarize(db.query())
+        self.assertEqual(sorted(results), sorted(self.summarize(self.full.query())))
+        self.assertEqual([time for _, time in results], sorted(time for _, time in results))
+        for neo in self.neos:
+            self.assertEqual(self.summarize(neo.approaches),
+                             self.summarize(self.full.get_neo_by_designation(neo.designation).approaches))
+            for approach in neo.approaches:
+                self.assertIs(approach.neo, neo)
+
+    def test_add_neos_links_known_approaches(self):
+        toro = next(neo for neo in self.neos if neo.name == 'Toro')
+        db = NEODatabase([neo for neo in self.neos if neo is not toro], self.approaches)
+        self.assertIsNone(db.get_neo_by_name('Toro'))
+
+        self.assertEqual(db.add_neos(load_neos(TEST_NEO_FILE)), 1)
+        added = db.get_neo_by_name('Toro')
+        self.assertEqual(added.designation, toro.designation)
+        self.assertEqual(self.summarize(added.approaches),
+                         self.summarize(self.full.get_neo_by_name('Toro').approaches))
+        for approach in added.approaches:
+            self.assertIs(approach.neo, added)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,97 @@
+"""Check that two close approach data sets can be compared.
+
+A copy of the test close approaches is edited - some rows removed, one revised,
+one nudged by a few seconds and one added - and compared against the original
+with `diff_files`. The differences are then written with the diff writers.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_diff
+"""
+import csv
+import json
+import pathlib
+import tempfile
+import unittest
+
+from compression import open_compressed
+from diff import diff_files, diff_approaches, ADDED, CHANGED, REMOVED
+from extract import load_approaches
+from write import write_diff_to_csv, write_diff_to_ndjson, diff_writer_for
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestDiff(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        root = pathlib.Path(cls.tmpdir.name)
+        document = json.loads(TEST_CAD_FILE.read_text())
+        fields = document['fields']
+        des, jd, dist = fields.index('des'), fields.index('jd'), fields.index('dist')
+        rows = [list(row) for row in document['data']]
+        cls.removed = rows[:3]
+        rows = rows[3:]
+        rows[10][dist] = '0.4'
+        cls.revised = rows[10]
+        # A new orbit solution moves the Julian date, but not the time to the minute.
+        rows[20][jd] = str(float(rows[20][jd]) + 1e-5)
+        cls.added = list(rows[30])
+        cls.added[des] = '2099 ZZ'
+        rows.append(cls.added)
+        document['data'] = rows
+        cls.new_cad_file = root / 'cad-new.json'
+        cls.new_cad_file.write_text(json.dumps(document))
+        cls.changes = list(diff_files(TEST_CAD_FILE, cls.new_cad_file))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def test_changes(self):
+        kinds = [change.change for change in self.changes]
+        self.assertEqual(kinds, [CHANGED, ADDED, REMOVED, REMOVED, REMOVED])
+        revised = self.changes[0]
+        self.assertEqual(revised.new.distance, 0.4)
+        self.assertNotEqual(revised.old.distance, 0.4)
+        self.assertEqual(self.changes[1].new._designation, '2099 ZZ')
+        self.assertIsNone(self.changes[1].old)
+        self.assertIsNone(self.changes[2].new)
+
+    def test_identical_data_sets_have_no_changes(self):
+        approaches = load_approaches(TEST_CAD_FILE)
+        self.assertEqual(list(diff_approaches(approaches, approaches)), [])
+        self.assertEqual(list(diff_files(TEST_CAD_FILE, TEST_CAD_FILE)), [])
+
+    def test_reversed_diff(self):
+        changes = list(diff_files(self.new_cad_file, TEST_CAD_FILE))
+        self.assertEqual([change.change for change in changes],
+                         [ADDED, ADDED, ADDED, CHANGED, REMOVED])
+
+    def test_write_diff_to_csv(self):
+        path = pathlib.Path(self.tmpdir.name) / 'diff.csv'
+        self.assertIs(diff_writer_for(path), write_diff_to_csv)
+        write_diff_to_csv(self.changes, path)
+        with open(path, newline='') as infile:
+            rows = list(csv.DictReader(infile))
+        self.assertEqual([row['change'] for row in rows], [change.change for change in self.changes])
+        self.assertEqual(rows[0]['distance_au'], '0.4')
+        self.assertEqual(rows[1]['old_distance_au'], '')
+        self.assertEqual(rows[2]['distance_au'], '')
+
+    def test_write_diff_to_compressed_ndjson(self):
+        path = pathlib.Path(self.tmpdir.name) / 'diff.jsonl.gz'
+        self.assertIs(diff_writer_for(path), write_diff_to_ndjson)
+        write_diff_to_ndjson(self.changes, path, compresslevel=1)
+        with open_compressed(path, 'rt') as infile:
+            documents = [json.loads(line) for line in infile]
+        self.assertEqual(len(documents), len(self.changes))
+        self.assertEqual(documents[1]['designation'], '2099 ZZ')
+        self.assertIsNone(documents[1]['old_velocity_km_s'])
+
+
+if __name__ == '__main__':
+    unittest.main()
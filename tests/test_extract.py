@@ -10,13 +10,21 @@ To run these tests from the project root, run:
 
 These tests should pass when Task 2 is complete.
 """
+import bz2
 import collections.abc
 import datetime
+import gzip
+import io
+import json
+import lzma
 import pathlib
 import math
+import shutil
+import tempfile
 import unittest
 
-from extract import load_neos, load_approaches
+from extract import load_neos, load_approaches, iter_cad_rows, row_predicate, expand_paths
+from filters import create_filters
 from models import NearEarthObject, CloseApproach
 
 
@@ -77,6 +85,10 @@ class TestLoadNEOs(unittest.TestCase):
         self.assertEqual(neo.diameter, 0.6)
         self.assertEqual(neo.hazardous, True)
 
+    def test_load_selected_designations(self):
+        neos = load_neos(TEST_NEO_FILE, designations={'4581', '2101', 'not-real-designation'})
+        self.assertEqual(sorted(neo.name for neo in neos), ['Adonis', 'Asclepius'])
+
 
 class TestLoadApproaches(unittest.TestCase):
     @classmethod
@@ -117,6 +129,161 @@ class TestLoadApproaches(unittest.TestCase):
         self.assertIsNotNone(approach)
         self.assertIsInstance(approach.velocity, float)
 
+    def assertPushedDown(self, filters):
+        expected = [approach for approach in self.approaches
+                    if all(filter_func(approach) for filter_func in filters)]
+        pushed = load_approaches(TEST_CAD_FILE, filters)
+        self.assertEqual([(a._designation, a.time) for a in pushed],
+                         [(a._designation, a.time) for a in expected])
+
+    def test_pushed_down_date_filters(self):
+        self.assertPushedDown(create_filters(date=datetime.date(2020, 3, 2)))
+        self.assertPushedDown(create_filters(start_date=datetime.date(2020, 9, 30),
+                                             end_date=datetime.date(2020, 12, 1)))
+
+    def test_pushed_down_distance_and_velocity_filters(self):
+        self.assertPushedDown(create_filters(distance_min=0.1, distance_max=0.3,
+                                             velocity_min=10, velocity_max=20))
+
+    def test_neo_filters_are_not_pushed_down(self):
+        filters = create_filters(velocity_min=20, diameter_min=1, hazardous=True)
+        predicate, remaining = row_predicate(filters)
+        self.assertEqual(remaining, filters[1:])
+        self.assertFalse(predicate({'cd': '2020-Jan-01 00:00', 'dist': '0.1', 'v_rel': '5'}))
+        self.assertTrue(predicate({'cd': '2020-Jan-01 00:00', 'dist': '0.1', 'v_rel': '25'}))
+        self.assertFalse(predicate({'cd': '2020-Jan-01 00:00', 'dist': '0.1', 'v_rel': 'fast'}))
+
+
+class TestIterCADRows(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.text = TEST_CAD_FILE.read_text()
+        document = json.loads(cls.text)
+        cls.expected = [dict(zip(document['fields'], row)) for row in document['data']]
+
+    def test_rows_match_whole_document_parse(self):
+        self.assertEqual(list(iter_cad_rows(io.StringIO(self.text))), self.expected)
+
+    def test_rows_are_independent_of_chunk_boundaries(self):
+        compact = json.dumps(json.loads(self.text), separators=(',', ':'))
+        for chunk_size in (64, 1000):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(list(iter_cad_rows(io.StringIO(self.text), chunk_size)), self.expected)
+                self.assertEqual(list(iter_cad_rows(io.StringIO(compact), chunk_size)), self.expected)
+
+    def test_rows_are_produced_lazily(self):
+        # The test file lists "fields" after "data", so put them first to check laziness.
+        document = json.loads(self.text)
+        text = json.dumps({'fields': document['fields'], 'data': document['data']})
+        infile = io.StringIO(text)
+        rows = iter_cad_rows(infile, chunk_size=4096)
+        self.assertEqual(next(rows), self.expected[0])
+        self.assertLess(infile.tell(), len(text))
+
+    def test_truncated_document_fails(self):
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_cad_rows(io.StringIO(self.text[:len(self.text) // 2])))
+
+    def test_missing_or_extra_commas_fail(self):
+        documents = [
+            '{"fields": ["des"] "data": []}',
+            '{"fields": ["des"], "data": [["433"] ["1P"]]}',
+            '{"fields": ["des"], "data": [["433"], ["1P"],]}',
+            '{"fields": ["des"], "data": [, ["433"]]}',
+            '{"fields": ["des"], "data": [["433"]],}',
+        ]
+        for document in documents:
+            for chunk_size in (1, 7, 64):
+                with self.subTest(document=document, chunk_size=chunk_size):
+                    with self.assertRaises(json.JSONDecodeError):
+                        list(iter_cad_rows(io.StringIO(document), chunk_size))
+
+    def test_empty_data(self):
+        self.assertEqual(list(iter_cad_rows(io.StringIO('{"fields": ["des"], "data": [ ]}'))), [])
+
+
+class TestLoadCompressed(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        root = pathlib.Path(cls.tmpdir.name)
+        cls.paths = {}
+        # Compress quickly - the compression ratio doesn't matter here.
+        openers = (
+            ('.gz', lambda path: gzip.open(path, 'wb', compresslevel=1)),
+            ('.bz2', lambda path: bz2.open(path, 'wb', compresslevel=1)),
+            ('.xz', lambda path: lzma.open(path, 'wb', preset=0)),
+        )
+        for suffix, opener in openers:
+            for path in (TEST_NEO_FILE, TEST_CAD_FILE):
+                compressed = root / (path.name + suffix)
+                with path.open('rb') as infile, opener(compressed) as outfile:
+                    shutil.copyfileobj(infile, outfile)
+                cls.paths[path, suffix] = compressed
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def test_load_compressed_neos(self):
+        expected = [(neo.designation, neo.name) for neo in load_neos(TEST_NEO_FILE)]
+        for suffix in ('.gz', '.bz2', '.xz'):
+            with self.subTest(suffix=suffix):
+                neos = load_neos(self.paths[TEST_NEO_FILE, suffix])
+                self.assertEqual([(neo.designation, neo.name) for neo in neos], expected)
+
+    def test_load_compressed_approaches(self):
+        expected = [(approach._designation, approach.time)
+                    for approach in load_approaches(TEST_CAD_FILE)]
+        for suffix in ('.gz', '.bz2', '.xz'):
+            with self.subTest(suffix=suffix):
+                approaches = load_approaches(self.paths[TEST_CAD_FILE, suffix])
+                self.assertEqual([(approach._designation, approach.time)
+                                  for approach in approaches], expected)
+
+
+class TestMergeApproaches(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        root = pathlib.Path(cls.tmpdir.name)
+        document = json.loads(TEST_CAD_FILE.read_text())
+        rows = document['data']
+        # Split the rows into overlapping files.
+        parts = {
+            'cad-1.json': rows[:2500],
+            'cad-2.json': rows[2000:],
+            'cad-3.json': rows[1000:1100],
+        }
+        for name, part in parts.items():
+            (root / name).write_text(json.dumps({'fields': document['fields'], 'data': part}))
+        cls.pattern = str(root / 'cad-*.json')
+        cls.expected = [(approach._designation, approach._jd)
+                        for approach in load_approaches(TEST_CAD_FILE)]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def test_expand_paths(self):
+        paths = expand_paths([self.pattern, 'missing.json', self.pattern])
+        self.assertEqual([path.name for path in paths],
+                         ['cad-1.json', 'cad-2.json', 'cad-3.json', 'missing.json'])
+        with self.assertRaises(ValueError):
+            expand_paths([self.pattern + '.nothing*'])
+
+    def test_merged_approaches_are_ordered_and_distinct(self):
+        approaches = load_approaches(expand_paths([self.pattern]))
+        times = [approach.time for approach in approaches]
+        self.assertEqual(times, sorted(times))
+        self.assertEqual(sorted((approach._designation, approach._jd) for approach in approaches),
+                         sorted(self.expected))
+
+    def test_merged_approaches_are_filtered(self):
+        filters = create_filters(date=datetime.date(2020, 3, 2))
+        approaches = load_approaches(expand_paths([self.pattern]), filters)
+        self.assertEqual(len(approaches), len(load_approaches(TEST_CAD_FILE, filters)))
+
 
 if __name__ == '__main__':
     unittest.main()
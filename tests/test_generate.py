@@ -0,0 +1,52 @@
+"""Check that synthetic data sets can be read like NASA's data files.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_generate
+"""
+import pathlib
+import tempfile
+import unittest
+
+from benchmarks.generate import generate
+from database import NEODatabase
+from extract import load_neos, load_approaches
+
+
+class TestGenerate(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.neo_file, cls.cad_file = generate(pathlib.Path(cls.tmpdir.name) / 'a', 5000, seed=1)
+        cls.neos = load_neos(cls.neo_file)
+        cls.approaches = load_approaches(cls.cad_file)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def test_sizes(self):
+        self.assertEqual(len(self.approaches), 5000)
+        self.assertEqual(len(self.neos), 5000 // 17)
+        self.assertEqual(len({neo.designation for neo in self.neos}), len(self.neos))
+
+    def test_approaches_are_in_time_order(self):
+        times = [approach.time for approach in self.approaches]
+        self.assertEqual(times, sorted(times))
+        self.assertGreaterEqual(times[0].year, 1900)
+        self.assertLess(times[-1].year, 2200)
+
+    def test_approaches_refer_to_neos(self):
+        NEODatabase(self.neos, self.approaches)
+        self.assertTrue(all(approach.neo for approach in self.approaches))
+        self.assertTrue(all(0 < approach.distance < 0.5 for approach in self.approaches))
+        self.assertTrue(any(neo.hazardous for neo in self.neos))
+
+    def test_same_seed_generates_same_files(self):
+        neo_file, cad_file = generate(pathlib.Path(self.tmpdir.name) / 'b', 5000, seed=1)
+        self.assertEqual(neo_file.read_bytes(), self.neo_file.read_bytes())
+        self.assertEqual(cad_file.read_bytes(), self.cad_file.read_bytes())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+"""Check that NEOs can be looked up by partial or misspelled names and designations.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_indexes
+"""
+import pathlib
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from indexes import PrefixIndex, TrigramIndex, trigrams
+from models import NearEarthObject
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestPrefixIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = PrefixIndex([('Halley', 1), ('Hermes', 2), ('Hal', 3), ('hermes', 4),
+                                  ('Don Quixote', 5), ('', 6), (None, 7)])
+
+    def test_empty_keys_are_skipped(self):
+        self.assertEqual(len(self.index), 5)
+
+    def test_get_ignores_case(self):
+        self.assertEqual(self.index.get('halley'), [1])
+        self.assertEqual(self.index.get(' HERMES '), [2, 4])
+        self.assertEqual(self.index.get('Hall'), [])
+        self.assertEqual(self.index.get('Halleys'), [])
+
+    def test_find_prefix_in_order_of_key(self):
+        self.assertEqual(self.index.find('ha'), [3, 1])
+        self.assertEqual(self.index.find('H'), [3, 1, 2, 4])
+        self.assertEqual(self.index.find('H', limit=2), [3, 1])
+        self.assertEqual(self.index.find('x'), [])
+
+    def test_search_patterns(self):
+        self.assertEqual(self.index.search('hal'), [3])
+        self.assertEqual(self.index.search('hal*'), [3, 1])
+        self.assertEqual(self.index.search('*'), [5, 3, 1, 2, 4])
+
+    def test_complete(self):
+        self.assertEqual(self.index.complete('h'), ['Hal', 'Halley', 'Hermes', 'hermes'])
+        self.assertEqual(self.index.complete('don '), ['Don Quixote'])
+        self.assertEqual(self.index.complete('h', limit=1), ['Hal'])
+
+    def test_repeated_keys_complete_once(self):
+        index = PrefixIndex([('Halley', 1), ('Halley', 2)])
+        self.assertEqual(index.complete('h'), ['Halley'])
+        self.assertEqual(index.get('halley'), [1, 2])
+
+
+class TestTrigramIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = TrigramIndex(['Apophis', 'Hermes', 'Herse', 'Eros', '', None, 'Hermes'])
+
+    def test_trigrams(self):
+        self.assertEqual(trigrams('Eros'), {'  e', ' er', 'ero', 'ros', 'os '})
+        self.assertEqual(trigrams(' EROS'), trigrams('eros'))
+
+    def test_empty_and_repeated_keys_are_skipped(self):
+        self.assertEqual(len(self.index), 4)
+        self.index.add('Eros')
+        self.assertEqual(len(self.index), 4)
+        self.assertEqual(self.index.suggest('Eross'), ['Eros'])
+
+    def test_suggest_ranks_by_similarity(self):
+        self.assertEqual(self.index.suggest('Apofis'), ['Apophis'])
+        self.assertEqual(self.index.suggest('herms'), ['Hermes', 'Herse'])
+        self.assertEqual(self.index.suggest('HERMES', limit=1), ['Hermes'])
+
+    def test_dissimilar_keys_are_not_suggested(self):
+        self.assertEqual(self.index.suggest('zzz'), [])
+        self.assertEqual(self.index.suggest('herms', threshold=0.4), ['Hermes'])
+
+
+class TestFindNEOs(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    def test_find_neos_by_name_ignores_case(self):
+        self.assertEqual([neo.designation for neo in self.db.find_neos('jormungandr')], ['471926'])
+        self.assertEqual(self.db.find_neos('not-real-name'), [])
+        self.assertEqual(self.db.find_neos(''), [])
+
+    def test_find_neos_by_prefix(self):
+        found = self.db.find_neos('to*')
+        self.assertIn(self.db.get_neo_by_name('Toro'), found)
+        for neo in found:
+            self.assertTrue(neo.name.lower().startswith('to'))
+        self.assertEqual(len(self.db.find_neos('*')), sum(1 for neo in self.db._neos if neo.name))
+
+    def test_find_neos_by_designation(self):
+        found = self.db.find_neos('2020 ab*', by='designation')
+        self.assertTrue(found)
+        for neo in found:
+            self.assertTrue(neo.designation.startswith('2020 AB'))
+        self.assertEqual(self.db.find_neos('2013 tl117', by='designation'),
+                         [self.db.get_neo_by_designation('2013 TL117')])
+
+    def test_complete_neos(self):
+        names = self.db.complete_neos('t')
+        self.assertIn('Toro', names)
+        self.assertEqual(names, sorted(names, key=str.casefold))
+        self.assertIn('2013 TL117', self.db.complete_neos('2013 tl', by='designation'))
+
+    def test_suggest_neos(self):
+        self.assertEqual(self.db.suggest_neos('Jormungand')[0], 'Jormungandr')
+        self.assertEqual(self.db.suggest_neos('2013 TL11', by='designation')[0], '2013 TL117')
+        self.assertEqual(self.db.suggest_neos('Jormungand*')[0], 'Jormungandr')
+
+    def test_added_neos_are_found(self):
+        neos = load_neos(TEST_NEO_FILE)
+        toro = next(neo for neo in neos if neo.name == 'Toro')
+        db = NEODatabase([neo for neo in neos if neo is not toro], [])
+        self.assertEqual(db.find_neos('toro'), [])
+        self.assertNotIn('Toro', db.suggest_neos('toro'))
+        db.add_neos([toro])
+        self.assertEqual(db.find_neos('toro'), [toro])
+        self.assertEqual(db.suggest_neos('toro'), ['Toro'])
+
+    def test_reused_names_are_suggested_once(self):
+        db = NEODatabase(load_neos(TEST_NEO_FILE), [])
+        self.assertEqual(db.suggest_neos('Toro'), ['Toro'])
+        db.add_neos([NearEarthObject(pdes='9999999', name='Toro')])
+        self.assertEqual(len(db.get_neos_by_name('Toro')), 2)
+        self.assertEqual(db.suggest_neos('Toro'), ['Toro'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""Check that the instrumentation hooks report queries and filter evaluations.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_instrumentation
+"""
+import datetime
+import pathlib
+import unittest
+
+import instrumentation
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import AttributeFilter, create_filters, limit
+from instrumentation import FilterStats, Listener, listening
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestInstrumentation(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    def test_hooks_are_off_without_listeners(self):
+        self.assertEqual(instrumentation.listeners, ())
+        self.assertIs(AttributeFilter.__call__, AttributeFilter._evaluate)
+        with listening(FilterStats()):
+            self.assertIs(AttributeFilter.__call__, AttributeFilter._measured_call)
+        # A listener that ignores filter evaluations doesn't turn their measurement on.
+        with listening(Listener()):
+            self.assertIs(AttributeFilter.__call__, AttributeFilter._evaluate)
+        self.assertIs(AttributeFilter.__call__, AttributeFilter._evaluate)
+
+    def test_filter_stats(self):
+        filters = create_filters(start_date=datetime.date(2020, 3, 1),
+                                 end_date=datetime.date(2020, 3, 31),
+                                 distance_max=0.1, hazardous=True)
+        with listening(FilterStats()) as stats:
+            results = list(self.db.query(filters))
+        expected = [approach for approach in self.db.query()
+                    if all(filter_func(approach) for filter_func in filters)]
+        self.assertEqual(results, expected)
+
+        in_march = sum(1 for approach in self.db.query()
+                       if approach.time.year == 2020 and approach.time.month == 3)
+        self.assertEqual((stats.queries, stats.scanned, stats.matched),
+                         (1, in_march, len(results)))
+        # The date filters are bisected, not evaluated.
+        self.assertEqual(sorted(stats.filters), ['DistanceFilter', 'HazardousFilter'])
+        evaluations, rejections, seconds = stats.filters['DistanceFilter']
+        self.assertEqual(evaluations, in_march)
+        self.assertEqual(stats.filters['HazardousFilter'][0], evaluations - rejections)
+        self.assertGreater(seconds, 0)
+        self.assertEqual(stats.rejection_rate('DistanceFilter'), rejections / evaluations)
+        self.assertIsNone(stats.rejection_rate('VelocityFilter'))
+
+    def test_closed_query_is_reported(self):
+        with listening(FilterStats()) as stats:
+            self.assertEqual(len(list(limit(self.db.query(), 5))), 5)
+        self.assertEqual(stats.queries, 1)
+        # Without filters, every scanned approach matches, and the rest aren't scanned.
+        self.assertEqual(stats.scanned, stats.matched)
+        self.assertLess(stats.scanned, 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
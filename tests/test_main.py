@@ -0,0 +1,544 @@
+"""Check the main module's subcommands and interactive shell on the test data files.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_main
+"""
+import argparse
+import concurrent.futures
+import contextlib
+import csv
+import datetime
+import gzip
+import io
+import json
+import os
+import pathlib
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+import main
+from main import (NEOShell, diff, inspect, link_neos, load_in_background, make_parser, query_neos,
+                  summarize_approaches)
+from models import NearEarthObject, CloseApproach
+from sqlite_database import SQLiteNEODatabase
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestLinkNEOs(unittest.TestCase):
+    def setUp(self):
+        self.approaches = load_approaches(TEST_CAD_FILE)
+        self.pulled = 0
+
+    def stream(self):
+        for approach in self.approaches:
+            self.pulled += 1
+            yield approach
+
+    def test_results_are_linked_in_order(self):
+        linked = list(link_neos(self.stream(), TEST_NEO_FILE, batch_size=1000))
+        self.assertEqual(linked, self.approaches)
+        for approach in linked:
+            self.assertEqual(approach.neo.designation, approach._designation)
+            self.assertIn(approach, approach.neo.approaches)
+
+    def test_results_are_streamed(self):
+        results = link_neos(self.stream(), TEST_NEO_FILE, batch_size=100)
+        first = next(results)
+        self.assertIsNotNone(first.neo)
+        # Only the first batch has been read from the stream.
+        self.assertEqual(self.pulled, 100)
+        next(results)
+        self.assertEqual(self.pulled, 100)
+
+
+class TestDiff(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.tmpdir.name)
+        document = json.loads(TEST_CAD_FILE.read_text())
+        document['data'] = document['data'][:-30]
+        self.new_cadfile = self.root / 'cad-new.json'
+        self.new_cadfile.write_text(json.dumps(document))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def run_diff(self, limit):
+        outfile = self.root / 'changes.csv'
+        args = argparse.Namespace(cadfile=TEST_CAD_FILE, new_cadfile=self.new_cadfile,
+                                  outfile=outfile, limit=limit, compresslevel=None)
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            diff(args)
+        with outfile.open(newline='') as infile:
+            return list(csv.DictReader(infile)), output.getvalue()
+
+    def test_outfile_is_limited(self):
+        rows, summary = self.run_diff(limit=5)
+        self.assertEqual(len(rows), 5)
+        # The summary still counts every difference.
+        self.assertIn('30 removed', summary)
+
+    def test_outfile_is_unlimited_by_default(self):
+        rows, summary = self.run_diff(limit=None)
+        self.assertEqual(len(rows), 30)
+        self.assertIn('30 removed', summary)
+
+
+
+def run_main(*argv):
+    """Run `main.main` with some command-line arguments, and return its stdout and stderr."""
+    with mock.patch.object(sys, 'argv', ['main.py', *map(str, argv)]), \
+            contextlib.redirect_stdout(io.StringIO()) as output, \
+            contextlib.redirect_stderr(io.StringIO()) as errors:
+        main.main()
+    return output.getvalue(), errors.getvalue()
+
+
+def make_neos():
+    """Return a few NEOs, two of which share a name and one of which differs only in case."""
+    names = [('1685', 'Toro'), ('1686', 'toro'), ('2101', 'Adonis'), ('3552', 'Don Quixote'),
+             ('69230', 'Hermes'), ('99942', 'Hermes')]
+    return [NearEarthObject(pdes=pdes, name=name) for pdes, name in names]
+
+
+class TestInspect(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    def setUp(self):
+        self.neos = make_neos()
+        self.small = NEODatabase(self.neos, [])
+
+    def inspect(self, database=None, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()) as output, \
+                contextlib.redirect_stderr(io.StringIO()) as errors:
+            neos = inspect(database or self.db, **kwargs)
+        return neos, output.getvalue(), errors.getvalue()
+
+    def test_exact_match_is_preferred(self):
+        toro, lower_toro = self.neos[:2]
+        neos, output, _ = self.inspect(self.small, name='Toro')
+        self.assertEqual(neos, [toro])
+        self.assertEqual(output, f"{toro}\n")
+        self.assertEqual(self.inspect(self.small, name='toro')[0], [lower_toro])
+        self.assertEqual(self.inspect(self.small, pdes='2101')[0], [self.neos[2]])
+
+    def test_reused_names_are_all_listed(self):
+        neos, output, _ = self.inspect(self.small, name='Hermes')
+        self.assertEqual(neos, self.neos[4:])
+        self.assertEqual(output.splitlines(), [str(neo) for neo in self.neos[4:]])
+
+    def test_case_is_ignored_without_an_exact_match(self):
+        self.assertCountEqual(self.inspect(self.small, name='TORO')[0], self.neos[:2])
+        self.assertEqual(self.inspect(self.small, name='don quixote')[0], [self.neos[3]])
+
+    def test_prefix_lists_matching_neos(self):
+        neos, output, _ = self.inspect(self.small, name='to*')
+        self.assertCountEqual(neos, self.neos[:2])
+        self.assertEqual(len(output.splitlines()), 2)
+        self.assertEqual(self.inspect(self.small, pdes='168*')[0], self.neos[:2])
+
+    def test_bare_wildcard_is_rejected(self):
+        for kwargs in ({'name': '*'}, {'pdes': '*'}, {'name': ' * '}):
+            with self.subTest(**kwargs):
+                neos, output, errors = self.inspect(**kwargs)
+                self.assertEqual(neos, [])
+                self.assertEqual(output, '')
+                self.assertIn("Please give the start of a", errors)
+
+    def test_misspelled_name_suggests_names(self):
+        neos, output, errors = self.inspect(name='Adonnis')
+        self.assertEqual(neos, [])
+        self.assertEqual(output, '')
+        self.assertEqual(errors.splitlines(),
+                         ["No matching NEOs exist in the database.", "Did you mean: Adonis?"])
+
+
+
+    def test_verbose_lists_approaches(self):
+        neo = NearEarthObject(pdes='433', name='Eros')
+        approaches = [CloseApproach(des='433', cd=cd, dist=dist, v_rel=v_rel)
+                      for cd, dist, v_rel in (('2020-Jan-01 00:00', '0.2', '9'),
+                                              ('2020-Mar-01 12:30', '0.1', '7'))]
+        neos, output, _ = self.inspect(NEODatabase([neo], approaches), name='Eros', verbose=True)
+        self.assertEqual(neos, [neo])
+        self.assertEqual(output.splitlines(), [
+            str(neo),
+            summarize_approaches(neo),
+            f"- {approaches[0]}",
+            f"- {approaches[1]}",
+        ])
+
+
+class TestSummarizeApproaches(unittest.TestCase):
+    def setUp(self):
+        self.neo = NearEarthObject(pdes='433', name='Eros')
+
+    def add_approach(self, cd, dist, v_rel):
+        approach = CloseApproach(des='433', cd=cd, dist=dist, v_rel=v_rel)
+        approach.neo = self.neo
+        self.neo.add_approach(approach)
+        return approach
+
+    def test_no_approaches(self):
+        self.assertEqual(summarize_approaches(self.neo, now=datetime.datetime(2020, 1, 1)),
+                         "It has no known close approaches.")
+
+    def test_one_approach(self):
+        self.add_approach('2020-Jan-01 00:00', '0.2', '9')
+        self.assertEqual(summarize_approaches(self.neo, now=datetime.datetime(2019, 1, 1)),
+                         "It has 1 known close approach, on 2020-01-01 00:00, at 0.2000 au and "
+                         "9.00 km/s. The next is on 2020-01-01 00:00.")
+        self.assertEqual(summarize_approaches(self.neo, now=datetime.datetime(2020, 1, 1)),
+                         "It has 1 known close approach, on 2020-01-01 00:00, at 0.2000 au and "
+                         "9.00 km/s.")
+
+    def test_many_approaches(self):
+        self.add_approach('2020-Jun-01 00:00', '0.3', '5')
+        self.add_approach('2020-Jan-01 00:00', '0.2', '9')
+        self.add_approach('2020-Mar-01 00:00', '0.1', '7')
+        self.assertEqual(summarize_approaches(self.neo, now=datetime.datetime(2020, 2, 1)),
+                         "It has 3 known close approaches, from 2020-01-01 00:00 to "
+                         "2020-06-01 00:00; the closest at 0.1000 au on 2020-03-01 00:00, and the "
+                         "fastest at 9.00 km/s on 2020-01-01 00:00. "
+                         "The next is on 2020-03-01 00:00.")
+        self.assertNotIn("The next is on",
+                         summarize_approaches(self.neo, now=datetime.datetime(2021, 1, 1)))
+
+    @unittest.skipUnless(hasattr(time, 'tzset'), "The time zone can't be changed here.")
+    def test_next_approach_is_after_the_current_utc_time(self):
+        past = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None) \
+            - datetime.timedelta(hours=6)
+        self.add_approach(past.strftime('%Y-%b-%d %H:%M'), '0.2', '9')
+        # Local time is 12 hours behind UTC, so an approach 6 hours ago is still ahead locally.
+        self.addCleanup(time.tzset)
+        with mock.patch.dict(os.environ, {'TZ': 'Etc/GMT+12'}):
+            time.tzset()
+            summary = summarize_approaches(self.neo)
+        self.assertNotIn("The next is on", summary)
+
+
+class TestCompleteInspect(unittest.TestCase):
+    def setUp(self):
+        _, inspect_parser, query_parser, _, _ = make_parser()
+        self.shell = NEOShell(NEODatabase(make_neos(), []), inspect_parser, query_parser)
+
+    def complete(self, line, text):
+        return self.shell.complete_inspect(text, line, len(line) - len(text), len(line))
+
+    def test_complete_name(self):
+        self.assertEqual(self.complete('inspect --name ad', 'ad'), ['Adonis'])
+        self.assertEqual(self.complete('inspect -n H', 'H'), ['Hermes'])
+        self.assertEqual(self.complete('inspect --verbose --name ', ''),
+                         ['Adonis', 'Don Quixote', 'Hermes', 'Toro', 'toro'])
+
+    def test_complete_designation(self):
+        self.assertEqual(self.complete('inspect --pdes 168', '168'), ['1685', '1686'])
+        self.assertEqual(self.complete('inspect -p 2', '2'), ['2101'])
+
+    def test_complete_equals_form(self):
+        # Readline splits words at '=', so only the value is being completed.
+        self.assertEqual(self.complete('inspect -n=ad', 'ad'), ['Adonis'])
+        self.assertEqual(self.complete('inspect --pdes=21', '21'), ['2101'])
+
+    def test_complete_quoted_name_with_spaces(self):
+        # Readline splits words at spaces and quotes, so only the last word is being completed.
+        self.assertEqual(self.complete("inspect --name 'Don Q", 'Q'), ['Quixote'])
+        self.assertEqual(self.complete('inspect --name "don q', 'q'), ['Quixote'])
+        self.assertEqual(self.complete("inspect --name 'Do", 'Do'), ['Don Quixote'])
+
+    def test_nothing_to_complete(self):
+        self.assertEqual(self.complete('inspect --verbose ', ''), [])
+        self.assertEqual(self.complete('inspect --name Zz', 'Zz'), [])
+
+
+
+class TestQueryNEOs(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.db = NEODatabase(cls.neos, load_approaches(TEST_CAD_FILE))
+        _, cls.inspect_parser, cls.query_parser, _, cls.neo_query_parser = make_parser()
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root = pathlib.Path(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def query_neos(self, *argv):
+        args = self.neo_query_parser.parse_args(list(map(str, argv)))
+        with contextlib.redirect_stdout(io.StringIO()) as output, \
+                contextlib.redirect_stderr(io.StringIO()) as errors:
+            query_neos(self.db, args)
+        return output.getvalue(), errors.getvalue()
+
+    def test_printed_results_are_limited_to_10_by_default(self):
+        output, _ = self.query_neos()
+        self.assertEqual(output.splitlines(), [str(neo) for neo in self.neos[:10]])
+        output, _ = self.query_neos('--limit', 3)
+        self.assertEqual(len(output.splitlines()), 3)
+
+    def test_saved_results_are_unlimited_by_default(self):
+        outfile = self.root / 'neos.csv'
+        output, _ = self.query_neos('--hazardous', '--outfile', outfile)
+        self.assertEqual(output, '')
+        with outfile.open(newline='') as infile:
+            rows = list(csv.DictReader(infile))
+        hazardous = [neo.designation for neo in self.neos if neo.hazardous]
+        self.assertGreater(len(hazardous), 10)
+        self.assertEqual([row['designation'] for row in rows], hazardous)
+
+    def test_unsupported_extension_is_rejected(self):
+        outfile = self.root / 'neos.txt'
+        _, errors = self.query_neos('--outfile', outfile)
+        self.assertIn("Please use an output file that ends with", errors)
+        self.assertFalse(outfile.exists())
+
+    def test_storage_backends_are_rejected(self):
+        for option in ('--sqlite', '--columnar'):
+            with self.subTest(option=option):
+                path = self.root / 'neos.db'
+                output, errors = run_main('--neofile', TEST_NEO_FILE, '--cadfile', TEST_CAD_FILE,
+                                          option, path, 'query-neos')
+                self.assertEqual(output, '')
+                self.assertIn("Please use `query-neos` without --sqlite or --columnar.", errors)
+                self.assertFalse(path.exists())
+
+    def shell(self, database, **kwargs):
+        return NEOShell(database, self.inspect_parser, self.query_parser, **kwargs)
+
+    def run_command(self, shell, line):
+        with contextlib.redirect_stdout(io.StringIO()) as output, \
+                contextlib.redirect_stderr(io.StringIO()) as errors:
+            shell.onecmd(line)
+        return output.getvalue(), errors.getvalue()
+
+    def test_shell_queries_neos_in_memory(self):
+        shell = self.shell(self.db, neo_query_parser=self.neo_query_parser)
+        output, _ = self.run_command(shell, 'query_neos --limit 2')
+        self.assertEqual(output.splitlines(), [str(neo) for neo in self.neos[:2]])
+
+    def test_shell_rejects_other_storage(self):
+        database = mock.Mock(spec=SQLiteNEODatabase)
+        shell = self.shell(database, neo_query_parser=self.neo_query_parser)
+        output, errors = self.run_command(shell, 'query_neos --limit 2')
+        self.assertEqual(output, '')
+        self.assertIn("Only data loaded in memory can be queried for NEOs.", errors)
+        self.assertEqual(database.mock_calls, [])
+
+    def test_shell_without_parser_rejects_query(self):
+        output, errors = self.run_command(self.shell(self.db), 'query_neos')
+        self.assertEqual(output, '')
+        self.assertIn("Querying NEOs isn't available in this session.", errors)
+
+
+
+class TestReload(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        root = pathlib.Path(self.tmpdir.name)
+        self.neo_file = shutil.copy(TEST_NEO_FILE, root / 'neos.csv')
+        self.cad_file = shutil.copy(TEST_CAD_FILE, root / 'cad.json')
+        self.loads = 0
+        self.current = mock.Mock()
+        _, inspect_parser, query_parser, _, _ = make_parser()
+        self.shell = NEOShell(self.current, inspect_parser, query_parser, reload=self.load,
+                              watched=(self.neo_file, self.cad_file))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def load(self):
+        self.loads += 1
+        return NEODatabase(load_neos(self.neo_file), load_approaches(self.cad_file))
+
+    def remove_toro(self):
+        with open(self.neo_file) as infile:
+            lines = [line for line in infile if ',Toro,' not in line]
+        with open(self.neo_file, 'w') as outfile:
+            outfile.writelines(lines)
+
+    def check(self):
+        with contextlib.redirect_stderr(io.StringIO()) as errors:
+            self.shell.check_data_files()
+        return errors.getvalue()
+
+    def finish_reload(self):
+        self.assertIsNotNone(self.shell._reloading)
+        concurrent.futures.wait([self.shell._reloading])
+        return self.check()
+
+    def test_changed_file_is_reloaded_in_the_background(self):
+        self.remove_toro()
+        self.assertIn("reloading them in the background", self.check())
+        # The current database is kept until the new one is ready.
+        self.assertIs(self.shell.db, self.current)
+        self.assertIn("Reloaded the data files.", self.finish_reload())
+        self.assertIsInstance(self.shell.db, NEODatabase)
+        self.assertIsNone(self.shell.db.get_neo_by_name('Toro'))
+        self.assertIsNotNone(self.shell.db.get_neo_by_name('Adonis'))
+        self.current.close.assert_called_once_with()
+        self.assertEqual(self.loads, 1)
+        # The new files are only reloaded once.
+        self.assertEqual(self.check(), '')
+        self.assertIsNone(self.shell._reloading)
+
+    def test_failed_reload_keeps_the_current_database(self):
+        self.shell._reload = mock.Mock(side_effect=ValueError("Truncated file"))
+        self.remove_toro()
+        self.check()
+        errors = self.finish_reload()
+        self.assertIn("Couldn't reload the data files: Truncated file", errors)
+        self.assertIs(self.shell.db, self.current)
+        self.current.close.assert_not_called()
+
+    def test_unchanged_files_are_not_reloaded(self):
+        for _ in range(3):
+            self.assertEqual(self.check(), '')
+            with contextlib.redirect_stderr(io.StringIO()):
+                self.assertEqual(self.shell.precmd('help'), 'help')
+        self.assertIsNone(self.shell._reloading)
+        self.assertEqual(self.loads, 0)
+        self.assertIs(self.shell.db, self.current)
+
+    def test_missing_file_is_not_reloaded(self):
+        # A file being replaced may be missing for a moment.
+        os.remove(self.cad_file)
+        self.assertEqual(self.check(), '')
+        self.assertIsNone(self.shell._reloading)
+        self.assertIs(self.shell.db, self.current)
+
+
+
+class TestBackgroundLoading(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.database = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    def setUp(self):
+        self.loaded = threading.Event()
+        self.addCleanup(self.loaded.set)
+        self.loads = 0
+
+    def slow_load(self):
+        self.loads += 1
+        self.loaded.wait()
+        return self.database
+
+    def shell(self):
+        _, inspect_parser, query_parser, _, _ = make_parser()
+        return NEOShell(load_in_background(self.slow_load), inspect_parser, query_parser,
+                        stdout=io.StringIO())
+
+    def run_command(self, shell, line):
+        with contextlib.redirect_stdout(io.StringIO()) as output, \
+                contextlib.redirect_stderr(io.StringIO()) as errors:
+            shell.onecmd(line)
+        return output.getvalue(), errors.getvalue()
+
+    def test_shell_starts_before_the_data_is_loaded(self):
+        shell = self.shell()
+        self.assertIsInstance(shell._db, concurrent.futures.Future)
+        self.assertFalse(shell._db.done())
+        # Commands that don't need the data don't wait for it.
+        self.run_command(shell, 'help')
+        self.assertEqual(shell.complete_inspect('Ad', 'inspect --name Ad', 15, 17), [])
+        self.assertFalse(shell._db.done())
+
+    def test_only_the_first_command_waits_for_the_data(self):
+        shell = self.shell()
+        timer = threading.Timer(0.1, self.loaded.set)
+        timer.start()
+        self.addCleanup(timer.cancel)
+        output, errors = self.run_command(shell, 'inspect --name Adonis')
+        self.assertIn("Waiting for the data to finish loading...", errors)
+        self.assertEqual(output, f"{self.database.get_neo_by_name('Adonis')}\n")
+        self.assertIs(shell._db, self.database)
+        output, errors = self.run_command(shell, 'inspect --name Toro')
+        self.assertEqual(errors, '')
+        self.assertEqual(output, f"{self.database.get_neo_by_name('Toro')}\n")
+        self.assertEqual(self.loads, 1)
+
+    def test_loading_error_is_raised_by_the_future(self):
+        future = load_in_background(mock.Mock(side_effect=OSError("No such file")))
+        with self.assertRaisesRegex(OSError, "No such file"):
+            future.result(timeout=5)
+
+
+class TestSubcommandLoading(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        root = pathlib.Path(cls.tmpdir.name)
+        # Compressed data files aren't indexed by offset, so `inspect` loads them.
+        cls.neo_gz, cls.cad_gz = root / 'neos.csv.gz', root / 'cad.json.gz'
+        for source, target in ((TEST_NEO_FILE, cls.neo_gz), (TEST_CAD_FILE, cls.cad_gz)):
+            with gzip.open(target, 'wb') as outfile:
+                outfile.write(source.read_bytes())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def run_main(self, *argv):
+        with mock.patch.object(main, 'load_neos', wraps=load_neos) as neos, \
+                mock.patch.object(main, 'load_approaches', wraps=load_approaches) as approaches:
+            output, _ = run_main(*argv)
+        return output, neos, approaches
+
+    def test_inspect_only_reads_the_neos(self):
+        output, neos, approaches = self.run_main('--neofile', self.neo_gz, '--cadfile', self.cad_gz,
+                                                 'inspect', '--name', 'Adonis')
+        self.assertTrue(output.startswith('NEO 2101 (Adonis)'))
+        neos.assert_called_once_with(self.neo_gz)
+        approaches.assert_not_called()
+
+    def test_verbose_inspect_reads_the_approaches(self):
+        output, neos, approaches = self.run_main('--neofile', self.neo_gz, '--cadfile', self.cad_gz,
+                                                 'inspect', '--verbose', '--name', 'Adonis')
+        self.assertIn('- At ', output)
+        neos.assert_called_once_with(self.neo_gz)
+        approaches.assert_called_once_with(self.cad_gz)
+
+    def test_query_only_reads_the_neos_of_the_results(self):
+        output, neos, approaches = self.run_main('--neofile', TEST_NEO_FILE,
+                                                 '--cadfile', TEST_CAD_FILE,
+                                                 'query', '--date', '2020-01-01', '--limit', 3)
+        self.assertEqual(len(output.splitlines()), 3)
+        approaches.assert_called_once()
+        # Only the NEOs of the 3 results are read, once.
+        neos.assert_called_once()
+        path, designations = neos.call_args[0]
+        self.assertEqual(path, TEST_NEO_FILE)
+        self.assertEqual(designations, {'2020 AY1', '2019 YK', '2013 EC20'})
+        for designation in designations:
+            self.assertIn(f"'{designation}'", output)
+
+    def test_query_with_neo_filters_reads_the_neos_of_the_matches(self):
+        _, neos, approaches = self.run_main('--neofile', TEST_NEO_FILE, '--cadfile', TEST_CAD_FILE,
+                                            'query', '--date', '2020-01-01', '--hazardous',
+                                            '--limit', 3)
+        matches = [approach._designation for approach in load_approaches(TEST_CAD_FILE)
+                   if approach.time.date() == datetime.date(2020, 1, 1)]
+        neos.assert_called_once()
+        self.assertEqual(neos.call_args[0][1], set(matches))
+        self.assertGreater(len(matches), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
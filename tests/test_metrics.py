@@ -0,0 +1,92 @@
+"""Check that query, cache and load metrics are kept and exposed in the Prometheus format.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_metrics
+"""
+import datetime
+import pathlib
+import tempfile
+import unittest
+import urllib.error
+import urllib.request
+
+import instrumentation
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from instrumentation import listening
+from metrics import NEOMetrics
+from sqlite_database import SQLiteNEODatabase
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+class TestMetrics(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.db = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.sqlite = SQLiteNEODatabase.open(pathlib.Path(cls.tmpdir.name) / 'neos.sqlite3',
+                                            TEST_NEO_FILE, TEST_CAD_FILE)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.sqlite.close()
+        cls.tmpdir.cleanup()
+
+    def test_query_histograms(self):
+        filters = create_filters(date=datetime.date(2020, 3, 2))
+        expected = len(list(self.db.query(filters)))
+        with listening(NEOMetrics()) as metrics:
+            for _ in range(3):
+                list(self.db.query(filters))
+        self.assertEqual(metrics.query_duration.count('NEODatabase'), 3)
+        text = metrics.render()
+        self.assertIn('# TYPE neo_query_duration_seconds histogram', text)
+        self.assertIn('neo_query_duration_seconds_bucket{backend="NEODatabase",le="+Inf"} 3', text)
+        self.assertIn(f'neo_query_results_sum{{backend="NEODatabase"}} {float(3 * expected)}', text)
+        self.assertIn('neo_query_results_bucket{backend="NEODatabase",le="0"} 0', text)
+
+    def test_cache_hit_ratio(self):
+        filters = create_filters(date=datetime.date(2020, 5, 5))
+        with listening(NEOMetrics()) as metrics:
+            first = list(self.sqlite.query(filters))
+            second = list(self.sqlite.query(filters))
+        self.assertEqual(first, second)
+        self.assertEqual(metrics.cache_hits.value('SQLiteNEODatabase', 'objects')
+                         + metrics.cache_misses.value('SQLiteNEODatabase', 'objects'),
+                         2 * len(first))
+        self.assertGreaterEqual(metrics.hit_ratio('SQLiteNEODatabase', 'objects'), 0.5)
+        self.assertIn('neo_cache_hit_ratio{backend="SQLiteNEODatabase",cache="objects"}',
+                      metrics.render())
+
+    def test_load_durations_and_file_dump(self):
+        with listening(NEOMetrics()) as metrics:
+            instrumentation.notify('load_finished', 'reload', 0.3)
+        path = pathlib.Path(self.tmpdir.name) / 'metrics.prom'
+        metrics.write(path)
+        text = path.read_text()
+        self.assertIn('neo_load_duration_seconds_bucket{kind="reload",le="0.25"} 0', text)
+        self.assertIn('neo_load_duration_seconds_bucket{kind="reload",le="0.5"} 1', text)
+        self.assertIn('neo_load_duration_seconds_count{kind="reload"} 1', text)
+
+    def test_serve(self):
+        metrics = NEOMetrics()
+        metrics.load_finished('load', 1.5)
+        server = metrics.serve(0)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = f'http://127.0.0.1:{server.server_address[1]}'
+        with urllib.request.urlopen(url + '/metrics') as response:
+            self.assertTrue(response.headers['Content-Type'].startswith('text/plain'))
+            self.assertIn('neo_load_duration_seconds_count{kind="load"} 1', response.read().decode())
+        with self.assertRaises(urllib.error.HTTPError):
+            urllib.request.urlopen(url + '/other')
+
+
+if __name__ == '__main__':
+    unittest.main()
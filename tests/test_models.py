@@ -0,0 +1,111 @@
+"""Check that a `NearEarthObject` keeps its close approaches in time order, with their statistics.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_models
+"""
+import datetime
+import pathlib
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from models import NearEarthObject, CloseApproach
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+def make_approach(cd, dist, v_rel):
+    return CloseApproach(des='433', cd=cd, dist=dist, v_rel=v_rel)
+
+
+class TestNEOApproaches(unittest.TestCase):
+    def setUp(self):
+        self.neo = NearEarthObject(pdes='433', name='Eros')
+        self.june = make_approach('2020-Jun-01 00:00', '0.3', '5')
+        self.january = make_approach('2020-Jan-01 00:00', '0.2', '9')
+        self.march = make_approach('2020-Mar-01 00:00', '0.1', '7')
+        self.july = make_approach('2020-Jul-01 00:00', '0.4', '3')
+        for approach in (self.june, self.january, self.march, self.july):
+            self.neo.add_approach(approach)
+
+    def test_no_approaches(self):
+        neo = NearEarthObject(pdes='433')
+        self.assertEqual(neo.approach_count, 0)
+        self.assertIsNone(neo.closest_approach)
+        self.assertIsNone(neo.fastest_approach)
+        self.assertIsNone(neo.first_approach)
+        self.assertIsNone(neo.last_approach)
+        self.assertIsNone(neo.next_approach(datetime.datetime(2020, 1, 1)))
+
+    def test_approaches_are_in_time_order(self):
+        self.assertEqual(self.neo.approaches, (self.january, self.march, self.june, self.july))
+        self.assertEqual(self.neo.first_approach, self.january)
+        self.assertEqual(self.neo.last_approach, self.july)
+
+    def test_statistics(self):
+        self.assertEqual(self.neo.approach_count, 4)
+        self.assertEqual(self.neo.closest_approach, self.march)
+        self.assertEqual(self.neo.fastest_approach, self.january)
+
+    def test_next_approach(self):
+        self.assertEqual(self.neo.next_approach(datetime.datetime(2019, 1, 1)), self.january)
+        self.assertEqual(self.neo.next_approach(datetime.datetime(2020, 2, 1)), self.march)
+        self.assertEqual(self.neo.next_approach(self.march.time), self.june)
+        self.assertIsNone(self.neo.next_approach(self.july.time))
+
+    def test_approaches_are_read_only(self):
+        with self.assertRaises(AttributeError):
+            self.neo.approaches.append(self.july)
+        with self.assertRaises(TypeError):
+            self.neo.approaches[0] = self.july
+        self.assertEqual(self.neo.approach_count, 4)
+
+    def test_approaches_are_a_view(self):
+        approaches = self.neo.approaches
+        # Reading the approaches doesn't copy them.
+        self.assertIs(self.neo.approaches, approaches)
+        self.assertEqual(approaches, [self.january, self.march, self.june, self.july])
+        self.assertEqual(approaches[1], self.march)
+        self.assertEqual(approaches[1:3], (self.march, self.june))
+        self.assertEqual(len(approaches), 4)
+        august = make_approach('2020-Aug-01 00:00', '0.5', '1')
+        self.neo.add_approach(august)
+        self.assertEqual(approaches[-1], august)
+        self.assertNotEqual(approaches, [self.january])
+
+    def test_replacing_approaches_recomputes_statistics(self):
+        self.neo.approaches = [self.july, self.june]
+        self.assertEqual(self.neo.approaches, (self.june, self.july))
+        self.assertEqual(self.neo.closest_approach, self.june)
+        self.assertEqual(self.neo.fastest_approach, self.june)
+        self.assertEqual(self.neo.next_approach(self.june.time), self.july)
+        self.neo.approaches = []
+        self.assertEqual(self.neo.approach_count, 0)
+        self.assertIsNone(self.neo.closest_approach)
+
+
+class TestLinkedApproaches(unittest.TestCase):
+    def assertLinkedInOrder(self, neo):
+        times = [approach.time for approach in neo.approaches]
+        self.assertEqual(times, sorted(times))
+        self.assertEqual(neo.approach_count, len(neo.approaches))
+        if neo.approaches:
+            self.assertEqual(neo.closest_approach.distance,
+                             min(approach.distance for approach in neo.approaches))
+            self.assertEqual(neo.fastest_approach.velocity,
+                             max(approach.velocity for approach in neo.approaches))
+
+    def test_database_links_in_time_order(self):
+        approaches = load_approaches(TEST_CAD_FILE)
+        db = NEODatabase(load_neos(TEST_NEO_FILE), approaches[1::2])
+        db.add_approaches(approaches[::2])
+        for neo in db._neos:
+            self.assertLinkedInOrder(neo)
+
+
+if __name__ == '__main__':
+    unittest.main()
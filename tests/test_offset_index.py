@@ -0,0 +1,135 @@
+"""Check that the offset index finds the same NEOs as the in-memory database.
+
+The test data files are copied into a temporary directory, so that the index
+can be persisted next to them, and every NEO is looked up through the index and
+compared against `load_neos` and `load_approaches`.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_offset_index
+"""
+import json
+import math
+import pathlib
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import offset_index
+from offset_index import OffsetIndex, index_path_for
+from database import NEODatabase
+from extract import load_neos, load_approaches
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+def summarize(approaches):
+    return [(approach._designation, approach.time, approach.distance, approach.velocity)
+            for approach in approaches]
+
+
+def describe(neo):
+    return (neo.designation, neo.name, 'nan' if math.isnan(neo.diameter) else neo.diameter,
+            neo.hazardous)
+
+
+class TestOffsetIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.memory = NEODatabase(cls.neos, load_approaches(TEST_CAD_FILE))
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        root = pathlib.Path(self.tmpdir.name)
+        self.neo_file = shutil.copy(TEST_NEO_FILE, root / 'neos.csv')
+        self.cad_file = shutil.copy(TEST_CAD_FILE, root / 'cad.json')
+        self.index = OffsetIndex.open(self.neo_file, self.cad_file)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_every_neo_matches(self):
+        for neo in self.neos:
+            found = self.index.get_neo_by_designation(neo.designation)
+            self.assertEqual(describe(found), describe(neo))
+            self.assertEqual(summarize(found.approaches), summarize(neo.approaches))
+            for approach in found.approaches:
+                self.assertIs(approach.neo, found)
+
+    def test_get_neo_by_name(self):
+        self.assertEqual(self.index.get_neo_by_name('Jormungandr').designation, '471926')
+        self.assertEqual(describe(self.index.get_neo_by_name('Cerberus')),
+                         describe(self.memory.get_neo_by_name('Cerberus')))
+        self.assertIsNone(self.index.get_neo_by_name('not-real-name'))
+        self.assertIsNone(self.index.get_neo_by_name(''))
+        self.assertIsNone(self.index.get_neo_by_designation('not-real-designation'))
+
+    def test_find_neos(self):
+        [jormungandr] = self.index.find_neos('JORMUNGANDR')
+        self.assertEqual(jormungandr.designation, '471926')
+        found = self.index.find_neos('2020 a*', by='designation')
+        expected = self.memory.find_neos('2020 a*', by='designation')
+        self.assertEqual([describe(neo) for neo in found], [describe(neo) for neo in expected])
+        self.assertEqual(self.index.complete_neos('c'), self.memory.complete_neos('c'))
+        self.assertEqual(self.index.suggest_neos('jormungand'),
+                         self.memory.suggest_neos('jormungand'))
+
+    def test_reused_names(self):
+        # Another NEO named Toro.
+        with open(self.neo_file, 'a') as outfile:
+            outfile.write('a9999999,29999999,9999 Toro,9999,Toro,,Y,Y\n')
+        index = OffsetIndex.open(self.neo_file, self.cad_file)
+        self.assertEqual([neo.designation for neo in index.get_neos_by_name('Toro')],
+                         ['1685', '9999'])
+        self.assertEqual(index.get_neo_by_name('Toro').designation, '9999')
+        self.assertEqual(index.get_neos_by_name('not-real-name'), [])
+
+    def test_index_is_persisted_and_reused(self):
+        self.assertTrue(index_path_for(self.neo_file).exists())
+        with mock.patch.object(offset_index, 'build_index') as build:
+            reopened = OffsetIndex.open(self.neo_file, self.cad_file)
+        build.assert_not_called()
+        self.assertEqual(reopened.get_neo_by_designation('1685').name, 'Toro')
+
+    def test_open_only_decodes_the_header(self):
+        with mock.patch.object(offset_index.json, 'loads', wraps=json.loads) as loads:
+            reopened = OffsetIndex.open(self.neo_file, self.cad_file)
+        self.assertTrue(loads.called)
+        header_size = index_path_for(self.neo_file).read_bytes().index(b'\n') + 1
+        for call in loads.call_args_list:
+            self.assertLessEqual(len(call[0][0]), header_size)
+        self.assertEqual(reopened.get_neo_by_designation('1685').name, 'Toro')
+
+    def test_truncated_index_is_rebuilt(self):
+        path = index_path_for(self.neo_file)
+        data = path.read_bytes()
+        path.write_bytes(data[:len(data) // 2])
+        reopened = OffsetIndex.open(self.neo_file, self.cad_file)
+        self.assertEqual(reopened.get_neo_by_designation('1685').name, 'Toro')
+        self.assertEqual(path.read_bytes(), data)
+
+    def test_index_is_rebuilt_when_data_changes(self):
+        with open(self.cad_file) as infile:
+            document = json.load(infile)
+        des = document['fields'].index('des')
+        document['data'] = [row for row in document['data'] if row[des] != '1685']
+        with open(self.cad_file, 'w') as outfile:
+            json.dump(document, outfile)
+
+        reopened = OffsetIndex.open(self.neo_file, self.cad_file)
+        self.assertEqual(reopened.get_neo_by_designation('1685').approaches, ())
+
+    def test_unwritable_index_is_still_used(self):
+        index_path_for(self.neo_file).unlink()
+        with mock.patch.object(offset_index, '_persist', side_effect=PermissionError):
+            reopened = OffsetIndex.open(self.neo_file, self.cad_file)
+        self.assertEqual(reopened.get_neo_by_designation('1685').name, 'Toro')
+
+
+if __name__ == '__main__':
+    unittest.main()
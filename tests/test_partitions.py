@@ -0,0 +1,131 @@
+"""Check that close approaches can be split into partitions and loaded lazily.
+
+The test close approaches are spread over forty years, split into one file per
+decade, and queried through a `PartitionedNEODatabase`, which is compared
+against an `NEODatabase` of the unsplit file.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_partitions
+"""
+import datetime
+import json
+import pathlib
+import tempfile
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters, create_neo_filters
+from instrumentation import listening
+from metrics import NEOMetrics
+from partitions import (PartitionedNEODatabase, list_partitions, select_partitions,
+                        split_approaches)
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+def summarize(approaches):
+    return [(approach._designation, approach.time) for approach in approaches]
+
+
+class TestPartitions(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        root = pathlib.Path(cls.tmpdir.name)
+
+        # Spread the (time-ordered) rows over 1990-2029, keeping them in time order.
+        document = json.loads(TEST_CAD_FILE.read_text())
+        cd = document['fields'].index('cd')
+        rows = [row for row in document['data'] if 'Feb-29' not in row[cd]]
+        for index, row in enumerate(rows):
+            row[cd] = f'{1990 + index * 40 // len(rows)}{row[cd][4:]}'
+        document['data'] = rows
+        cls.cad_file = root / 'cad.json'
+        cls.cad_file.write_text(json.dumps(document))
+
+        cls.outdir = root / 'cad'
+        cls.counts = split_approaches(cls.cad_file, cls.outdir, span='decade')
+        cls.partitions = list_partitions(cls.outdir)
+        cls.memory = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(cls.cad_file))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def test_split_into_decades(self):
+        self.assertEqual([path.name for path in sorted(self.counts)],
+                         ['cad-1990s.json', 'cad-2000s.json', 'cad-2010s.json', 'cad-2020s.json'])
+        self.assertEqual(sum(self.counts.values()), len(self.memory._approaches))
+        self.assertEqual([(start, end) for start, end, _ in self.partitions],
+                         [(1990, 2000), (2000, 2010), (2010, 2020), (2020, 2030)])
+
+    def test_split_into_years(self):
+        with tempfile.TemporaryDirectory() as outdir:
+            counts = split_approaches(self.cad_file, outdir, span='year', suffix='.json.gz')
+            self.assertEqual(len(counts), 40)
+            partitions = list_partitions(outdir)
+            self.assertEqual(partitions[0][:2], (1990, 1991))
+            self.assertEqual(summarize(load_approaches([path for _, _, path in partitions])),
+                             summarize(self.memory.query()))
+
+    def test_select_partitions(self):
+        filters = create_filters(start_date=datetime.date(2005, 6, 1),
+                                 end_date=datetime.date(2012, 1, 1))
+        self.assertEqual([path.name for path in select_partitions(self.partitions, filters)],
+                         ['cad-2000s.json', 'cad-2010s.json'])
+        filters = create_filters(date=datetime.date(1999, 12, 31))
+        self.assertEqual([path.name for path in select_partitions(self.partitions, filters)],
+                         ['cad-1990s.json'])
+        self.assertEqual(len(select_partitions(self.partitions, create_filters(distance_max=0.1))), 4)
+
+    def test_queries_load_only_overlapping_partitions(self):
+        db = PartitionedNEODatabase(load_neos(TEST_NEO_FILE), self.partitions)
+        filters = create_filters(start_date=datetime.date(2011, 3, 1),
+                                 end_date=datetime.date(2011, 9, 30))
+        self.assertEqual(summarize(db.query(filters)), summarize(self.memory.query(filters)))
+        self.assertEqual([start for start, _, _ in db._unloaded], [1990, 2000, 2020])
+
+        filters = create_filters(start_date=datetime.date(2005, 1, 1), velocity_min=20)
+        self.assertEqual(summarize(db.query(filters)), summarize(self.memory.query(filters)))
+        self.assertEqual([start for start, _, _ in db._unloaded], [1990])
+
+    def test_partition_cache_metrics(self):
+        db = PartitionedNEODatabase(load_neos(TEST_NEO_FILE), self.partitions)
+        filters = create_filters(start_date=datetime.date(2005, 1, 1),
+                                 end_date=datetime.date(2012, 1, 1))
+        with listening(NEOMetrics()) as metrics:
+            list(db.query(filters))
+            list(db.query(filters))
+        self.assertEqual(metrics.cache_misses.value('PartitionedNEODatabase', 'partitions'), 2)
+        self.assertEqual(metrics.cache_hits.value('PartitionedNEODatabase', 'partitions'), 2)
+        self.assertEqual(metrics.load_duration.count('partition'), 2)
+
+    def test_inspect_loads_every_partition(self):
+        db = PartitionedNEODatabase(load_neos(TEST_NEO_FILE), self.partitions)
+        neo = db.get_neo_by_name('Toro')
+        self.assertEqual(db._unloaded, [])
+        self.assertEqual(summarize(neo.approaches),
+                         summarize(self.memory.get_neo_by_name('Toro').approaches))
+
+    def test_query_neos_loads_every_partition(self):
+        db = PartitionedNEODatabase(load_neos(TEST_NEO_FILE), self.partitions)
+        filters = create_neo_filters(approaches_min=3)
+        results = [neo.designation for neo in db.query_neos(filters)]
+        self.assertEqual(db._unloaded, [])
+        self.assertEqual(results, [neo.designation for neo in self.memory.query_neos(filters)])
+
+    def test_find_neos_loads_every_partition(self):
+        db = PartitionedNEODatabase(load_neos(TEST_NEO_FILE), self.partitions)
+        [neo] = db.find_neos('toro')
+        self.assertEqual(db._unloaded, [])
+        self.assertEqual(summarize(neo.approaches),
+                         summarize(self.memory.get_neo_by_name('Toro').approaches))
+
+
+if __name__ == '__main__':
+    unittest.main()
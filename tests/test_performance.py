@@ -0,0 +1,136 @@
+"""Check that queries and lookups scale sub-linearly, and loading linearly.
+
+Synthetic data sets of a few sizes are generated with `benchmarks.generate`.
+Scans are checked by counting the close approaches each query checks (with an
+instrumentation listener), which doesn't depend on the speed of the machine: a
+query served by bisecting the approaches' times must not check any close
+approach outside its dates, whatever the size of the data set. Lookups, loading
+and linking are checked by timing them at each size, with bounds loose enough
+to tolerate a noisy machine, but not a full scan or a quadratic algorithm.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_performance
+"""
+import datetime
+import pathlib
+import random
+import tempfile
+import time
+import unittest
+
+from benchmarks.generate import generate
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters
+from instrumentation import FilterStats, listening
+
+
+# The numbers of close approaches in the data sets, smallest first.
+SIZES = (3000, 24000)
+
+
+def best_time(func, repeat=5):
+    """Return the fastest of several runs of `func()`, in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def unlink(neos, approaches):
+    """Undo the linking done by `NEODatabase.__init__`, so that the objects can be linked again."""
+    for neo in neos:
+        neo.approaches = []
+    for approach in approaches:
+        approach.neo = None
+
+
+class TestPerformance(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.files = {}
+        cls.data = {}
+        for size in SIZES:
+            neo_file, cad_file = generate(pathlib.Path(cls.tmpdir.name) / str(size), size)
+            cls.files[size] = (neo_file, cad_file)
+            cls.data[size] = (load_neos(neo_file), load_approaches(cad_file))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+
+    def database(self, size):
+        neos, approaches = self.data[size]
+        unlink(neos, approaches)
+        return NEODatabase(neos, approaches)
+
+    def assertScansOnlyMatchingDates(self, filters, in_dates):
+        for size in SIZES:
+            with self.subTest(size=size):
+                db = self.database(size)
+                with listening(FilterStats()) as stats:
+                    results = list(db.query(filters))
+                expected = sum(1 for approach in self.data[size][1] if in_dates(approach.time.date()))
+                self.assertEqual(stats.scanned, expected)
+                self.assertLess(stats.scanned, size / 20)
+                self.assertLessEqual(len(results), stats.scanned)
+
+    def test_single_date_query_only_scans_that_date(self):
+        date = self.data[SIZES[0]][1][len(self.data[SIZES[0]][1]) // 2].time.date()
+        self.assertScansOnlyMatchingDates(create_filters(date=date), lambda day: day == date)
+
+    def test_date_range_query_only_scans_that_range(self):
+        start, end = datetime.date(2020, 1, 1), datetime.date(2021, 6, 30)
+        filters = create_filters(start_date=start, end_date=end, distance_max=0.1, hazardous=True)
+        self.assertScansOnlyMatchingDates(filters, lambda day: start <= day <= end)
+
+    def test_lookups_are_sublinear(self):
+        times = []
+        for size in SIZES:
+            db = self.database(size)
+            neos = self.data[size][0]
+            rng = random.Random(size)
+            designations = [rng.choice(neos).designation for _ in range(2000)]
+            names = [neo.name for neo in neos if neo.name] * 20
+            self.assertTrue(names)
+
+            def lookups():
+                for designation in designations:
+                    db.get_neo_by_designation(designation)
+                for name in names[:2000]:
+                    db.get_neo_by_name(name)
+            times.append(best_time(lookups))
+        # The data set grows eightfold; a lookup that scanned would slow down about as much.
+        self.assertLess(times[1], times[0] * 3)
+
+    def test_linking_is_linear(self):
+        times = []
+        for size in SIZES:
+            neos, approaches = self.data[size]
+
+            def link():
+                unlink(neos, approaches)
+                NEODatabase(neos, approaches)
+            times.append(best_time(link, repeat=3))
+        # Linear linking slows down eightfold; quadratic linking, sixty-four-fold.
+        self.assertLess(times[1], times[0] * 20)
+
+    def test_loading_is_linear(self):
+        times = []
+        for size in SIZES:
+            neo_file, cad_file = self.files[size]
+
+            def load():
+                load_neos(neo_file)
+                load_approaches(cad_file)
+            times.append(best_time(load, repeat=3))
+        # Linear loading slows down eightfold; quadratic loading, sixty-four-fold.
+        self.assertLess(times[1], times[0] * 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""Check that the profiler measures each phase on its own, and nothing when disabled.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_profiling
+"""
+import io
+import json
+import pathlib
+import tempfile
+import time
+import tracemalloc
+import unittest
+
+from filters import limit
+from profiling import Profiler
+
+
+def slow(count, delay):
+    for index in range(count):
+        time.sleep(delay)
+        yield index
+
+
+class TestProfiler(unittest.TestCase):
+    def test_nested_streams_are_charged_their_own_time(self):
+        profiler = Profiler()
+        results = profiler.stream('query', slow(10, 0.01))
+        results = profiler.stream('limit', limit(results, 5))
+        with profiler.phase('write') as phase:
+            self.assertEqual(list(phase.counted(results)), [0, 1, 2, 3, 4])
+        records = {record.name: record for record in profiler.records()}
+        self.assertEqual([record.name for record in profiler.records()], ['query', 'limit', 'write'])
+        self.assertGreaterEqual(records['query'].rows, 5)
+        self.assertEqual(records['limit'].rows, 5)
+        self.assertEqual(records['write'].rows, 5)
+        self.assertGreaterEqual(records['query'].wall, 0.05)
+        self.assertLess(records['limit'].wall, 0.01)
+        self.assertLess(records['write'].wall, 0.01)
+
+    def test_call_counts_rows(self):
+        profiler = Profiler()
+        self.assertEqual(profiler.call('load', list, range(7)), list(range(7)))
+        record, = profiler.records()
+        self.assertEqual((record.name, record.rows, record.runs), ('load', 7, 1))
+        self.assertIsNotNone(record.rate)
+
+    def test_disabled_profiler_measures_nothing(self):
+        profiler = Profiler(enabled=False)
+        results = iter(range(3))
+        self.assertIs(profiler.stream('query', results), results)
+        with profiler.phase('write') as phase:
+            self.assertIs(phase.counted(results), results)
+        self.assertEqual(profiler.call('load', list, range(3)), [0, 1, 2])
+        self.assertEqual(profiler.records(), [])
+
+    def test_peak_memory(self):
+        profiler = Profiler(trace_memory=True)
+        self.addCleanup(tracemalloc.stop)
+        with profiler.phase('allocate'):
+            data = bytearray(1 << 22)
+        del data
+        with profiler.phase('idle'):
+            pass
+        records = {record.name: record for record in profiler.records()}
+        self.assertGreaterEqual(records['allocate'].peak, 1 << 22)
+        self.assertLess(records['idle'].peak, records['allocate'].peak)
+
+    def test_report_and_json(self):
+        profiler = Profiler()
+        list(profiler.stream('query', range(4)))
+        out = io.StringIO()
+        profiler.report(out)
+        self.assertIn('query', out.getvalue())
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = pathlib.Path(tmpdir) / 'profile.json'
+            profiler.write_json(path)
+            phases = json.loads(path.read_text())['phases']
+        self.assertEqual(phases[0]['phase'], 'query')
+        self.assertEqual(phases[0]['rows'], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
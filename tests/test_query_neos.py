@@ -0,0 +1,96 @@
+"""Check that `query_neos` on an `NEODatabase` accurately produces NEOs.
+
+Each query is compared against a scan of every NEO, and the scans of selective
+queries are counted to check that they're served by the sorted NEO indexes.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_query_neos
+"""
+import math
+import operator
+import pathlib
+import unittest
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_neo_filters, NEODiameterFilter
+from instrumentation import FilterStats, listening
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+def closest(neo):
+    return min((approach.distance for approach in neo.approaches), default=math.inf)
+
+
+class TestQueryNEOs(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.neos = load_neos(TEST_NEO_FILE)
+        cls.approaches = load_approaches(TEST_CAD_FILE)
+        cls.db = NEODatabase(cls.neos, cls.approaches)
+
+    def assertMatches(self, predicate, **criteria):
+        expected = [neo for neo in self.neos if predicate(neo)]
+        self.assertEqual(list(self.db.query_neos(create_neo_filters(**criteria))), expected)
+        return expected
+
+    def test_query_all(self):
+        self.assertEqual(list(self.db.query_neos()), self.neos)
+
+    def test_query_diameter(self):
+        self.assertTrue(self.assertMatches(lambda neo: neo.diameter >= 1, diameter_min=1))
+        self.assertMatches(lambda neo: 0.5 <= neo.diameter <= 2, diameter_min=0.5, diameter_max=2)
+
+    def test_query_hazardous(self):
+        self.assertTrue(self.assertMatches(lambda neo: neo.hazardous, hazardous=True))
+        self.assertTrue(self.assertMatches(lambda neo: not neo.hazardous, hazardous=False))
+
+    def test_query_approach_count(self):
+        self.assertTrue(self.assertMatches(lambda neo: len(neo.approaches) >= 3, approaches_min=3))
+        self.assertMatches(lambda neo: not neo.approaches, approaches_max=0)
+
+    def test_query_closest_approach(self):
+        self.assertTrue(self.assertMatches(lambda neo: closest(neo) <= 0.01, distance_max=0.01))
+        self.assertMatches(lambda neo: 0.1 <= closest(neo) < math.inf, distance_min=0.1)
+
+    def test_query_combined(self):
+        self.assertTrue(self.assertMatches(
+            lambda neo: neo.hazardous and neo.diameter >= 0.1 and closest(neo) <= 0.2,
+            hazardous=True, diameter_min=0.1, distance_max=0.2))
+        self.assertMatches(
+            lambda neo: not neo.hazardous and len(neo.approaches) >= 2 and closest(neo) >= 0.05,
+            hazardous=False, approaches_min=2, distance_min=0.05)
+
+    def test_unindexed_operators_are_checked(self):
+        filters = [NEODiameterFilter(operator.ne, 3.4)]
+        expected = [neo for neo in self.neos if not math.isnan(neo.diameter) and neo.diameter != 3.4]
+        self.assertEqual(list(self.db.query_neos(filters)), expected)
+
+    def test_selective_query_only_scans_its_range(self):
+        filters = create_neo_filters(diameter_min=1, distance_max=0.2)
+        with listening(FilterStats()) as stats:
+            results = list(self.db.query_neos(filters))
+        larger = sum(1 for neo in self.neos if neo.diameter >= 1)
+        nearer = sum(1 for neo in self.neos if closest(neo) <= 0.2)
+        self.assertEqual(stats.scanned, min(larger, nearer))
+        self.assertEqual(stats.matched, len(results))
+
+    def test_indexes_follow_new_approaches(self):
+        neos = load_neos(TEST_NEO_FILE)
+        approaches = load_approaches(TEST_CAD_FILE)
+        db = NEODatabase(neos, approaches[::2])
+        filters = create_neo_filters(approaches_min=3)
+        self.assertEqual(len(list(db.query_neos(filters))),
+                         sum(1 for neo in neos if len(neo.approaches) >= 3))
+        db.add_approaches(approaches[1::2])
+        self.assertEqual([neo.designation for neo in db.query_neos(filters)],
+                         [neo.designation for neo in self.neos if len(neo.approaches) >= 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
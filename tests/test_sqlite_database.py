@@ -0,0 +1,227 @@
+"""Check that a `SQLiteNEODatabase` behaves like an in-memory `NEODatabase`.
+
+The test data files are ingested into a temporary SQLite database, and every
+query is compared against the same query on an `NEODatabase`.
+
+To run these tests from the project root, run:
+
+    $ python3 -m unittest --verbose tests.test_sqlite_database
+"""
+import datetime
+import gc
+import math
+import operator
+import os
+import pathlib
+import tempfile
+import unittest
+import unittest.mock
+
+from database import NEODatabase
+from extract import load_neos, load_approaches
+from filters import create_filters, AttributeFilter
+from models import NearEarthObject, CloseApproach
+import sqlite_database
+from sqlite_database import SQLiteNEODatabase, translate_filters, ingest_delta
+
+
+TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
+TEST_NEO_FILE = TESTS_ROOT / 'test-neos-2020.csv'
+TEST_CAD_FILE = TESTS_ROOT / 'test-cad-2020.json'
+
+
+def summarize(approaches):
+    return [(approach._designation, approach.time, approach.distance, approach.velocity)
+            for approach in approaches]
+
+
+class NameLengthFilter(AttributeFilter):
+    """A filter that has no SQL translation."""
+    @classmethod
+    def get(cls, approach):
+        return len(approach.neo.name or '')
+
+
+class TestSQLiteDatabase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.db_path = pathlib.Path(cls.tmpdir.name) / 'neos.sqlite3'
+        cls.db = SQLiteNEODatabase.open(cls.db_path, TEST_NEO_FILE, TEST_CAD_FILE)
+        cls.memory = NEODatabase(load_neos(TEST_NEO_FILE), load_approaches(TEST_CAD_FILE))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.db.close()
+        cls.tmpdir.cleanup()
+
+    def assertSameResults(self, filters):
+        self.assertEqual(summarize(self.db.query(filters)), summarize(self.memory.query(filters)))
+
+    def test_query_all(self):
+        self.assertSameResults(create_filters())
+
+    def test_query_dates(self):
+        self.assertSameResults(create_filters(date=datetime.date(2020, 3, 2)))
+        self.assertSameResults(create_filters(start_date=datetime.date(2020, 4, 1)))
+        self.assertSameResults(create_filters(end_date=datetime.date(2020, 6, 30)))
+        self.assertSameResults(create_filters(start_date=datetime.date(2020, 3, 1),
+                                              end_date=datetime.date(2020, 3, 31)))
+
+    def test_query_distance_and_velocity(self):
+        self.assertSameResults(create_filters(distance_min=0.1, distance_max=0.3))
+        self.assertSameResults(create_filters(velocity_min=10, velocity_max=20))
+
+    def test_query_diameter_and_hazardous(self):
+        self.assertSameResults(create_filters(diameter_min=0.5))
+        self.assertSameResults(create_filters(diameter_max=0.1, hazardous=False))
+        self.assertSameResults(create_filters(hazardous=True))
+
+    def test_query_all_bounds(self):
+        self.assertSameResults(create_filters(
+            start_date=datetime.date(2020, 3, 1), end_date=datetime.date(2020, 5, 31),
+            distance_min=0.05, distance_max=0.5, velocity_min=5, velocity_max=25,
+            diameter_max=1.5, hazardous=True
+        ))
+
+    def test_untranslatable_filter_is_evaluated_in_python(self):
+        filters = [NameLengthFilter(operator.ge, 8)]
+        clauses, _, _, remaining = translate_filters(filters)
+        self.assertEqual(clauses, [])
+        self.assertEqual(remaining, filters)
+        self.assertSameResults(filters)
+
+    def test_results_are_linked(self):
+        approach = next(self.db.query(create_filters(hazardous=True)))
+        self.assertIsNotNone(approach.neo)
+        self.assertIn(approach, approach.neo.approaches)
+        self.assertIs(self.db.get_neo_by_designation(approach.neo.designation), approach.neo)
+
+    def test_query_fetches_neos_in_batches(self):
+        db = SQLiteNEODatabase(self.db_path)
+        statements = []
+        db._connection.set_trace_callback(statements.append)
+        try:
+            results = list(db.query(create_filters()))
+        finally:
+            db.close()
+        batches = math.ceil(len(results) / sqlite_database.QUERY_BATCH_SIZE)
+        # The query itself, then one statement for NEOs and one for their approaches per batch.
+        self.assertLessEqual(len(statements), 1 + 2 * batches)
+
+    def test_unused_objects_are_not_kept(self):
+        db = SQLiteNEODatabase(self.db_path)
+        try:
+            with unittest.mock.patch('sqlite_database.NEO_CACHE_SIZE', 10):
+                for approach in db.query(create_filters()):
+                    pass
+                approach = None
+                gc.collect()
+                self.assertLessEqual(len(db._recent_neos), 10)
+                self.assertLessEqual(len(db._neos_by_designation), 10)
+                # A kept NEO is still the same object when it's looked up again.
+                designation = next(reversed(db._recent_neos))
+                neo = db.get_neo_by_designation(designation)
+                self.assertIs(db.get_neo_by_designation(designation), neo)
+        finally:
+            db.close()
+
+    def test_get_neo_by_designation(self):
+        adonis = self.db.get_neo_by_designation('2101')
+        self.assertEqual(adonis.name, 'Adonis')
+        self.assertEqual(adonis.diameter, 0.6)
+        self.assertTrue(adonis.hazardous)
+        self.assertEqual(summarize(adonis.approaches),
+                         summarize(self.memory.get_neo_by_designation('2101').approaches))
+
+        unknown = self.db.get_neo_by_designation('2019 SC8')
+        self.assertIsNone(unknown.name)
+        self.assertTrue(math.isnan(unknown.diameter))
+
+        self.assertIsNone(self.db.get_neo_by_designation('not-real-designation'))
+
+    def test_get_neo_by_name(self):
+        self.assertEqual(self.db.get_neo_by_name('Jormungandr').designation, '471926')
+        self.assertIsNone(self.db.get_neo_by_name('not-real-name'))
+        self.assertIsNone(self.db.get_neo_by_name(''))
+
+    def test_find_neos(self):
+        self.assertEqual([neo.designation for neo in self.db.find_neos('JORMUNGANDR')], ['471926'])
+        found = self.db.find_neos('2020 a*', by='designation')
+        expected = self.memory.find_neos('2020 a*', by='designation')
+        self.assertEqual([neo.designation for neo in found], [neo.designation for neo in expected])
+        self.assertEqual(self.db.complete_neos('c'), self.memory.complete_neos('c'))
+        self.assertEqual(self.db.suggest_neos('jormungand'), self.memory.suggest_neos('jormungand'))
+
+    def test_reused_names(self):
+        neo_file = pathlib.Path(self.tmpdir.name) / 'neos-reused.csv'
+        # Another NEO named Toro.
+        extra = 'a9999999,29999999,9999 Toro,9999,Toro,,Y,Y\n'
+        neo_file.write_text(TEST_NEO_FILE.read_text() + extra)
+        db = SQLiteNEODatabase.open(pathlib.Path(self.tmpdir.name) / 'reused.sqlite3',
+                                    neo_file, TEST_CAD_FILE)
+        try:
+            self.assertEqual([neo.designation for neo in db.get_neos_by_name('Toro')],
+                             ['1685', '9999'])
+            self.assertEqual(db.get_neo_by_name('Toro').designation, '9999')
+            self.assertEqual(db.get_neos_by_name('not-real-name'), [])
+        finally:
+            db.close()
+
+    def test_exists(self):
+        root = pathlib.Path(self.tmpdir.name)
+        self.assertTrue(SQLiteNEODatabase.exists(self.db_path))
+        self.assertFalse(SQLiteNEODatabase.exists(root / 'missing.sqlite3'))
+        (root / 'garbage.sqlite3').write_text('not a database')
+        self.assertFalse(SQLiteNEODatabase.exists(root / 'garbage.sqlite3'))
+
+    def test_open_reuses_or_rebuilds_database(self):
+        built = self.db_path.stat().st_mtime_ns
+        SQLiteNEODatabase.open(self.db_path, TEST_NEO_FILE, TEST_CAD_FILE).close()
+        self.assertEqual(self.db_path.stat().st_mtime_ns, built)
+
+        # A changed data file (here, a copy at another path) triggers a rebuild.
+        copy = pathlib.Path(self.tmpdir.name) / 'neos-copy.csv'
+        copy.write_bytes(TEST_NEO_FILE.read_bytes())
+        other_path = pathlib.Path(self.tmpdir.name) / 'other.sqlite3'
+        os.link(self.db_path, other_path)
+        SQLiteNEODatabase.open(other_path, copy, TEST_CAD_FILE).close()
+        self.assertNotEqual(other_path.stat().st_ino, self.db_path.stat().st_ino)
+
+
+class TestIngestDelta(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = pathlib.Path(self.tmpdir.name) / 'neos.sqlite3'
+        SQLiteNEODatabase.open(self.db_path, TEST_NEO_FILE, TEST_CAD_FILE).close()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_delta_is_merged_without_duplicates(self):
+        new_neo = NearEarthObject(pdes='2099 AA', name='Newcomer', diameter='1.5', pha='Y')
+        new_approaches = [
+            CloseApproach(des='2099 AA', jd='2458850.0', cd='2020-Jan-01 12:00', dist='0.1', v_rel='5'),
+            CloseApproach(des='2099 AA', jd='2459000.0', cd='2020-May-31 12:00', dist='0.2', v_rel='6'),
+        ]
+        added = ingest_delta(self.db_path, load_neos(TEST_NEO_FILE) + [new_neo],
+                             load_approaches(TEST_CAD_FILE) + new_approaches)
+        self.assertEqual(added, (1, 2))
+        self.assertEqual(ingest_delta(self.db_path, [new_neo], new_approaches), (0, 0))
+
+        db = SQLiteNEODatabase(self.db_path)
+        try:
+            neo = db.get_neo_by_name('Newcomer')
+            self.assertEqual(summarize(neo.approaches), summarize(new_approaches))
+            hazardous = {neo.designation for neo in load_neos(TEST_NEO_FILE) if neo.hazardous}
+            expected = [a for a in load_approaches(TEST_CAD_FILE) if a._designation in hazardous]
+            results = list(db.query(create_filters(hazardous=True)))
+            self.assertEqual(len(results), len(expected) + 2)
+            times = [approach.time for approach in db.query()]
+            self.assertEqual(times, sorted(times))
+        finally:
+            db.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,7 @@
 """Check that streams of results can be written to files.
 
-The `write_to_csv` and `write_to_json` methods should follow a specific output
-format, described in the project instructions.
+The `write_to_csv`, `write_to_json` and `write_to_ndjson` methods should follow
+a specific output format, described in the project instructions.
 
 There's some sketchy file-like manipulation in order to avoid writing anything
 to disk and avoid letting a context manager in the implementation eagerly close
@@ -20,14 +20,18 @@ import csv
 import datetime
 import io
 import json
+import gzip
 import pathlib
+import tempfile
 import unittest
 import unittest.mock
 
 
 from extract import load_neos, load_approaches
 from database import NEODatabase
-from write import write_to_csv, write_to_json
+from models import NearEarthObject, CloseApproach
+from write import (write_to_csv, write_to_json, write_to_ndjson, write_partitioned,
+                   partition_filename, neo_writer_for, NEO_CSV_FIELDNAMES)
 
 
 TESTS_ROOT = (pathlib.Path(__file__).parent).resolve()
@@ -226,5 +230,158 @@ class TestWriteToJSON(unittest.TestCase):
         self.assertIsInstance(approach['neo']['potentially_hazardous'], bool)
 
 
+    @unittest.mock.patch('write.open')
+    def test_json_data_without_results_is_an_empty_sequence(self, mock_file):
+        with UncloseableStringIO() as buf:
+            mock_file.return_value = buf
+            write_to_json((), None)
+            buf.seek(0)
+            self.assertEqual(json.load(buf), [])
+
+
+class TestWriteToNDJSON(unittest.TestCase):
+    @classmethod
+    @unittest.mock.patch('write.open')
+    def setUpClass(cls, mock_file):
+        results = build_results(5)
+
+        with UncloseableStringIO() as buf:
+            mock_file.return_value = buf
+            write_to_ndjson(results, None)
+            buf.seek(0)
+            cls.value = buf.getvalue()
+
+    def load_lines(self):
+        try:
+            return [json.loads(line) for line in self.value.splitlines()]
+        except json.JSONDecodeError as err:
+            raise self.failureException("write_to_ndjson produced an invalid JSON line") from err
+
+    def test_ndjson_data_has_five_lines(self):
+        self.assertEqual(len(self.load_lines()), 5)
+
+    def test_ndjson_lines_match_json_elements(self):
+        with UncloseableStringIO() as buf:
+            with unittest.mock.patch('write.open') as mock_file:
+                mock_file.return_value = buf
+                write_to_json(build_results(5), None)
+            buf.seek(0)
+            expected = json.load(buf)
+        self.assertEqual(self.load_lines(), expected)
+
+
+class TestWriteNEOs(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.neos = load_neos(TEST_NEO_FILE)
+        NEODatabase(cls.neos, load_approaches(TEST_CAD_FILE))
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.outdir = pathlib.Path(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_csv_has_aggregates(self):
+        path = self.outdir / 'neos.csv'
+        neo_writer_for(path)(self.neos, path)
+        with path.open(newline='') as infile:
+            reader = csv.DictReader(infile)
+            rows = list(reader)
+        self.assertEqual(tuple(reader.fieldnames), NEO_CSV_FIELDNAMES)
+        self.assertEqual(len(rows), len(self.neos))
+        for row, neo in zip(rows, self.neos):
+            self.assertEqual(row['designation'], neo.designation)
+            self.assertEqual(int(row['approaches']), len(neo.approaches))
+            if neo.approaches:
+                self.assertEqual(float(row['closest_distance_au']),
+                                 min(approach.distance for approach in neo.approaches))
+            else:
+                self.assertEqual(row['closest_distance_au'], '')
+
+    def test_compressed_ndjson_matches_json(self):
+        json_path, ndjson_path = self.outdir / 'neos.json', self.outdir / 'neos.jsonl.gz'
+        neo_writer_for(json_path)(self.neos[:50], json_path)
+        neo_writer_for(ndjson_path)(self.neos[:50], ndjson_path)
+        with json_path.open() as infile:
+            documents = json.load(infile)
+        with gzip.open(ndjson_path, 'rt') as infile:
+            self.assertEqual([json.loads(line) for line in infile], documents)
+        self.assertEqual(documents[0]['designation'], self.neos[0].designation)
+
+    def test_unknown_format(self):
+        self.assertIsNone(neo_writer_for('neos.txt'))
+
+
+class TestWritePartitioned(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.results = build_results(None)
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.outdir = pathlib.Path(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_partition_by_month_with_evictions(self):
+        # Only one open file per worker forces partitions to be closed and reopened.
+        written = write_partitioned(self.results, self.outdir, partition_by='month',
+                                    workers=3, max_open=3)
+        self.assertEqual(sum(written.values()), len(self.results))
+        self.assertEqual(len(written), 12)
+
+        for path, count in written.items():
+            with path.open(newline='') as infile:
+                rows = list(csv.DictReader(infile))
+            self.assertEqual(len(rows), count)
+            # Every row has the partition's month, and rows keep their chronological order.
+            self.assertTrue(all(row['datetime_utc'].startswith(path.stem) for row in rows))
+            times = [row['datetime_utc'] for row in rows]
+            self.assertEqual(times, sorted(times))
+
+    def test_partition_by_neo_compressed_ndjson(self):
+        # Most NEOs have a single approach, so only write a few hundred partitions.
+        results = self.results[:500]
+        written = write_partitioned(results, self.outdir, partition_by='neo',
+                                    suffix='.jsonl.gz', max_open=8, compresslevel=1)
+        self.assertEqual(sum(written.values()), len(results))
+        path = self.outdir / '2020_AY1.jsonl.gz'
+        self.assertIn(path, written)
+        with gzip.open(path, 'rt') as infile:
+            lines = [json.loads(line) for line in infile]
+        self.assertEqual(len(lines), written[path])
+        self.assertTrue(all(line['neo']['designation'] == '2020 AY1' for line in lines))
+
+    def test_partition_filenames_are_distinct(self):
+        self.assertEqual(partition_filename('C/2019 Y4', '.csv'), 'C%2F2019_Y4.csv')
+        keys = ['C/2019 Y4', 'C 2019 Y4', 'C_2019_Y4', 'C%2F2019 Y4', 'C%2F2019_Y4']
+        self.assertEqual(len({partition_filename(key, '.csv') for key in keys}), len(keys))
+
+    def test_partition_by_colliding_designations(self):
+        # Both designations used to be written to C_2019_Y4.csv.
+        results = []
+        for designation in ('C/2019 Y4', 'C 2019 Y4'):
+            neo = NearEarthObject(pdes=designation)
+            approach = CloseApproach(des=designation, cd='2020-Jan-01 00:00', dist='0.1',
+                                     v_rel='10')
+            approach.neo = neo
+            neo.add_approach(approach)
+            results.append(approach)
+        written = write_partitioned(results, self.outdir, partition_by='neo', workers=2)
+        self.assertEqual(len(written), 2)
+        for path in written:
+            with path.open(newline='') as infile:
+                rows = list(csv.DictReader(infile))
+            self.assertEqual(len(rows), 1)
+            self.assertEqual(partition_filename(rows[0]['designation'], '.csv'), path.name)
+
+    def test_partition_rejects_json_arrays(self):
+        with self.assertRaises(ValueError):
+            write_partitioned(self.results, self.outdir, suffix='.json')
+
+
 if __name__ == '__main__':
     unittest.main()
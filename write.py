@@ -1,52 +1,180 @@
 """Write a stream of close approaches to CSV or to JSON.
 
-This module exports two functions: `write_to_csv` and `write_to_json`, each of
-which accept an `results` stream of close approaches and a path to which to
-write the data.
+This module exports three functions: `write_to_csv`, `write_to_json` and
+`write_to_ndjson`, each of which accept an `results` stream of close approaches
+and a path to which to write the data.
 
 These functions are invoked by the main module with the output of the `limit`
 function and the filename supplied by the user at the command line. The file's
 extension determines which of these functions is used.
 
+The JSON writers stream their output: each close approach is serialized and
+written as soon as it is produced, so memory use doesn't grow with the number
+of results.
+
+Each writer also accepts a compressed filename, such as `results.csv.gz`,
+`results.json.xz` or `results.jsonl.bz2`, and streams its output through the
+matching compressor. The `writer_for` function picks the writer for a filename.
+
+The `write_diff_to_*` functions write the `ApproachChange`s of a diff between
+two data sets in the same formats, and `diff_writer_for` picks one of them.
+
+The `write_neos_to_*` functions write the NEOs of the `query-neos` subcommand
+in the same formats, with their number of close approaches and closest approach
+distance, and `neo_writer_for` picks one of them.
+
+The `write_partitioned` function splits a stream of close approaches into one
+file per year, month or NEO, serializing the partitions in worker threads.
+
 You'll edit this file in Part 4.
 """
+import collections
 import csv
 import json
+import queue
+import re
+import threading
+
+from compression import open_compressed, split_suffix
+
+
+# The number of CSV rows to accumulate before handing them to the writer at once.
+CSV_BATCH_SIZE = 4096
+
+# The size, in bytes, of the buffer for output files.
+WRITE_BUFFER_SIZE = 1 << 20
+
+# The header row of CSV output.
+CSV_FIELDNAMES = (
+    'datetime_utc', 'distance_au', 'velocity_km_s',
+    'designation', 'name', 'diameter_km', 'potentially_hazardous'
+)
+
+
+def serialize_approach(approach):
+    """Serialize a `CloseApproach` (and its NEO) into a JSON-compatible dictionary.
+
+    :param approach: A `CloseApproach` object.
+    :return: A dictionary of the approach's attributes, with its NEO nested under 'neo'.
+    """
+    return {
+        'datetime_utc': approach.time.strftime('%Y-%m-%d %H:%M') if approach.time else None,
+        'distance_au': approach.distance,
+        'velocity_km_s': approach.velocity,
+        'neo': {
+            'designation': approach.neo.designation if approach.neo else None,
+            'name': approach.neo.name if approach.neo and approach.neo.name else None,
+            'diameter_km': approach.neo.diameter if approach.neo else None,
+            'potentially_hazardous': approach.neo.hazardous if approach.neo else False
+        }
+    }
+
+
+def _csv_row(approach, neo_columns):
+    """Build the CSV row for a close approach.
+
+    :param approach: A `CloseApproach` object.
+    :param neo_columns: A cache mapping each NEO to its serialized columns, updated in place.
+    :return: A tuple of the row's values, in the order of `CSV_FIELDNAMES`.
+    """
+    neo = approach.neo
+    columns = neo_columns.get(neo)
+    if columns is None:
+        columns = neo_columns[neo] = (neo.name or '', neo.diameter, neo.hazardous)
+    return (
+        approach.time.isoformat(' ', 'minutes') if approach.time else '',
+        approach.distance,
+        approach.velocity,
+        approach._designation,  # Use _designation for the primary designation
+    ) + columns
+
+
+def _empty_neo_columns():
+    """Return a new cache of serialized NEO columns for use with `_csv_row`."""
+    return {None: ('', float('nan'), False)}
+
+
+def _open_output(filename, newline=None, compresslevel=None, threaded=False, mode='w',
+                 buffer_size=WRITE_BUFFER_SIZE):
+    """Open an output file for writing text, compressing it if its name says so.
+
+    :param filename: A Path-like object pointing to where the data should be saved.
+    :param newline: Passed to the file object, as for `open`.
+    :param compresslevel: The compression level, if the output is compressed.
+    :param threaded: Whether to compress the output in a background thread.
+    :param mode: Either 'w' to truncate the file or 'a' to append to it.
+    :param buffer_size: The size, in bytes, of the file's buffer.
+    :return: A text file object.
+    """
+    if split_suffix(filename)[1] is not None:
+        return open_compressed(filename, mode + 't', level=compresslevel,
+                               newline=newline, threaded=threaded, buffer_size=buffer_size)
+    return open(filename, mode, newline=newline, buffering=buffer_size)
+
+
+def _write_json_list(documents, filename, compresslevel=None, threaded=False):
+    """Stream JSON-compatible documents to a file as the elements of a JSON list.
+
+    :param documents: An iterable of JSON-compatible objects.
+    :param filename: A Path-like object pointing to where the data should be saved.
+    :param compresslevel: The compression level, if the output is compressed.
+    :param threaded: Whether to compress the output in a background thread.
+    """
+    with _open_output(filename, None, compresslevel, threaded) as outfile:
+        separator = '\n  '
+        outfile.write('[')
+        for document in documents:
+            outfile.write(separator)
+            outfile.write(json.dumps(document))
+            separator = ',\n  '
+        # An empty list closes on the same line; otherwise, close on a new one.
+        outfile.write(']\n' if separator == '\n  ' else '\n]\n')
+
+
+def _write_json_lines(documents, filename, compresslevel=None, threaded=False):
+    """Stream JSON-compatible documents to a file, one per line.
+
+    :param documents: An iterable of JSON-compatible objects.
+    :param filename: A Path-like object pointing to where the data should be saved.
+    :param compresslevel: The compression level, if the output is compressed.
+    :param threaded: Whether to compress the output in a background thread.
+    """
+    with _open_output(filename, None, compresslevel, threaded) as outfile:
+        for document in documents:
+            outfile.write(json.dumps(document))
+            outfile.write('\n')
 
 
-def write_to_csv(results, filename):
+def write_to_csv(results, filename, compresslevel=None, threaded=False):
     """Write an iterable of `CloseApproach` objects to a CSV file.
 
     The precise output specification is in `README.md`. Roughly, each output row
     corresponds to the information in a single close approach from the `results`
     stream and its associated near-Earth object.
 
+    Rows are built as tuples and handed to the underlying writer in batches of
+    `CSV_BATCH_SIZE`. The NEO's columns are serialized once per NEO and reused
+    for each of its close approaches.
+
     :param results: An iterable of `CloseApproach` objects.
     :param filename: A Path-like object pointing to where the data should be saved.
+    :param compresslevel: The compression level, if the output is compressed.
+    :param threaded: Whether to compress the output in a background thread.
     """
-    fieldnames = (
-        'datetime_utc', 'distance_au', 'velocity_km_s',
-        'designation', 'name', 'diameter_km', 'potentially_hazardous'
-    )
-    with open(filename, 'w', newline='') as outfile:
-        writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-        writer.writeheader()
+    neo_columns = _empty_neo_columns()
+    with _open_output(filename, '', compresslevel, threaded) as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(CSV_FIELDNAMES)
+        batch = []
         for approach in results:
-            # Prepare the row data for CSV.
-            # Ensure all fields are present, even if some are None or NaN.
-            row = {
-                'datetime_utc': approach.time.strftime('%Y-%m-%d %H:%M') if approach.time else '',
-                'distance_au': approach.distance,
-                'velocity_km_s': approach.velocity,
-                'designation': approach._designation, # Use _designation for the primary designation
-                'name': approach.neo.name if approach.neo and approach.neo.name else '',
-                'diameter_km': approach.neo.diameter if approach.neo else float('nan'),
-                'potentially_hazardous': approach.neo.hazardous if approach.neo else False
-            }
-            writer.writerow(row)
-
-
-def write_to_json(results, filename):
+            batch.append(_csv_row(approach, neo_columns))
+            if len(batch) >= CSV_BATCH_SIZE:
+                writer.writerows(batch)
+                batch.clear()
+        writer.writerows(batch)
+
+
+def write_to_json(results, filename, compresslevel=None, threaded=False):
     """Write an iterable of `CloseApproach` objects to a JSON file.
 
     The precise output specification is in `README.md`. Roughly, the output is a
@@ -54,31 +182,418 @@ def write_to_json(results, filename):
     their values and the 'neo' key mapping to a dictionary of the associated
     NEO's attributes.
 
+    The list is streamed to disk one element at a time, so the full set of
+    results is never held in memory.
+
     :param results: An iterable of `CloseApproach` objects.
     :param filename: A Path-like object pointing to where the data should be saved.
+    :param compresslevel: The compression level, if the output is compressed.
+    :param threaded: Whether to compress the output in a background thread.
     """
-    output_data = []
-    for approach in results:
-        # Prepare the dictionary for each close approach.
-        # Ensure all fields are included, handling potential None values.
-        approach_dict = {
-            'datetime_utc': approach.time.strftime('%Y-%m-%d %H:%M') if approach.time else None,
-            'distance_au': approach.distance,
-            'velocity_km_s': approach.velocity,
-        }
+    _write_json_list(map(serialize_approach, results), filename, compresslevel, threaded)
+
+
+def write_to_ndjson(results, filename, compresslevel=None, threaded=False):
+    """Write an iterable of `CloseApproach` objects to a newline-delimited JSON file.
+
+    Each line of the output is a standalone JSON document with the same
+    structure as an element of the list written by `write_to_json`, which lets
+    downstream consumers process the file one line at a time.
+
+    :param results: An iterable of `CloseApproach` objects.
+    :param filename: A Path-like object pointing to where the data should be saved.
+    :param compresslevel: The compression level, if the output is compressed.
+    :param threaded: Whether to compress the output in a background thread.
+    """
+    _write_json_lines(map(serialize_approach, results), filename, compresslevel, threaded)
+
+
+# Map each output format suffix to the writer for that format.
+WRITERS = {
+    '.csv': write_to_csv,
+    '.json': write_to_json,
+    '.jsonl': write_to_ndjson,
+    '.ndjson': write_to_ndjson,
+}
+
+
+def writer_for(filename):
+    """Choose a writer by the format suffix of a filename, ignoring any compression suffix.
+
+    :param filename: A Path-like object, such as `results.csv` or `results.jsonl.gz`.
+    :return: One of the `write_to_*` functions, or `None` if the format is unknown.
+    """
+    return WRITERS.get(split_suffix(filename)[0])
+
+
+# The header row of CSV output of a diff.
+DIFF_CSV_FIELDNAMES = (
+    'change', 'designation', 'datetime_utc', 'distance_au', 'velocity_km_s',
+    'old_distance_au', 'old_velocity_km_s'
+)
+
+
+def serialize_change(change):
+    """Serialize an `ApproachChange` into a JSON-compatible dictionary.
+
+    The distance and velocity are those of the new data set, and the old ones
+    are those of the old data set; either pair is `None` if the close approach
+    isn't in that data set.
+
+    :param change: An `ApproachChange` object, as from `diff.diff_approaches`.
+    :return: A dictionary with the keys of `DIFF_CSV_FIELDNAMES`.
+    """
+    approach, old, new = change.approach, change.old, change.new
+    return {
+        'change': change.change,
+        'designation': approach._designation,
+        'datetime_utc': approach.time.isoformat(' ', 'minutes') if approach.time else None,
+        'distance_au': new.distance if new is not None else None,
+        'velocity_km_s': new.velocity if new is not None else None,
+        'old_distance_au': old.distance if old is not None else None,
+        'old_velocity_km_s': old.velocity if old is not None else None,
+    }
+
+
+def write_diff_to_csv(changes, filename, compresslevel=None, threaded=False):
+    """Write an iterable of `ApproachChange` objects to a CSV file.
+
+    The columns are `DIFF_CSV_FIELDNAMES`; missing values are left empty.
+
+    :param changes: An iterable of `ApproachChange` objects.
+    :param filename: A Path-like object pointing to where the data should be saved.
+    :param compresslevel: The compression level, if the output is compressed.
+    :param threaded: Whether to compress the output in a background thread.
+    """
+    with _open_output(filename, '', compresslevel, threaded) as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(DIFF_CSV_FIELDNAMES)
+        batch = []
+        for change in changes:
+            batch.append(['' if value is None else value
+                          for value in serialize_change(change).values()])
+            if len(batch) >= CSV_BATCH_SIZE:
+                writer.writerows(batch)
+                batch.clear()
+        writer.writerows(batch)
 
-        # Prepare the nested dictionary for the associated NEO.
-        neo_dict = {
-            'designation': approach.neo.designation if approach.neo else None,
-            'name': approach.neo.name if approach.neo and approach.neo.name else None,
-            'diameter_km': approach.neo.diameter if approach.neo else None,
-            'potentially_hazardous': approach.neo.hazardous if approach.neo else False
-        }
-        # Add the neo_dict under the 'neo' key in the approach_dict.
-        approach_dict['neo'] = neo_dict
-        output_data.append(approach_dict)
 
-    with open(filename, 'w') as outfile:
-        # Use indent for pretty-printing the JSON output.
-        json.dump(output_data, outfile, indent=2)
+def write_diff_to_json(changes, filename, compresslevel=None, threaded=False):
+    """Write an iterable of `ApproachChange` objects to a JSON file, as a list.
+
+    :param changes: An iterable of `ApproachChange` objects.
+    :param filename: A Path-like object pointing to where the data should be saved.
+    :param compresslevel: The compression level, if the output is compressed.
+    :param threaded: Whether to compress the output in a background thread.
+    """
+    _write_json_list(map(serialize_change, changes), filename, compresslevel, threaded)
+
+
+def write_diff_to_ndjson(changes, filename, compresslevel=None, threaded=False):
+    """Write an iterable of `ApproachChange` objects to a newline-delimited JSON file.
+
+    :param changes: An iterable of `ApproachChange` objects.
+    :param filename: A Path-like object pointing to where the data should be saved.
+    :param compresslevel: The compression level, if the output is compressed.
+    :param threaded: Whether to compress the output in a background thread.
+    """
+    _write_json_lines(map(serialize_change, changes), filename, compresslevel, threaded)
+
+
+# Map each output format suffix to the writer of diffs in that format.
+DIFF_WRITERS = {
+    '.csv': write_diff_to_csv,
+    '.json': write_diff_to_json,
+    '.jsonl': write_diff_to_ndjson,
+    '.ndjson': write_diff_to_ndjson,
+}
+
+
+def diff_writer_for(filename):
+    """Choose a diff writer by the format suffix of a filename, ignoring any compression suffix.
+
+    :param filename: A Path-like object, such as `diff.csv` or `diff.jsonl.gz`.
+    :return: One of the `write_diff_to_*` functions, or `None` if the format is unknown.
+    """
+    return DIFF_WRITERS.get(split_suffix(filename)[0])
+
+
+# The header row of CSV output of NEOs.
+NEO_CSV_FIELDNAMES = (
+    'designation', 'name', 'diameter_km', 'potentially_hazardous', 'approaches',
+    'closest_distance_au'
+)
+
+
+def serialize_neo(neo):
+    """Serialize a `NearEarthObject` and the aggregates of its close approaches.
+
+    :param neo: A `NearEarthObject` object, linked to its close approaches.
+    :return: A dictionary with the keys of `NEO_CSV_FIELDNAMES`.
+    """
+    return {
+        'designation': neo.designation,
+        'name': neo.name,
+        'diameter_km': neo.diameter,
+        'potentially_hazardous': neo.hazardous,
+        'approaches': neo.approach_count,
+        'closest_distance_au': neo.closest_approach.distance if neo.closest_approach else None,
+    }
+
+
+def write_neos_to_csv(neos, filename, compresslevel=None, threaded=False):
+    """Write an iterable of `NearEarthObject`s to a CSV file.
+
+    The columns are `NEO_CSV_FIELDNAMES`; missing values are left empty.
+
+    :param neos: An iterable of `NearEarthObject` objects.
+    :param filename: A Path-like object pointing to where the data should be saved.
+    :param compresslevel: The compression level, if the output is compressed.
+    :param threaded: Whether to compress the output in a background thread.
+    """
+    with _open_output(filename, '', compresslevel, threaded) as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(NEO_CSV_FIELDNAMES)
+        batch = []
+        for neo in neos:
+            batch.append(['' if value is None else value for value in serialize_neo(neo).values()])
+            if len(batch) >= CSV_BATCH_SIZE:
+                writer.writerows(batch)
+                batch.clear()
+        writer.writerows(batch)
+
+
+def write_neos_to_json(neos, filename, compresslevel=None, threaded=False):
+    """Write an iterable of `NearEarthObject`s to a JSON file, as a list.
+
+    :param neos: An iterable of `NearEarthObject` objects.
+    :param filename: A Path-like object pointing to where the data should be saved.
+    :param compresslevel: The compression level, if the output is compressed.
+    :param threaded: Whether to compress the output in a background thread.
+    """
+    _write_json_list(map(serialize_neo, neos), filename, compresslevel, threaded)
+
+
+def write_neos_to_ndjson(neos, filename, compresslevel=None, threaded=False):
+    """Write an iterable of `NearEarthObject`s to a newline-delimited JSON file.
+
+    :param neos: An iterable of `NearEarthObject` objects.
+    :param filename: A Path-like object pointing to where the data should be saved.
+    :param compresslevel: The compression level, if the output is compressed.
+    :param threaded: Whether to compress the output in a background thread.
+    """
+    _write_json_lines(map(serialize_neo, neos), filename, compresslevel, threaded)
+
+
+# Map each output format suffix to the writer of NEOs in that format.
+NEO_WRITERS = {
+    '.csv': write_neos_to_csv,
+    '.json': write_neos_to_json,
+    '.jsonl': write_neos_to_ndjson,
+    '.ndjson': write_neos_to_ndjson,
+}
+
+
+def neo_writer_for(filename):
+    """Choose an NEO writer by the format suffix of a filename, ignoring any compression suffix.
+
+    :param filename: A Path-like object, such as `neos.csv` or `neos.jsonl.gz`.
+    :return: One of the `write_neos_to_*` functions, or `None` if the format is unknown.
+    """
+    return NEO_WRITERS.get(split_suffix(filename)[0])
+
+
+# Map each way of partitioning an export to a function that computes the
+# partition key of a close approach.
+PARTITION_KEYS = {
+    'year': lambda approach: f'{approach.time.year:04d}',
+    'month': lambda approach: f'{approach.time.year:04d}-{approach.time.month:02d}',
+    'neo': lambda approach: approach._designation,
+}
+
+# The maximum number of partition files held open at once, across all workers.
+MAX_OPEN_PARTITIONS = 64
+
+# The size, in bytes, of the buffer for each partition file. Partitions can be
+# numerous and short-lived, so this is smaller than `WRITE_BUFFER_SIZE`.
+PARTITION_BUFFER_SIZE = 1 << 16
+
+# The number of close approaches routed to a partition before they are handed to a worker.
+PARTITION_BATCH_SIZE = 1024
+
+# The number of routed close approaches, across all partitions, that may wait for
+# a worker before every pending batch is handed off.
+MAX_PENDING_ROWS = 64 * PARTITION_BATCH_SIZE
+
+
+def _escape_filename_char(match):
+    """Escape a character that can't appear in a partition filename, for `re.sub`."""
+    char = match.group()
+    if char == ' ':
+        return '_'
+    return ''.join(f'%{byte:02X}' for byte in char.encode('utf-8'))
+
+
+def partition_filename(key, suffix):
+    """Build a safe filename for a partition.
+
+    Designations can contain spaces and slashes (e.g. 'C/2019 Y4'), so a space
+    is replaced by '_', and any other character except a letter, digit, '-' or
+    '.' is percent-encoded, including '_' and '%' themselves. Distinct keys
+    therefore have distinct filenames: 'C/2019 Y4' becomes 'C%2F2019_Y4' and
+    'C 2019 Y4' becomes 'C_2019_Y4'.
+
+    :param key: The partition key, such as '2020', '2020-03' or '433'.
+    :param suffix: The suffix of the file, such as '.csv' or '.jsonl.gz'.
+    :return: The name of the partition's file.
+    """
+    return re.sub(r'[^\w.-]|_', _escape_filename_char, key) + suffix
+
+
+class _PartitionWorker:
+    """A worker thread that serializes the close approaches of some partitions.
+
+    Each partition is owned by exactly one worker, so the close approaches of a
+    partition are written in the order they were routed. A worker keeps at most
+    `max_open` of its partition files open; the least recently written one is
+    closed to make room, and reopened in append mode if it receives more data.
+    """
+    def __init__(self, outdir, suffix, max_open, compresslevel):
+        """Create a new `_PartitionWorker` and start its thread.
+
+        :param outdir: The directory in which to write the partition files.
+        :param suffix: The suffix of each partition file, such as '.csv'.
+        :param max_open: The maximum number of files this worker keeps open.
+        :param compresslevel: The compression level, if the output is compressed.
+        """
+        self.outdir = outdir
+        self.suffix = suffix
+        self.is_csv = writer_for(partition_filename('partition', suffix)) is write_to_csv
+        self.max_open = max_open
+        self.compresslevel = compresslevel
+        self.queue = queue.Queue(maxsize=4)
+        self.counts = collections.Counter()
+        self.error = None
+        self._files = collections.OrderedDict()
+        self._neo_columns = _empty_neo_columns()
+        self._thread = threading.Thread(target=self._work, daemon=True)
+        self._thread.start()
+
+    def _file_for(self, key):
+        """Return the open file (and CSV writer, if any) for a partition, opening it if needed."""
+        if key in self._files:
+            self._files.move_to_end(key)
+            return self._files[key]
+        if len(self._files) >= self.max_open:
+            _, (evicted, _) = self._files.popitem(last=False)
+            evicted.close()
+        # Truncate a partition the first time it's written, then append to it.
+        mode = 'a' if key in self.counts else 'w'
+        outfile = _open_output(self.outdir / partition_filename(key, self.suffix),
+                               '' if self.is_csv else None, self.compresslevel, mode=mode,
+                               buffer_size=PARTITION_BUFFER_SIZE)
+        writer = csv.writer(outfile) if self.is_csv else None
+        if writer and mode == 'w':
+            writer.writerow(CSV_FIELDNAMES)
+        self._files[key] = (outfile, writer)
+        return self._files[key]
+
+    def _write(self, key, batch):
+        """Serialize a batch of close approaches to a partition's file."""
+        outfile, writer = self._file_for(key)
+        if writer:
+            writer.writerows(_csv_row(approach, self._neo_columns) for approach in batch)
+        else:
+            outfile.write(''.join(json.dumps(serialize_approach(approach)) + '\n'
+                                  for approach in batch))
+        self.counts[key] += len(batch)
+
+    def _work(self):
+        """Write queued batches until the `None` sentinel arrives, then close every file."""
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            if self.error is None:
+                try:
+                    self._write(*item)
+                except Exception as err:
+                    self.error = err
+        for outfile, _ in self._files.values():
+            outfile.close()
+
+    def join(self):
+        """Stop this worker once its queue is drained, and wait for its files to be closed."""
+        self.queue.put(None)
+        self._thread.join()
+
+
+def write_partitioned(results, outdir, partition_by='year', suffix='.csv', workers=4,
+                      max_open=MAX_OPEN_PARTITIONS, compresslevel=None):
+    """Write an iterable of `CloseApproach` objects to one file per partition.
+
+    Each close approach is routed to a partition by its approach year, its
+    approach month, or its NEO's designation. Partitions are spread across
+    `workers` threads, each of which serializes and writes its own partitions,
+    and at most `max_open` partition files are open at any time.
+
+    Partition files are written as CSV or as newline-delimited JSON, depending
+    on `suffix`, and may be compressed. A JSON array can't be appended to once
+    its file has been closed, so `.json` partitions aren't supported.
+
+    :param results: An iterable of `CloseApproach` objects.
+    :param outdir: A Path-like object for the directory in which to write partitions.
+    :param partition_by: One of 'year', 'month' or 'neo'.
+    :param suffix: The suffix of each partition file, such as '.csv' or '.jsonl.gz'.
+    :param workers: The number of worker threads.
+    :param max_open: The maximum number of partition files open at once.
+    :param compresslevel: The compression level, if the output is compressed.
+    :return: A dictionary mapping each partition's file path to its number of close approaches.
+    :raises ValueError: If `partition_by` or the format in `suffix` is unsupported.
+    """
+    if partition_by not in PARTITION_KEYS:
+        raise ValueError(f"Can't partition by {partition_by!r}; "
+                         f"use one of {', '.join(PARTITION_KEYS)}.")
+    if writer_for(partition_filename('partition', suffix)) not in (write_to_csv, write_to_ndjson):
+        raise ValueError(f"Can't write partitions with suffix {suffix!r}; "
+                         "use `.csv`, `.jsonl` or `.ndjson`, optionally compressed.")
+
+    outdir.mkdir(parents=True, exist_ok=True)
+    get_key = PARTITION_KEYS[partition_by]
+    workers = max(1, workers)
+    pool = [_PartitionWorker(outdir, suffix, max(1, max_open // workers), compresslevel)
+            for _ in range(workers)]
+    # Remember which worker owns each partition, assigned round-robin as partitions appear.
+    owners = {}
+    batches = collections.defaultdict(list)
+
+    def hand_off(key, batch):
+        owners.setdefault(key, pool[len(owners) % workers]).queue.put((key, batch))
+
+    try:
+        pending = 0
+        for approach in results:
+            key = get_key(approach)
+            batch = batches[key]
+            batch.append(approach)
+            pending += 1
+            if len(batch) >= PARTITION_BATCH_SIZE:
+                hand_off(key, batches.pop(key))
+                pending -= len(batch)
+            elif pending >= MAX_PENDING_ROWS:
+                # Many partitions have small pending batches - flush all of them.
+                for key, batch in batches.items():
+                    hand_off(key, batch)
+                batches.clear()
+                pending = 0
+        for key, batch in batches.items():
+            hand_off(key, batch)
+    finally:
+        for worker in pool:
+            worker.join()
 
+    for worker in pool:
+        if worker.error is not None:
+            raise worker.error
+    return {outdir / partition_filename(key, suffix): count
+            for worker in pool for key, count in sorted(worker.counts.items())}